@@ -0,0 +1,155 @@
+# Admission control for Bedrock model calls: token-bucket rate limits
+# matched to the account's RPM/TPM quotas, a bounded wait queue with
+# deadline-aware shedding, and coalescing of identical in-flight queries.
+import time
+import threading
+from contextlib import contextmanager
+
+
+class Overloaded(Exception):
+    """Raised when a call can't be admitted before its deadline."""
+
+    def __init__(self, reason, kind, retry_after=1):
+        super().__init__(reason)
+        self.kind = kind
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Classic token bucket; ``rate`` tokens per second up to ``capacity``."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount, deadline):
+        """Take ``amount`` tokens, waiting at most until ``deadline``; False if it can't."""
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return True
+                wait = (amount - self.tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(min(wait, 0.05))
+
+    def refund(self, amount):
+        """Return (or, if negative, charge) tokens once the real cost is known."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class AdmissionController:
+    """Gate model calls by concurrency, requests/minute and tokens/minute.
+
+    A rate of 0 disables that limit. At most ``max_queue`` callers wait for
+    admission; beyond that, and for callers whose ``queue_timeout`` runs
+    out, ``Overloaded`` is raised so the API can shed load with a 503
+    instead of piling up requests that Bedrock would throttle anyway.
+    """
+
+    def __init__(self, rpm=0, tpm=0, max_concurrency=64, max_queue=256, queue_timeout=10.0):
+        self.requests = TokenBucket(rpm / 60.0, max(1, rpm // 6)) if rpm else None
+        self.tokens = TokenBucket(tpm / 60.0, max(1, tpm // 6)) if tpm else None
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.stats = {'admitted': 0, 'shed_queue_full': 0, 'shed_deadline': 0}
+
+    @contextmanager
+    def admit(self, estimated_tokens):
+        """Context manager around one model call; yields a ``settle(actual_tokens)`` callback."""
+        with self._lock:
+            if self.waiting >= self.max_queue:
+                self.stats['shed_queue_full'] += 1
+                raise Overloaded('admission queue is full', 'queue_full')
+            self.waiting += 1
+
+        deadline = time.monotonic() + self.queue_timeout
+        try:
+            if not self._slots.acquire(timeout=self.queue_timeout):
+                self._shed()
+            if (self.requests and not self.requests.acquire(1, deadline)) or \
+                    (self.tokens and not self.tokens.acquire(estimated_tokens, deadline)):
+                self._slots.release()
+                self._shed()
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+        with self._lock:
+            self.stats['admitted'] += 1
+
+        def settle(actual_tokens):
+            if self.tokens and actual_tokens is not None:
+                self.tokens.refund(estimated_tokens - actual_tokens)
+
+        try:
+            yield settle
+        finally:
+            self._slots.release()
+
+    def _shed(self):
+        with self._lock:
+            self.stats['shed_deadline'] += 1
+        raise Overloaded('no capacity before the deadline', 'deadline')
+
+    def snapshot(self):
+        with self._lock:
+            return {**self.stats, 'waiting': self.waiting}
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Share one execution of ``fn`` among concurrent callers with the same key."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
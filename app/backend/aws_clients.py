@@ -0,0 +1,82 @@
+# AWS clients built on first use from one shared boto3 Session.
+#
+# Clients from the same Session share its credential resolution and its
+# loader's cache of service models, so each model file is read once per
+# process; creating a client only when it is first needed keeps boto3 (and
+# services a process never calls) off the import path entirely.
+import threading
+
+from config import (
+    AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_REGION,
+    BEDROCK_MAX_POOL_CONNECTIONS, BEDROCK_MAX_ATTEMPTS, AWS_CONNECT_TIMEOUT, AWS_READ_TIMEOUT,
+)
+
+# boto3 Sessions aren't thread-safe; clients are, once built
+_lock = threading.Lock()
+_session = None
+_clients = {}
+
+
+def client_config(**overrides):
+    """Client config sized for the serving threads.
+
+    botocore's default pool is 10 connections; size it to the serving
+    threads so concurrent requests don't queue for a connection. Adaptive
+    retries back off and rate-limit client-side on ThrottlingException.
+    """
+    from botocore.config import Config
+    settings = dict(
+        max_pool_connections=BEDROCK_MAX_POOL_CONNECTIONS,
+        connect_timeout=AWS_CONNECT_TIMEOUT,
+        read_timeout=AWS_READ_TIMEOUT,
+        tcp_keepalive=True,
+        retries={'max_attempts': BEDROCK_MAX_ATTEMPTS, 'mode': 'adaptive'},
+    )
+    settings.update(overrides)
+    return Config(**settings)
+
+
+def _get_session():
+    global _session
+    if _session is None:
+        import boto3
+        _session = boto3.Session(
+            aws_access_key_id=AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+            region_name=AWS_REGION,
+        )
+    return _session
+
+
+def get_client(service_name, config=None):
+    """The process's client for ``service_name``, built on the first call."""
+    client = _clients.get(service_name)
+    if client is None:
+        with _lock:
+            client = _clients.get(service_name)
+            if client is None:
+                client = _get_session().client(service_name, config=config or client_config())
+                _clients[service_name] = client
+    return client
+
+
+def built_clients():
+    """Names of the services whose clients have been built so far."""
+    return sorted(_clients)
+
+
+class LazyClient:
+    """Stands in for a boto3 client and builds it on first attribute access."""
+
+    def __init__(self, service_name, config=None):
+        self.service_name = service_name
+        self.config = config
+
+    def load(self):
+        return get_client(self.service_name, self.config)
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+    def __repr__(self):
+        return f"LazyClient({self.service_name!r})"
@@ -0,0 +1,99 @@
+# Prompt context size and answer-passage hit rate: the old top-3 "\n".join
+# versus pack_context over a wider candidate set, on a synthetic FAQ corpus
+# with near-duplicate articles (the same answer under several URLs) and a
+# retriever whose scores carry noise.
+#
+#   python benchmarks/bench_context_packing.py --articles 500 --queries 300 --candidates 10 --budget 800
+import os
+import sys
+import json
+import random
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from context_packing import pack_context  # noqa: E402
+from sessions import count_tokens  # noqa: E402
+from bench_retriever import fake_embed  # noqa: E402
+
+WORDS = [f"w{i}" for i in range(3000)]
+
+
+def make_corpus(rng, articles, duplicate_rate):
+    """Scraped-record JSON passages; some articles are repeated under a second URL."""
+    passages = []
+    for i in range(articles):
+        href = f"https://ask.usda.gov/s/article/faq-{i}"
+        paragraph = " ".join(rng.choices(WORDS, k=rng.randint(80, 300)))
+        record = {'href': href, 'content': {'h2': [f"Question {i}"], 'paragraph': paragraph}}
+        passages.append({'article': i, 'href': href, 'text': json.dumps(record)})
+        if rng.random() < duplicate_rate:
+            copy = dict(record, href=f"{href}?language=en_US")
+            passages.append({'article': i, 'href': copy['href'], 'text': json.dumps(copy)})
+    return passages
+
+
+class NoisyRetriever:
+    """Exact top-k by cosine similarity, with Gaussian noise on the scores."""
+
+    def __init__(self, passages, noise, rng):
+        self.passages = passages
+        self.noise = noise
+        self.rng = rng
+        self.matrix = np.array([fake_embed(json.loads(p['text'])['content']['paragraph']) for p in passages])
+
+    def retrieve(self, query, k):
+        scores = self.matrix @ np.asarray(fake_embed(query))
+        scores = scores + np.asarray([self.rng.gauss(0, self.noise) for _ in scores])
+        top = np.argsort(-scores)[:k]
+        return [
+            {'content': {'text': self.passages[i]['text']},
+             'location': {'type': 'S3', 's3Location': {'uri': f"s3://bucket/{i}.json"}},
+             'score': float(scores[i]), 'article': self.passages[i]['article']}
+            for i in top
+        ]
+
+
+def main(articles, queries, candidates, budget, noise, duplicate_rate):
+    rng = random.Random(11)
+    passages = make_corpus(rng, articles, duplicate_rate)
+    retriever = NoisyRetriever(passages, noise, rng)
+
+    baseline = {'tokens': [], 'hits': 0}
+    packed = {'tokens': [], 'hits': 0, 'passages': []}
+    for _ in range(queries):
+        target = rng.randrange(articles)
+        paragraph = json.loads(next(p['text'] for p in passages if p['article'] == target))['content']['paragraph'].split()
+        # A question shares a handful of words with its answer
+        query = " ".join(rng.sample(paragraph, 6) + rng.choices(WORDS, k=4))
+
+        top3 = retriever.retrieve(query, 3)
+        context = "\n".join(result['content']['text'] for result in top3)
+        baseline['tokens'].append(count_tokens(context))
+        baseline['hits'] += any(result['article'] == target for result in top3)
+
+        wide = retriever.retrieve(query, candidates)
+        context, urls, kept = pack_context(query, wide, token_budget=budget, min_score=-1.0)
+        packed['tokens'].append(count_tokens(context))
+        packed['hits'] += any(url.split('?')[0].endswith(f"faq-{target}") for url in urls)
+        packed['passages'].append(len(kept))
+
+    for name, result in (('top-3 join', baseline), (f'packed ({candidates} candidates)', packed)):
+        print(f"{name}: mean context tokens {np.mean(result['tokens']):.0f}, "
+              f"p95 {np.percentile(result['tokens'], 95):.0f}, answer passage included {result['hits'] / queries:.1%}")
+    print(f"packed passages per prompt: mean {np.mean(packed['passages']):.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare top-3 context with packed context')
+    parser.add_argument('--articles', type=int, default=500)
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--candidates', type=int, default=10)
+    parser.add_argument('--budget', type=int, default=800, help='Context token budget')
+    parser.add_argument('--noise', type=float, default=0.05, help='Std-dev of noise on retrieval scores')
+    parser.add_argument('--duplicate-rate', type=float, default=0.3)
+    args = parser.parse_args()
+
+    main(args.articles, args.queries, args.candidates, args.budget, args.noise, args.duplicate_rate)
@@ -0,0 +1,60 @@
+# Compare the old serial Pinata fetch with the pooled concurrent fetcher.
+#
+#   python benchmarks/bench_pinata_fetch.py --pins 500 --latency 0.05 --workers 16
+import os
+import sys
+import time
+import json
+import argparse
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pinata import create_session, list_pins, iter_pin_contents  # noqa: E402
+from fake_pinata import FakePinata  # noqa: E402
+
+
+def serial_fetch(url, page_limit=100):
+    """The pre-pool behaviour: sequential pages, then one new connection per pin."""
+    rows, offset = [], 0
+    while True:
+        data = requests.get(f"{url}/data/pinList", params={'status': 'pinned', 'pageLimit': page_limit, 'pageOffset': offset}).json()
+        rows.extend(data['rows'])
+        if len(data['rows']) < page_limit:
+            break
+        offset += page_limit
+    return [(row['metadata']['name'], requests.get(f"{url}/ipfs/{row['ipfs_pin_hash']}").content) for row in rows]
+
+
+def pooled_fetch(url, workers):
+    session = create_session(pool_size=workers, backoff_factor=0.05)
+    return list(iter_pin_contents(list_pins(session, api_url=url), session, max_workers=workers, gateway_url=url))
+
+
+def main(pins, latency, workers, error_rate):
+    files = {f"bench-{i}.json": json.dumps({'i': i, 'pad': 'x' * 2048}).encode('utf-8') for i in range(pins)}
+    with FakePinata(files, latency=latency) as fake:
+        start = time.perf_counter()
+        serial = serial_fetch(fake.url)
+        serial_s = time.perf_counter() - start
+
+        fake.error_rate = error_rate
+        start = time.perf_counter()
+        pooled = pooled_fetch(fake.url, workers)
+        pooled_s = time.perf_counter() - start
+
+    assert sorted(serial) == sorted(pooled), "pooled fetch returned different content"
+    print(f"pins={pins} latency={latency}s workers={workers} gateway_429_rate={error_rate}")
+    print(f"serial: {serial_s:.2f}s ({pins / serial_s:.1f} pins/s)")
+    print(f"pooled: {pooled_s:.2f}s ({pins / pooled_s:.1f} pins/s)")
+    print(f"speedup: {serial_s / pooled_s:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the Pinata fetch pipeline against a local fake gateway')
+    parser.add_argument('--pins', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=0.05, help='Per-request gateway latency in seconds')
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--error-rate', type=float, default=0.05, help='Fraction of gateway requests answered with 429 in the pooled run')
+    args = parser.parse_args()
+    main(args.pins, args.latency, args.workers, args.error_rate)
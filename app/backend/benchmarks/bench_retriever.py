@@ -0,0 +1,105 @@
+# Recall and latency of the local retriever against a stub of Bedrock
+# knowledge base retrieve (exact float64 search plus network latency).
+#
+#   python benchmarks/bench_retriever.py --records 1000 --queries 200 --bedrock-latency 0.12
+import os
+import sys
+import time
+import random
+import hashlib
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from local_index import LocalIndex, build_index, chunk_record  # noqa: E402
+from retrievers import LocalRetriever  # noqa: E402
+
+WORDS = [f"w{i}" for i in range(3000)]
+
+
+def fake_embed(text, dimensions=512):
+    """Deterministic hashed bag-of-words embedding standing in for Titan."""
+    vector = np.zeros(dimensions, dtype=np.float64)
+    for word in text.lower().split():
+        digest = hashlib.md5(word.encode('utf-8')).digest()
+        vector[int.from_bytes(digest[:4], 'little') % dimensions] += 1.0 if digest[4] & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+
+class StubBedrockRetriever:
+    """Exact top-k over the same chunks, after a simulated network round trip."""
+
+    def __init__(self, chunks, latency):
+        self.chunks = chunks
+        self.latency = latency
+        self.matrix = np.array([fake_embed(chunk['text']) for chunk in chunks], dtype=np.float64)
+
+    def retrieve(self, query, k, embedding=None):
+        time.sleep(self.latency)
+        scores = self.matrix @ np.asarray(fake_embed(query))
+        top = np.argsort(-scores)[:k]
+        return [{'content': {'text': self.chunks[i]['text']}, 'score': float(scores[i])} for i in top]
+
+
+def percentile(values, p):
+    return float(np.percentile(values, p)) * 1000
+
+
+def main(records, queries, k, bedrock_latency):
+    rng = random.Random(7)
+    corpus = [
+        {
+            'href': f"https://ask.usda.gov/s/article/faq-{i}",
+            'content': {'h2': [f"Question {i}"], 'paragraph': " ".join(rng.choices(WORDS, k=rng.randint(60, 400)))},
+        }
+        for i in range(records)
+    ]
+    chunks = [chunk for record in corpus for chunk in chunk_record(record)]
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        start = time.perf_counter()
+        build_index(corpus, fake_embed, index_dir, model='fake', dimensions=512)
+        build_s = time.perf_counter() - start
+        local = LocalRetriever(LocalIndex(index_dir), embed=fake_embed)
+        bedrock = StubBedrockRetriever(chunks, bedrock_latency)
+
+        # Queries are word windows sampled from the corpus
+        samples = []
+        for _ in range(queries):
+            words = rng.choice(chunks)['text'].split()[3:]
+            start_word = rng.randrange(max(1, len(words) - 12))
+            samples.append(" ".join(words[start_word:start_word + 12]))
+
+        local_times, bedrock_times, recalls = [], [], []
+        for query in samples:
+            start = time.perf_counter()
+            local_results = local.retrieve(query, k)
+            local_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            bedrock_results = bedrock.retrieve(query, k)
+            bedrock_times.append(time.perf_counter() - start)
+
+            expected = {r['content']['text'] for r in bedrock_results}
+            recalls.append(len(expected & {r['content']['text'] for r in local_results}) / len(expected))
+
+    print(f"records={records} chunks={len(chunks)} queries={queries} k={k} index_build={build_s:.2f}s")
+    print(f"bedrock stub: p50={percentile(bedrock_times, 50):7.2f}ms p99={percentile(bedrock_times, 99):7.2f}ms")
+    print(f"local index:  p50={percentile(local_times, 50):7.2f}ms p99={percentile(local_times, 99):7.2f}ms")
+    print(f"local recall@{k} vs bedrock stub: {np.mean(recalls):.3f}")
+    print("note: local timings include the (fake) query embedding; with Titan add its latency "
+          "unless the response cache already embedded the query")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the local retriever against a stubbed Bedrock retriever')
+    parser.add_argument('--records', type=int, default=1000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('-k', type=int, default=3)
+    parser.add_argument('--bedrock-latency', type=float, default=0.12, help='Simulated retrieve round trip in seconds')
+    args = parser.parse_args()
+    main(args.records, args.queries, args.k, args.bedrock_latency)
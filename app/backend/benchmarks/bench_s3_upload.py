@@ -0,0 +1,93 @@
+# Throughput and memory of the Pinata -> S3 upload stage against moto.
+#
+# moto runs in a child process so the objects it stores don't count towards
+# this process's memory; the reported peak is what the sync itself holds.
+#
+#   python benchmarks/bench_s3_upload.py --sizes 20 80 --file-mb 2 --large-mb 24
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import multiprocessing
+
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+os.environ.setdefault('AWS_REGION', 'us-east-1')
+os.environ['SYNC_MANIFEST_BUCKET'] = ''
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import boto3  # noqa: E402
+import sync  # noqa: E402
+import pinata  # noqa: E402
+from fake_pinata import FakePinata  # noqa: E402
+
+BUCKET = 'd-chat-bench'
+
+
+def run_moto(port):
+    import logging
+    from moto.server import ThreadedMotoServer
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = ThreadedMotoServer(port=port, verbose=False)
+    server.start()
+    server._thread.join()
+
+
+def bench(files, endpoint, workers):
+    total_bytes = sum(len(c) for c in files.values())
+    with FakePinata(files, latency=0) as fake:
+        sync.s3_client = boto3.client('s3', endpoint_url=endpoint, region_name='us-east-1')
+        sync.S3_BUCKET_NAME = BUCKET
+        sync.load_manifest = lambda: {}
+        sync.save_manifest = lambda manifest: None
+        sync.list_pins = lambda session: pinata.list_pins(session, api_url=fake.url)
+        sync.open_pin = lambda session, pin: pinata.open_pin(session, pin, gateway_url=fake.url)
+        sync.map_pins = lambda fn, pins: pinata.map_pins(fn, pins, max_workers=workers)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = sync.sync_files_with_s3()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    assert result['uploaded'] == len(files), result
+    return total_bytes, elapsed, peak
+
+
+def main(sizes, file_mb, large_mb, workers, port):
+    server = multiprocessing.Process(target=run_moto, args=(port,), daemon=True)
+    server.start()
+    endpoint = f"http://127.0.0.1:{port}"
+    for _ in range(50):
+        try:
+            boto3.client('s3', endpoint_url=endpoint, region_name='us-east-1').create_bucket(Bucket=BUCKET)
+            break
+        except Exception:
+            time.sleep(0.2)
+
+    print(f"workers={workers} multipart_threshold={sync.TRANSFER_CONFIG.multipart_threshold // 2**20}MB")
+    try:
+        for n in sizes:
+            # One large object per corpus so the multipart path is exercised too
+            files = {f"bench-{n}-{i}.json": os.urandom(file_mb * 2**20) for i in range(n - 1)}
+            files[f"bench-{n}-large.json"] = os.urandom(large_mb * 2**20)
+            total_bytes, elapsed, peak = bench(files, endpoint, workers)
+            print(f"files={n:4d} corpus={total_bytes / 2**20:7.1f}MB "
+                  f"time={elapsed:6.2f}s throughput={total_bytes / 2**20 / elapsed:6.1f}MB/s "
+                  f"peak_traced={peak / 2**20:6.1f}MB")
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark streaming S3 uploads against moto')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20, 80], help='Corpus sizes (number of files) to compare')
+    parser.add_argument('--file-mb', type=int, default=2)
+    parser.add_argument('--large-mb', type=int, default=24, help='Size of the one multipart object per corpus')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--port', type=int, default=5555)
+    args = parser.parse_args()
+    main(args.sizes, args.file_mb, args.large_mb, args.workers, args.port)
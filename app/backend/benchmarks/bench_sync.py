@@ -0,0 +1,106 @@
+# Time sync_files_with_s3() against moto S3 and the fake Pinata API/gateway:
+# a cold sync of the whole corpus, a rerun with nothing changed, and a rerun
+# after a fraction of the pins were replaced and a few removed.
+#
+# moto runs in a child process, so the peak RSS reported is the sync's own.
+#
+#   python benchmarks/bench_sync.py --files 500 --file-kb 4 --changed 0.05 --output sync.json
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import tempfile
+import multiprocessing
+
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+os.environ.setdefault('AWS_REGION', 'us-east-1')
+os.environ['SYNC_MANIFEST_BUCKET'] = ''
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import boto3  # noqa: E402
+import sync  # noqa: E402
+import pinata  # noqa: E402
+from fake_pinata import FakePinata  # noqa: E402
+from bench_s3_upload import run_moto, BUCKET  # noqa: E402
+
+
+def make_file(rng, index, size):
+    body = {'href': f"https://ask.usda.gov/s/article/faq-{index}", 'version': rng.random(), 'pad': 'x' * size}
+    return json.dumps(body).encode('utf-8')
+
+
+def timed_sync(label):
+    started = time.perf_counter()
+    result = sync.sync_files_with_s3()
+    seconds = time.perf_counter() - started
+    print(f"{label}: {seconds:.2f}s, {result}")
+    return {**result, 'seconds': round(seconds, 3)}
+
+
+def main(files, file_kb, changed, removed, latency, workers, port):
+    rng = random.Random(24)
+    server = multiprocessing.Process(target=run_moto, args=(port,), daemon=True)
+    server.start()
+    endpoint = f"http://127.0.0.1:{port}"
+    for _ in range(50):
+        try:
+            boto3.client('s3', endpoint_url=endpoint, region_name='us-east-1').create_bucket(Bucket=BUCKET)
+            break
+        except Exception:
+            time.sleep(0.2)
+
+    corpus = {f"faq-{i}.json": make_file(rng, i, file_kb * 1024) for i in range(files)}
+    runs = {}
+    try:
+        with FakePinata(corpus, latency=latency) as fake, tempfile.TemporaryDirectory() as tmp:
+            sync.s3_client = boto3.client('s3', endpoint_url=endpoint, region_name='us-east-1')
+            sync.S3_BUCKET_NAME = BUCKET
+            sync.SYNC_MANIFEST_PATH = os.path.join(tmp, 'sync_manifest.json')
+            sync.list_pins = lambda session: pinata.list_pins(session, api_url=fake.url)
+            sync.open_pin = lambda session, pin: pinata.open_pin(session, pin, gateway_url=fake.url)
+            sync.map_pins = lambda fn, pins: pinata.map_pins(fn, pins, max_workers=workers)
+
+            runs['cold'] = timed_sync('cold')
+            runs['unchanged'] = timed_sync('unchanged')
+
+            names = sorted(corpus)
+            for name in rng.sample(names, int(files * changed)):
+                fake.add(name, make_file(rng, name, file_kb * 1024), {'source': 'usda-scraper'})
+            for name in rng.sample(names, int(files * removed)):
+                fake.remove(name)
+            runs['changed'] = timed_sync(f"{changed:.0%} changed, {removed:.0%} removed")
+    finally:
+        server.terminate()
+
+    for result in runs.values():
+        result['files_per_second'] = round(result['listed'] / result['seconds'], 1) if result['seconds'] else None
+    return {
+        'config': {'files': files, 'file_kb': file_kb, 'changed': changed, 'removed': removed,
+                   'gateway_latency': latency, 'workers': workers},
+        'runs': runs,
+        # ru_maxrss is in kilobytes on Linux
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the Pinata -> S3 sync against moto and a fake Pinata')
+    parser.add_argument('--files', type=int, default=500)
+    parser.add_argument('--file-kb', type=int, default=4)
+    parser.add_argument('--changed', type=float, default=0.05, help='Fraction of pins replaced before the last run')
+    parser.add_argument('--removed', type=float, default=0.01, help='Fraction of pins removed before the last run')
+    parser.add_argument('--latency', type=float, default=0.02, help='Per-request gateway latency in seconds')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--port', type=int, default=5556)
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    result = main(args.files, args.file_kb, args.changed, args.removed, args.latency, args.workers, args.port)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,113 @@
+# Stand-ins for the bedrock-runtime and bedrock-agent-runtime clients with
+# configurable latency and token rate, for load tests and benchmarks.
+import io
+import re
+import json
+import time
+import hashlib
+
+import numpy as np
+
+SOURCE_URL = "https://ask.usda.gov/s/article/How-long-can-you-keep-cooked-chicken"
+
+
+def fake_embedding(text, dimensions=512):
+    """Deterministic unit vector derived from the text's words."""
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for word in text.lower().split():
+        digest = hashlib.md5(word.encode('utf-8')).digest()
+        vector[int.from_bytes(digest[:4], 'little') % dimensions] += 1.0 if digest[4] & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+
+class FakeBedrockRuntime:
+    """Generation takes first_token_latency + output_tokens / tokens_per_second."""
+
+    def __init__(self, first_token_latency=0.4, tokens_per_second=80.0, output_tokens=60, embed_latency=0.03):
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = output_tokens
+        self.embed_latency = embed_latency
+
+    def _tokens(self):
+        words = ["Cooked", "chicken", "keeps", "3", "to", "4", "days", "in", "the", "refrigerator."]
+        answer = [words[i % len(words)] for i in range(max(1, self.output_tokens - 12))]
+        return ["ans: "] + [word + " " for word in answer] + [", sources: ", f"[\"{SOURCE_URL}\"]"]
+
+    def _tool_input(self, request):
+        # Cite the first URL in the prompt, like a well-behaved model would
+        prompt = request['messages'][-1]['content']
+        urls = re.findall(r'https?://[^\s"<>]+', prompt)
+        answer = "".join(self._tokens()[1:-2]).strip()
+        return {'answer': answer, 'sources': urls[:1]}
+
+    def _tool_deltas(self, request):
+        # Partial JSON in token-sized pieces, as in input_json_delta events
+        text = json.dumps(self._tool_input(request))
+        step = max(1, len(text) // max(1, self.output_tokens))
+        return [text[i:i + step] for i in range(0, len(text), step)]
+
+    def _usage(self, body):
+        return {'input_tokens': len(json.dumps(body)) // 4, 'output_tokens': self.output_tokens}
+
+    def invoke_model(self, modelId, body, **kwargs):
+        request = json.loads(body)
+        if 'inputText' in request:
+            time.sleep(self.embed_latency)
+            payload = {'embedding': fake_embedding(request['inputText'], request.get('dimensions', 512))}
+        else:
+            time.sleep(self.first_token_latency + self.output_tokens / self.tokens_per_second)
+            if request.get('tools'):
+                content = [{'type': 'tool_use', 'id': 'toolu_fake', 'name': request['tools'][0]['name'],
+                            'input': self._tool_input(request)}]
+            else:
+                content = [{'type': 'text', 'text': "".join(self._tokens())}]
+            payload = {
+                'content': content,
+                'stop_reason': 'tool_use' if request.get('tools') else 'end_turn',
+                'usage': self._usage(request),
+            }
+        return {'body': io.BytesIO(json.dumps(payload).encode('utf-8'))}
+
+    def invoke_model_with_response_stream(self, modelId, body, **kwargs):
+        request = json.loads(body)
+
+        def events():
+            yield {'type': 'message_start', 'message': {'usage': {'input_tokens': self._usage(request)['input_tokens']}}}
+            time.sleep(self.first_token_latency)
+            if request.get('tools'):
+                yield {'type': 'content_block_start', 'index': 0,
+                       'content_block': {'type': 'tool_use', 'id': 'toolu_fake', 'name': request['tools'][0]['name'], 'input': {}}}
+                for piece in self._tool_deltas(request):
+                    time.sleep(1.0 / self.tokens_per_second)
+                    yield {'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'input_json_delta', 'partial_json': piece}}
+                yield {'type': 'content_block_stop', 'index': 0}
+            else:
+                for token in self._tokens():
+                    time.sleep(1.0 / self.tokens_per_second)
+                    yield {'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': token}}
+            yield {'type': 'message_delta', 'delta': {'stop_reason': 'end_turn'}, 'usage': {'output_tokens': self.output_tokens}}
+            yield {'type': 'message_stop'}
+
+        return {'body': ({'chunk': {'bytes': json.dumps(event).encode('utf-8')}} for event in events())}
+
+
+class FakeAgentRuntime:
+    """Knowledge base retrieve with a fixed round-trip latency."""
+
+    def __init__(self, latency=0.15, passages=3):
+        self.latency = latency
+        self.passages = passages
+
+    def retrieve(self, knowledgeBaseId, retrievalQuery, retrievalConfiguration=None, **kwargs):
+        time.sleep(self.latency)
+        k = (retrievalConfiguration or {}).get('vectorSearchConfiguration', {}).get('numberOfResults', self.passages)
+        return {'retrievalResults': [
+            {
+                'content': {'text': json.dumps({'href': f"{SOURCE_URL}-{i}", 'content': {'h2': ['Cooked chicken'], 'paragraph': 'Refrigerate cooked chicken within 2 hours. ' * 8}})},
+                'location': {'type': 'S3', 's3Location': {'uri': f"s3://bucket/food-{i}.json"}},
+                'score': 0.8 - i * 0.05,
+            }
+            for i in range(k)
+        ]}
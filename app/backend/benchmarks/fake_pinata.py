@@ -0,0 +1,147 @@
+# Local stand-in for the Pinata API and IPFS gateway, for benchmarks.
+import json
+import email.parser
+import email.policy
+import random
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class FakePinata:
+    """Serve ``pinList``, ``pinFileToIPFS``, ``unpin`` and ``/ipfs/<cid>`` from memory on a local port.
+
+    ``latency`` is added to every gateway response and ``error_rate`` is the
+    fraction of gateway requests answered with a 429, to exercise retries.
+    """
+
+    def __init__(self, files=None, latency=0.05, error_rate=0.0, host='127.0.0.1', port=0):
+        self.pins = {}
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self._lock = threading.Lock()
+        for name, content in (files or {}).items():
+            self.add(name, content)
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_port}"
+        self._thread = None
+
+    def add(self, name, content, keyvalues=None):
+        cid = 'Qm' + hashlib.sha256(content).hexdigest()[:44]
+        self.pins.pop(cid, None)  # re-pinning moves the pin to the newest position
+        self.pins[cid] = {'name': name, 'content': content, 'keyvalues': keyvalues}
+        return cid
+
+    def remove(self, name):
+        for cid, pin in list(self.pins.items()):
+            if pin['name'] == name:
+                del self.pins[cid]
+
+    def rows(self, keyvalue_filter=None):
+        # Newest first, like Pinata's default date_pinned ordering.
+        # Only the 'eq' keyvalue filter operator is supported.
+        rows = []
+        for cid, pin in reversed(self.pins.items()):
+            keyvalues = pin['keyvalues'] or {}
+            if keyvalue_filter and any(keyvalues.get(key) != cond['value'] for key, cond in keyvalue_filter.items()):
+                continue
+            rows.append({'ipfs_pin_hash': cid, 'size': len(pin['content']), 'metadata': {'name': pin['name'], 'keyvalues': pin['keyvalues']}})
+        return rows
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, content_type='application/json'):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                with fake._lock:
+                    fake.requests += 1
+                parsed = urlparse(self.path)
+                if parsed.path == '/data/pinList':
+                    query = parse_qs(parsed.query)
+                    limit = int(query.get('pageLimit', ['10'])[0])
+                    offset = int(query.get('pageOffset', ['0'])[0])
+                    keyvalue_filter = query.get('metadata[keyvalues]')
+                    rows = fake.rows(json.loads(keyvalue_filter[0]) if keyvalue_filter else None)
+                    body = {'count': len(rows), 'rows': rows[offset:offset + limit]}
+                    self._send(200, json.dumps(body).encode('utf-8'))
+                elif parsed.path.startswith('/ipfs/'):
+                    time.sleep(fake.latency)
+                    if random.random() < fake.error_rate:
+                        self._send(429, b'{"error": "rate limited"}')
+                        return
+                    pin = fake.pins.get(parsed.path[len('/ipfs/'):])
+                    if pin is None:
+                        self._send(404, b'{"error": "not found"}')
+                    else:
+                        self._send(200, pin['content'], 'application/octet-stream')
+                else:
+                    self._send(404, b'{"error": "not found"}')
+
+            def do_POST(self):
+                with fake._lock:
+                    fake.requests += 1
+                if urlparse(self.path).path != '/pinning/pinFileToIPFS':
+                    self._send(404, b'{"error": "not found"}')
+                    return
+                time.sleep(fake.latency)
+                if random.random() < fake.error_rate:
+                    self._send(429, b'{"error": "rate limited"}')
+                    return
+
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+                    f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode('utf-8') + body)
+                content, metadata = b'', {}
+                for part in message.iter_parts():
+                    field = part.get_param('name', header='content-disposition')
+                    if field == 'file':
+                        content = part.get_payload(decode=True)
+                    elif field == 'pinataMetadata':
+                        metadata = json.loads(part.get_payload(decode=True))
+                with fake._lock:
+                    cid = fake.add(metadata.get('name', 'unnamed'), content, metadata.get('keyvalues'))
+                self._send(200, json.dumps({'IpfsHash': cid, 'PinSize': len(content)}).encode('utf-8'))
+
+            def do_DELETE(self):
+                with fake._lock:
+                    fake.requests += 1
+                    path = urlparse(self.path).path
+                    cid = path[len('/pinning/unpin/'):] if path.startswith('/pinning/unpin/') else None
+                    found = fake.pins.pop(cid, None) if cid else None
+                if found is None:
+                    self._send(404, b'{"error": "not found"}')
+                else:
+                    self._send(200, b'OK', 'text/plain')
+
+        return Handler
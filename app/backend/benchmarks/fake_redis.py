@@ -0,0 +1,33 @@
+# In-process stand-in for the subset of redis.Redis used by
+# sessions.RedisSessionStore (get/setex/delete with expiry), so the Redis
+# session backend can be exercised without a server.
+import time
+import threading
+
+
+class FakeRedis:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._data = {}  # key -> (value, expires_at)
+
+    def get(self, key):
+        time.sleep(self.latency)
+        with self._lock:
+            value, expires_at = self._data.get(key, (None, None))
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def setex(self, key, ttl, value):
+        time.sleep(self.latency)
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+        return True
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(self._data.pop(key, None) is not None for key in keys)
@@ -0,0 +1,145 @@
+# Closed-loop load test of /api/chat against the stubbed Bedrock backend.
+#
+# Starts the app (benchmarks/stub_app.py) under gunicorn or the Flask dev
+# server, then runs N concurrent users, each sending requests back to back,
+# and reports p50/p99 latency and requests/second per concurrency level.
+#
+#   python benchmarks/load_test.py --server gunicorn --users 50 100 250 500
+#   python benchmarks/load_test.py --url http://localhost:5000   # existing server
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import subprocess
+
+import numpy as np
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUESTIONS = [
+    "How long can I keep cooked chicken?",
+    "Can I refreeze thawed meat?",
+    "How long are eggs good for?",
+    "Is it safe to eat raw cookie dough?",
+]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(server, port, env):
+    if server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f"127.0.0.1:{port}",
+                   '--access-logfile', '/dev/null', 'benchmarks.stub_app:app']
+    else:
+        command = [sys.executable, '-m', 'flask', '--app', 'benchmarks.stub_app', 'run', '--port', str(port)]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env={**os.environ, **env},
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(f"{url}/api/sync/status", timeout=1)
+            return process, url
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{server} did not start")
+
+
+def run_level(url, users, duration):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def user(index):
+        session = requests.Session()
+        i = index
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = session.post(f"{url}/api/chat", json={'message': QUESTIONS[i % len(QUESTIONS)]}, timeout=60)
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+            i += 1
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    return {
+        'users': users,
+        'requests': int(len(latencies)),
+        'errors': errors[0],
+        'rps': len(latencies) / wall,
+        'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+        'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else None,
+    }
+
+
+def main(args):
+    process = None
+    url = args.url
+    if url is None:
+        env = {
+            'GUNICORN_WORKERS': str(args.workers),
+            'GUNICORN_THREADS': str(args.threads),
+            'STUB_RETRIEVE_LATENCY': str(args.retrieve_latency),
+            'STUB_FIRST_TOKEN_LATENCY': str(args.first_token_latency),
+            'STUB_TOKENS_PER_SECOND': str(args.tokens_per_second),
+            'STUB_OUTPUT_TOKENS': str(args.output_tokens),
+        }
+        process, url = start_server(args.server, free_port(), env)
+
+    results = []
+    try:
+        print(f"server={args.url or args.server} workers={args.workers} threads={args.threads} duration={args.duration}s")
+        for users in args.users:
+            result = run_level(url, users, args.duration)
+            results.append(result)
+            p50 = f"{result['p50_ms']:8.1f}" if result['p50_ms'] is not None else '     n/a'
+            p99 = f"{result['p99_ms']:8.1f}" if result['p99_ms'] is not None else '     n/a'
+            print(f"users={users:4d} requests={result['requests']:6d} errors={result['errors']:4d} "
+                  f"rps={result['rps']:7.1f} p50={p50}ms p99={p99}ms")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'server': args.url or args.server, 'workers': args.workers, 'threads': args.threads, 'levels': results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Load-test /api/chat with a stubbed Bedrock backend')
+    parser.add_argument('--server', choices=['gunicorn', 'flask'], default='gunicorn')
+    parser.add_argument('--url', help='Test an already running server instead of starting one')
+    parser.add_argument('--users', type=int, nargs='+', default=[50, 100, 250, 500])
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per concurrency level')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--retrieve-latency', type=float, default=0.15)
+    parser.add_argument('--first-token-latency', type=float, default=0.4)
+    parser.add_argument('--tokens-per-second', type=float, default=80.0)
+    parser.add_argument('--output-tokens', type=int, default=60)
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    main(parser.parse_args())
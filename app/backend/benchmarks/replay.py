@@ -0,0 +1,243 @@
+# Open-loop replay of a recorded query trace against /api/chat.
+#
+# Each trace line is a JSON object:
+#   {"t": 1.25, "message": "...", "endpoint": "/api/chat", "session": "u17"}
+# ``t`` is the send time in seconds from the start of the trace; ``endpoint``
+# defaults to /api/chat (/api/chat/stream is read as Server-Sent Events);
+# lines sharing a ``session`` label are sent as turns of one conversation,
+# each after the previous turn's answer. Requests are sent at their trace
+# times (scaled by --speed) whether or not earlier ones have finished, and
+# latency is measured from the scheduled send time, so a slow server isn't
+# hidden by the client falling behind.
+#
+#   python benchmarks/replay.py --trace benchmarks/traces/queries.jsonl --speed 2 --output replay.json
+#   python benchmarks/replay.py --url http://localhost:5000 --trace my_trace.jsonl
+import os
+import json
+import time
+import argparse
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from load_test import start_server, free_port
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TRACE = os.path.join(BENCHMARKS_DIR, 'traces', 'queries.jsonl')
+
+
+def load_trace(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        trace = [json.loads(line) for line in f if line.strip()]
+    return sorted(trace, key=lambda entry: entry['t'])
+
+
+def latency_summary(seconds):
+    """Count and p50/p95/p99/mean/max in milliseconds."""
+    if not seconds:
+        return {'count': 0, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'mean_ms': None, 'max_ms': None}
+    ms = np.asarray(seconds) * 1000
+    return {
+        'count': int(len(ms)),
+        'p50_ms': round(float(np.percentile(ms, 50)), 2),
+        'p95_ms': round(float(np.percentile(ms, 95)), 2),
+        'p99_ms': round(float(np.percentile(ms, 99)), 2),
+        'mean_ms': round(float(ms.mean()), 2),
+        'max_ms': round(float(ms.max()), 2),
+    }
+
+
+def process_tree_rss(pid):
+    """Resident memory in bytes of ``pid`` and all its descendants (Linux /proc)."""
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status", 'r') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children", 'r') as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+    return total
+
+
+class RssSampler:
+    """Sample a process tree's RSS in the background and keep the peak."""
+
+    def __init__(self, pid, interval=0.2):
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, process_tree_rss(self.pid))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def send(http, url, entry, session_id, timeout):
+    """Send one trace entry. Returns ``(status, first_delta_time, session_id)``;
+    the time of the first answer text is only known for streamed requests."""
+    endpoint = entry.get('endpoint', '/api/chat')
+    body = {'message': entry['message']}
+    if session_id:
+        body['session_id'] = session_id
+    if not endpoint.endswith('/stream'):
+        response = http.post(f"{url}{endpoint}", json=body, timeout=timeout)
+        data = response.json() if response.headers.get('Content-Type', '').startswith('application/json') else {}
+        return response.status_code, None, data.get('session_id')
+
+    first_delta, event, done = None, None, {}
+    with http.post(f"{url}{endpoint}", json=body, timeout=timeout, stream=True) as response:
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith('event: '):
+                event = line[len('event: '):]
+            elif line.startswith('data: '):
+                if event == 'delta' and first_delta is None:
+                    first_delta = time.perf_counter()
+                elif event == 'done':
+                    done = json.loads(line[len('data: '):])
+                elif event == 'error':
+                    return 500, first_delta, None
+    return response.status_code, first_delta, done.get('session_id')
+
+
+def replay(url, trace, speed=1.0, max_in_flight=256, timeout=60, server_pid=None):
+    """Replay ``trace`` against ``url`` and return the results as a dict."""
+    local = threading.local()
+    sessions, session_locks = {}, {label: threading.Lock() for label in {e.get('session') for e in trace} if label}
+    latencies, first_deltas, statuses = [], [], Counter()
+    lock = threading.Lock()
+
+    def run(entry, scheduled):
+        http = getattr(local, 'http', None)
+        if http is None:
+            http = local.http = requests.Session()
+        label = entry.get('session')
+        session_lock = session_locks.get(label)
+        if session_lock is not None:
+            session_lock.acquire()
+        try:
+            status, first_delta, session_id = send(http, url, entry, sessions.get(label), timeout)
+            if label and session_id:
+                sessions[label] = session_id
+        except requests.RequestException:
+            status, first_delta = 'error', None
+        finally:
+            if session_lock is not None:
+                session_lock.release()
+        finished = time.perf_counter()
+        with lock:
+            statuses[str(status)] += 1
+            if status == 200:
+                latencies.append(finished - scheduled)
+                if first_delta is not None:
+                    first_deltas.append(first_delta - scheduled)
+
+    sampler = RssSampler(server_pid) if server_pid else None
+    if sampler:
+        sampler.__enter__()
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            for entry in trace:
+                scheduled = started + entry['t'] / speed
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(run, entry, scheduled)
+        wall = time.perf_counter() - started
+    finally:
+        if sampler:
+            sampler.__exit__()
+
+    ok = len(latencies)
+    return {
+        'requests': len(trace),
+        'ok': ok,
+        'statuses': dict(statuses),
+        'error_rate': round(1 - ok / len(trace), 4) if trace else 0.0,
+        'wall_s': round(wall, 3),
+        'throughput_rps': round(ok / wall, 2) if wall else None,
+        'latency': latency_summary(latencies),
+        'stream_first_delta': latency_summary(first_deltas),
+        'server_peak_rss_mb': round(sampler.peak / 2**20, 1) if sampler else None,
+    }
+
+
+def run(args):
+    """Start the stub app unless --url is given, replay the trace, stop the app."""
+    trace = load_trace(args.trace)
+    if args.limit:
+        trace = trace[:args.limit]
+    process, url = None, args.url
+    if url is None:
+        env = {
+            'GUNICORN_WORKERS': str(args.workers),
+            'GUNICORN_THREADS': str(args.threads),
+            'STUB_RETRIEVE_LATENCY': str(args.retrieve_latency),
+            'STUB_FIRST_TOKEN_LATENCY': str(args.first_token_latency),
+            'STUB_TOKENS_PER_SECOND': str(args.tokens_per_second),
+            'STUB_OUTPUT_TOKENS': str(args.output_tokens),
+            'RESPONSE_CACHE_ENABLED': 'true' if args.response_cache else 'false',
+        }
+        process, url = start_server(args.server, free_port(), env)
+    try:
+        result = replay(url, trace, args.speed, args.max_in_flight, server_pid=process.pid if process else None)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    result['config'] = {
+        'trace': os.path.basename(args.trace), 'speed': args.speed, 'server': args.url or args.server,
+        'workers': args.workers, 'threads': args.threads, 'response_cache': args.response_cache,
+        'retrieve_latency': args.retrieve_latency, 'first_token_latency': args.first_token_latency,
+        'tokens_per_second': args.tokens_per_second, 'output_tokens': args.output_tokens,
+    }
+    return result
+
+
+def add_arguments(parser):
+    parser.add_argument('--trace', default=DEFAULT_TRACE, help='Query trace (JSONL) to replay')
+    parser.add_argument('--speed', type=float, default=1.0, help='Replay speed multiplier (2 = twice as fast)')
+    parser.add_argument('--limit', type=int, help='Replay only the first N requests')
+    parser.add_argument('--max-in-flight', type=int, default=256)
+    parser.add_argument('--server', choices=['gunicorn', 'flask'], default='gunicorn')
+    parser.add_argument('--url', help='Replay against an already running server instead of starting one')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--response-cache', action='store_true', help='Enable the response cache in the stub app')
+    parser.add_argument('--retrieve-latency', type=float, default=0.15)
+    parser.add_argument('--first-token-latency', type=float, default=0.4)
+    parser.add_argument('--tokens-per-second', type=float, default=80.0)
+    parser.add_argument('--output-tokens', type=int, default=60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Replay a query trace against /api/chat')
+    add_arguments(parser)
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    result = run(args)
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,121 @@
+# Cold-start check for the API process, against a stated budget.
+#
+#   import   fresh interpreters importing main (median of --runs): must stay
+#            under --import-budget, build no AWS clients, and load none of
+#            the sync modules or boto3 itself
+#   ready    a one-worker gunicorn serving the real app, from spawn to the
+#            first 200 from /api/sync/status: must stay under --ready-budget
+#
+# Exits non-zero when a budget is exceeded or the import path grew a
+# forbidden module, so it can gate a change like a test.
+#
+#   python benchmarks/startup_check.py --runs 5 --output startup.json
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+import requests
+
+from load_test import free_port
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A scale-out event should have a new worker serving within these
+IMPORT_BUDGET_SECONDS = 1.0
+READY_BUDGET_SECONDS = 3.0
+
+# Modules only the sync worker needs; none may be imported by the API
+FORBIDDEN_MODULES = ('boto3', 'sync', 'sync_worker', 'pinata', 'build_local_index', 'local_index')
+
+IMPORT_PROBE = """
+import sys, json, time
+started = time.perf_counter()
+import main
+seconds = time.perf_counter() - started
+import aws_clients
+print(json.dumps({'seconds': seconds, 'clients': aws_clients.built_clients(),
+                  'forbidden': [name for name in %r if name in sys.modules]}))
+""" % (FORBIDDEN_MODULES,)
+
+ENV = {
+    'AWS_REGION': os.getenv('AWS_REGION', 'us-east-1'),
+    'AWS_ACCESS_KEY_ID': os.getenv('AWS_ACCESS_KEY_ID', 'testing'),
+    'AWS_SECRET_ACCESS_KEY': os.getenv('AWS_SECRET_ACCESS_KEY', 'testing'),
+    'RETRIEVER': 'bedrock',
+}
+
+
+def measure_import(runs):
+    probes = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', IMPORT_PROBE], cwd=BACKEND_DIR, env={**os.environ, **ENV},
+                                capture_output=True, text=True, check=True).stdout
+        probes.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        'median_s': round(statistics.median(p['seconds'] for p in probes), 3),
+        'max_s': round(max(p['seconds'] for p in probes), 3),
+        'clients_built': probes[0]['clients'],
+        'forbidden_modules': probes[0]['forbidden'],
+    }
+
+
+def measure_ready(timeout=30):
+    port = free_port()
+    command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f"127.0.0.1:{port}",
+               '--workers', '1', '--access-logfile', '/dev/null', 'main:app']
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env={**os.environ, **ENV},
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                if requests.get(f"http://127.0.0.1:{port}/api/sync/status", timeout=1).status_code == 200:
+                    return round(time.perf_counter() - started, 3)
+            except requests.RequestException:
+                pass
+            time.sleep(0.02)
+        return None
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main(runs, import_budget, ready_budget):
+    result = {'import': measure_import(runs), 'ready_s': measure_ready(),
+              'budget': {'import_s': import_budget, 'ready_s': ready_budget}}
+
+    failures = []
+    if result['import']['median_s'] > import_budget:
+        failures.append(f"import took {result['import']['median_s']}s (budget {import_budget}s)")
+    if result['import']['clients_built']:
+        failures.append(f"importing main built AWS clients: {result['import']['clients_built']}")
+    if result['import']['forbidden_modules']:
+        failures.append(f"importing main loaded {result['import']['forbidden_modules']}")
+    if result['ready_s'] is None or result['ready_s'] > ready_budget:
+        failures.append(f"gunicorn ready after {result['ready_s']}s (budget {ready_budget}s)")
+    result['failures'] = failures
+
+    print(f"import main: median {result['import']['median_s']}s, max {result['import']['max_s']}s "
+          f"(budget {import_budget}s); gunicorn ready in {result['ready_s']}s (budget {ready_budget}s)")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Check API cold start against a time budget')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh-interpreter imports to take the median of')
+    parser.add_argument('--import-budget', type=float, default=IMPORT_BUDGET_SECONDS)
+    parser.add_argument('--ready-budget', type=float, default=READY_BUDGET_SECONDS)
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    result = main(args.runs, args.import_budget, args.ready_budget)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    sys.exit(1 if result['failures'] else 0)
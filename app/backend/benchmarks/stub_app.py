@@ -0,0 +1,36 @@
+# The real Flask app with Bedrock swapped for the fakes in fake_bedrock.py,
+# so serving configurations can be load-tested without AWS:
+#
+#   gunicorn -c gunicorn.conf.py benchmarks.stub_app:app
+#
+# Latencies come from STUB_RETRIEVE_LATENCY, STUB_FIRST_TOKEN_LATENCY,
+# STUB_TOKENS_PER_SECOND and STUB_OUTPUT_TOKENS. STUB_REDIS_LATENCY keeps
+# sessions in fake_redis.py instead of process memory.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('AWS_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+# Every load-test request should reach the (fake) model
+os.environ.setdefault('RESPONSE_CACHE_ENABLED', 'false')
+
+import main  # noqa: E402
+from fake_bedrock import FakeBedrockRuntime, FakeAgentRuntime  # noqa: E402
+from retrievers import BedrockRetriever  # noqa: E402
+from sessions import RedisSessionStore  # noqa: E402
+from fake_redis import FakeRedis  # noqa: E402
+
+main.bedrock_runtime = FakeBedrockRuntime(
+    first_token_latency=float(os.getenv('STUB_FIRST_TOKEN_LATENCY', '0.4')),
+    tokens_per_second=float(os.getenv('STUB_TOKENS_PER_SECOND', '80')),
+    output_tokens=int(os.getenv('STUB_OUTPUT_TOKENS', '60')),
+)
+main.bedrock_agent_runtime = FakeAgentRuntime(latency=float(os.getenv('STUB_RETRIEVE_LATENCY', '0.15')))
+main.retriever = BedrockRetriever(main.bedrock_agent_runtime, 'stub-kb')
+if os.getenv('STUB_REDIS_LATENCY'):
+    main.session_store = RedisSessionStore(FakeRedis(latency=float(os.environ['STUB_REDIS_LATENCY'])))
+
+app = main.app
@@ -0,0 +1,171 @@
+# Benchmark suite: check the API's cold start (benchmarks/startup_check.py),
+# replay a query trace against /api/chat (stub app with fake Bedrock), time
+# the Pinata -> S3 sync (moto + fake Pinata) and the scrape stages (static
+# USDA article server), and write one JSON file with latency percentiles,
+# throughput and peak RSS per stage.
+#
+# With --compare, key metrics are checked against an earlier results file
+# and the run fails when any regressed by more than --tolerance.
+#
+#   python benchmarks/suite.py --output bench_results.json
+#   python benchmarks/suite.py --quick --output new.json --compare bench_results.json
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+
+import replay
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARKS_DIR)
+REPO_DIR = os.path.dirname(os.path.dirname(BACKEND_DIR))
+PIPELINE_DIR = os.path.join(REPO_DIR, 'data-pipeline')
+STAGES = ('startup', 'chat', 'sync', 'scrape')
+
+
+def run_script(cwd, script, arguments, check=True):
+    """Run a benchmark script in its own process (own imports, own peak RSS) and load its JSON output."""
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+        output = f.name
+    try:
+        subprocess.run([sys.executable, script, *arguments, '--output', output], cwd=cwd, check=check,
+                       stdout=subprocess.DEVNULL)
+        with open(output, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        os.remove(output)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def key_metrics(results):
+    """Flatten the metrics worth gating on to ``{name: (value, higher_is_better)}``."""
+    metrics = {}
+    startup = results.get('startup')
+    if startup:
+        metrics['startup.import.seconds'] = (startup['import']['median_s'], False)
+        metrics['startup.ready.seconds'] = (startup['ready_s'], False)
+    chat = results.get('chat')
+    if chat:
+        for name in ('p50_ms', 'p95_ms', 'p99_ms'):
+            metrics[f"chat.latency.{name}"] = (chat['latency'][name], False)
+        metrics['chat.stream_first_delta.p95_ms'] = (chat['stream_first_delta']['p95_ms'], False)
+        metrics['chat.throughput_rps'] = (chat['throughput_rps'], True)
+        metrics['chat.error_rate'] = (chat['error_rate'], False)
+        metrics['chat.server_peak_rss_mb'] = (chat['server_peak_rss_mb'], False)
+    sync = results.get('sync')
+    if sync:
+        for run, result in sync['runs'].items():
+            metrics[f"sync.{run}.seconds"] = (result['seconds'], False)
+        metrics['sync.peak_rss_mb'] = (sync['peak_rss_mb'], False)
+    scrape = results.get('scrape')
+    if scrape:
+        for stage, seconds in scrape['seconds'].items():
+            metrics[f"scrape.{stage}.seconds"] = (seconds, False)
+        metrics['scrape.pages_per_second'] = (scrape['pages_per_second'], True)
+        metrics['scrape.peak_rss_mb'] = (scrape['peak_rss_mb'], False)
+    return metrics
+
+
+def compare(baseline, current, tolerance, min_seconds=0.1):
+    """Print each shared metric's change and return the names that regressed.
+
+    Timings below ``min_seconds`` (in either unit) are too noisy
+    to gate on and are only reported.
+    """
+    regressions = []
+    before, after = key_metrics(baseline), key_metrics(current)
+    for name in sorted(before.keys() & after.keys()):
+        (old, higher_is_better), (new, _) = before[name], after[name]
+        if old is None or new is None:
+            continue
+        change = (new - old) / old if old else 0.0
+        worse = -change if higher_is_better else change
+        noisy = (name.endswith('.seconds') and max(old, new) < min_seconds) or (name.endswith('_ms') and max(old, new) < min_seconds * 1000)
+        flag = ''
+        if worse > tolerance and not noisy:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:40s} {old:>10.2f} -> {new:>10.2f} ({change:+.1%}){flag}")
+    return regressions
+
+
+def main(args):
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'quick': args.quick,
+        }
+    }
+
+    failed = False
+    if 'startup' in args.stages:
+        print("startup: cold start of the API...")
+        results['startup'] = run_script(BACKEND_DIR, os.path.join('benchmarks', 'startup_check.py'), [], check=False)
+        print(f"startup: import {results['startup']['import']['median_s']}s, ready {results['startup']['ready_s']}s")
+        for failure in results['startup']['failures']:
+            print(f"startup FAIL: {failure}")
+            failed = True
+
+    if 'chat' in args.stages:
+        print("chat: replaying query trace...")
+        if args.quick:
+            args.limit = args.limit or 120
+        results['chat'] = replay.run(args)
+        latency = results['chat']['latency']
+        print(f"chat: p50 {latency['p50_ms']}ms p95 {latency['p95_ms']}ms p99 {latency['p99_ms']}ms, "
+              f"{results['chat']['throughput_rps']} req/s, server RSS {results['chat']['server_peak_rss_mb']}MB")
+
+    if 'sync' in args.stages:
+        print("sync: moto S3 + fake Pinata...")
+        files = '100' if args.quick else '500'
+        results['sync'] = run_script(BACKEND_DIR, os.path.join('benchmarks', 'bench_sync.py'), ['--files', files])
+        print("sync: " + ", ".join(f"{run} {result['seconds']}s" for run, result in results['sync']['runs'].items()))
+
+    if 'scrape' in args.stages:
+        print("scrape: static USDA article server...")
+        articles = '100' if args.quick else '400'
+        results['scrape'] = run_script(PIPELINE_DIR, os.path.join('benchmarks', 'bench_scrape.py'), ['--articles', articles])
+        print("scrape: " + ", ".join(f"{stage} {seconds}s" for stage, seconds in results['scrape']['seconds'].items()))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('meta', {}).get('quick') != args.quick:
+            print("Warning: comparing a --quick run with a full one; sizes differ")
+        regressions = compare(baseline, results, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} metrics regressed by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run the chat, sync and scrape benchmarks and write JSON results')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--quick', action='store_true', help='Smaller runs, for a quick check')
+    parser.add_argument('--output', default='bench_results.json', help='Results file (default: bench_results.json)')
+    parser.add_argument('--compare', help='Earlier results file to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative regression (default: 0.2)')
+    replay.add_arguments(parser)
+    parser.set_defaults(speed=2.0)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,95 @@
+# Build the in-process retrieval index (RETRIEVER=local) from scraped
+# record files on disk, or from the knowledge base's S3 bucket.
+#
+#   python build_local_index.py ../../data-pipeline/usdac_data_scrap_food
+#   python build_local_index.py --s3
+import os
+import json
+import logging
+import argparse
+
+from aws_clients import get_client
+from config import (
+    S3_BUCKET_NAME, LOCAL_INDEX_DIR, EMBEDDING_MODEL_ID, EMBEDDING_DIMENSIONS,
+)
+from embeddings import embeddings_call
+from local_index import build_index, iter_records
+
+logger = logging.getLogger(__name__)
+
+
+METADATA_SUFFIX = '.metadata.json'
+
+
+def document_record(text, metadata):
+    """Turn a corpus document and its metadata sidecar back into a scraped record."""
+    attributes = metadata.get('metadataAttributes', {})
+    # Documents are "<title>\nSource: <href>\n\n<body>"; the header is rebuilt when chunking
+    body = text.split('\n\n', 1)[1] if '\n\n' in text else text
+    return {'href': attributes.get('href', ''), 'content': {'h2': attributes.get('h2', []), 'paragraph': body}}
+
+
+def iter_s3_records(s3_client, bucket):
+    """Yield records from every JSON batch object and corpus document in ``bucket``."""
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket):
+        for obj in page.get('Contents', []):
+            key = obj['Key']
+            if key.endswith('.txt'):
+                text = s3_client.get_object(Bucket=bucket, Key=key)['Body'].read().decode('utf-8')
+                try:
+                    metadata = json.loads(s3_client.get_object(Bucket=bucket, Key=key + METADATA_SUFFIX)['Body'].read())
+                except s3_client.exceptions.NoSuchKey:
+                    metadata = {}
+                yield document_record(text, metadata)
+                continue
+            if not key.endswith('.json') or key.endswith(METADATA_SUFFIX):
+                continue
+            data = json.loads(s3_client.get_object(Bucket=bucket, Key=key)['Body'].read())
+            yield from (data if isinstance(data, list) else [data])
+
+
+def list_record_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if name.endswith(('.json', '.jsonl')) and not name.endswith(METADATA_SUFFIX))
+        else:
+            files.append(path)
+    return files
+
+
+def build_local_index(records, index_dir=LOCAL_INDEX_DIR, workers=8):
+    bedrock_runtime = get_client('bedrock-runtime')
+    return build_index(
+        records,
+        embed=lambda text: embeddings_call(bedrock_runtime, text),
+        index_dir=index_dir,
+        model=EMBEDDING_MODEL_ID,
+        dimensions=EMBEDDING_DIMENSIONS,
+        max_workers=workers,
+    )
+
+
+def build_from_s3(s3_client, bucket=S3_BUCKET_NAME, index_dir=LOCAL_INDEX_DIR, workers=8):
+    return build_local_index(iter_s3_records(s3_client, bucket), index_dir, workers)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='Build the local vector index used when RETRIEVER=local')
+    parser.add_argument('paths', nargs='*', help='Scraped JSON/JSONL files or directories of them')
+    parser.add_argument('--s3', action='store_true', help='Read records from S3_BUCKET_NAME instead of local files')
+    parser.add_argument('--index-dir', default=LOCAL_INDEX_DIR, help=f'Output directory (default: {LOCAL_INDEX_DIR})')
+    parser.add_argument('-w', '--workers', type=int, default=8, help='Concurrent embedding calls (default: 8)')
+    args = parser.parse_args()
+
+    if args.s3:
+        s3_client = get_client('s3')
+        count = build_from_s3(s3_client, index_dir=args.index_dir, workers=args.workers)
+    elif args.paths:
+        count = build_local_index(iter_records(list_record_files(args.paths)), args.index_dir, args.workers)
+    else:
+        parser.error('pass record files/directories or --s3')
+    print(f"Indexed {count} chunks into {args.index_dir}")
@@ -0,0 +1,104 @@
+import os
+from dotenv import load_dotenv
+
+# Load environment 
+# variables from .env file
+load_dotenv()
+
+# AWS configurations
+AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
+AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
+AWS_REGION = os.getenv('AWS_REGION')
+S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME')
+KNOWLEDGE_BASE_ID = os.getenv('KNOWLEDGE_BASE_ID')
+DATA_SOURCE_ID= os.getenv('DATA_SOURCE_ID')
+BEDROCK_MODEL_ID = os.getenv('BEDROCK_MODEL_ID')
+TEMPERATURE = float(os.getenv('TEMPERATURE', '0.7'))
+MAX_TOKENS = int(os.getenv('MAX_TOKENS', '1000'))
+# One pooled connection per serving thread (gunicorn.conf.py GUNICORN_THREADS)
+BEDROCK_MAX_POOL_CONNECTIONS = int(os.getenv('BEDROCK_MAX_POOL_CONNECTIONS', os.getenv('GUNICORN_THREADS', '32')))
+BEDROCK_MAX_ATTEMPTS = int(os.getenv('BEDROCK_MAX_ATTEMPTS', '4'))
+# Seconds to open a connection, and to wait for each read (between stream events too)
+AWS_CONNECT_TIMEOUT = float(os.getenv('AWS_CONNECT_TIMEOUT', '5'))
+AWS_READ_TIMEOUT = float(os.getenv('AWS_READ_TIMEOUT', '60'))
+
+# Bedrock admission control. Set RPM/TPM to the account's model quotas for
+# this deployment; 0 disables that limit. Each gunicorn worker enforces an
+# equal share of them (gunicorn.conf.py exports the worker count), while
+# MAX_CONCURRENCY and MAX_QUEUE apply per worker.
+BEDROCK_RPM = int(os.getenv('BEDROCK_RPM', '0'))
+BEDROCK_TPM = int(os.getenv('BEDROCK_TPM', '0'))
+BEDROCK_MAX_CONCURRENCY = int(os.getenv('BEDROCK_MAX_CONCURRENCY', '64'))
+BEDROCK_MAX_QUEUE = int(os.getenv('BEDROCK_MAX_QUEUE', '256'))
+# Serving processes sharing the quotas; 1 outside gunicorn (flask run)
+SERVING_WORKERS = max(1, int(os.getenv('GUNICORN_WORKERS', '1')))
+BEDROCK_QUEUE_TIMEOUT = float(os.getenv('BEDROCK_QUEUE_TIMEOUT', '10'))
+
+EMBEDDING_MODEL_ID = os.getenv('EMBEDDING_MODEL_ID', 'amazon.titan-embed-text-v2:0')
+EMBEDDING_DIMENSIONS = int(os.getenv('EMBEDDING_DIMENSIONS', '512'))
+
+# Retrieval configurations: 'bedrock' (knowledge base) or 'local' (in-process index)
+RETRIEVER = os.getenv('RETRIEVER', 'bedrock').lower()
+LOCAL_INDEX_DIR = os.getenv('LOCAL_INDEX_DIR', 'local_index')
+# Context packing: candidates fetched per question, the prompt token budget
+# for passages, the minimum retrieval score kept, the weight of the local
+# BM25 rerank, and the 5-gram overlap above which passages are duplicates
+CONTEXT_CANDIDATES = int(os.getenv('CONTEXT_CANDIDATES', '10'))
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '800'))
+CONTEXT_MIN_SCORE = float(os.getenv('CONTEXT_MIN_SCORE', '0.2'))
+CONTEXT_BM25_WEIGHT = float(os.getenv('CONTEXT_BM25_WEIGHT', '0.3'))
+CONTEXT_DUPLICATE_SIMILARITY = float(os.getenv('CONTEXT_DUPLICATE_SIMILARITY', '0.8'))
+# Retrieval result cache; entries older than the TTL are still served for
+# RETRIEVAL_CACHE_STALE_SECONDS while they refresh in the background
+RETRIEVAL_CACHE_ENABLED = os.getenv('RETRIEVAL_CACHE_ENABLED', 'true').lower() == 'true'
+RETRIEVAL_CACHE_MAX_ENTRIES = int(os.getenv('RETRIEVAL_CACHE_MAX_ENTRIES', '5000'))
+RETRIEVAL_CACHE_TTL_SECONDS = int(os.getenv('RETRIEVAL_CACHE_TTL_SECONDS', '600'))
+RETRIEVAL_CACHE_STALE_SECONDS = int(os.getenv('RETRIEVAL_CACHE_STALE_SECONDS', '3600'))
+
+# Response cache configurations
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '1000'))
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv('RESPONSE_CACHE_TTL_SECONDS', '3600'))
+RESPONSE_CACHE_SIMILARITY = float(os.getenv('RESPONSE_CACHE_SIMILARITY', '0.92'))
+
+# Conversation session configurations. Set SESSION_STORE_URL (redis://...)
+# to share sessions between workers, as docker-compose.yaml does; otherwise
+# each worker keeps its own and follow-ups reaching another worker lose history.
+SESSION_STORE_URL = os.getenv('SESSION_STORE_URL')
+SESSION_MAX_ENTRIES = int(os.getenv('SESSION_MAX_ENTRIES', '10000'))
+SESSION_TTL_SECONDS = int(os.getenv('SESSION_TTL_SECONDS', '1800'))
+# Prompt tokens spent on verbatim prior turns; older turns are summarized
+SESSION_HISTORY_TOKENS = int(os.getenv('SESSION_HISTORY_TOKENS', '1500'))
+SESSION_SUMMARY_MAX_TOKENS = int(os.getenv('SESSION_SUMMARY_MAX_TOKENS', '256'))
+SESSION_REWRITE_MAX_TOKENS = int(os.getenv('SESSION_REWRITE_MAX_TOKENS', '64'))
+
+# Pinata configurations
+PINATA_API_KEY = os.getenv('PINATA_API_KEY')
+PINATA_SECRET_API_KEY = os.getenv('PINATA_SECRET_API_KEY')
+PINATA_JWT = os.getenv('PINATA_JWT')
+PINATA_API_URL = os.getenv('PINATA_API_URL', 'https://api.pinata.cloud')
+PINATA_GATEWAY_URL = os.getenv('PINATA_GATEWAY_URL', 'https://gateway.pinata.cloud')
+PINATA_FETCH_WORKERS = int(os.getenv('PINATA_FETCH_WORKERS', '16'))
+# Set to 'usda-scraper' to sync only pins uploaded by the data pipeline
+PINATA_PIN_SOURCE = os.getenv('PINATA_PIN_SOURCE')
+
+# S3 upload configurations. A pin is streamed to S3, but s3transfer holds
+# bodies under the threshold in memory whole, and up to UPLOAD_CONCURRENCY
+# parts of CHUNKSIZE for larger ones, so the sync's peak memory is about
+# PINATA_FETCH_WORKERS x max(THRESHOLD, UPLOAD_CONCURRENCY x CHUNKSIZE)
+# (16 x 16MB by default), whatever the pin sizes.
+S3_MULTIPART_THRESHOLD = int(os.getenv('S3_MULTIPART_THRESHOLD', str(8 * 1024 * 1024)))
+S3_MULTIPART_CHUNKSIZE = int(os.getenv('S3_MULTIPART_CHUNKSIZE', str(8 * 1024 * 1024)))
+S3_UPLOAD_CONCURRENCY = int(os.getenv('S3_UPLOAD_CONCURRENCY', '2'))
+
+# Sync worker configurations
+SYNC_INTERVAL_SECONDS = int(os.getenv('SYNC_INTERVAL_SECONDS', '3600'))
+SYNC_POLL_SECONDS = int(os.getenv('SYNC_POLL_SECONDS', '5'))
+SYNC_STATUS_PATH = os.getenv('SYNC_STATUS_PATH', 'sync_status.json')
+# Keep the manifest out of the knowledge base data source bucket/prefix,
+# otherwise Bedrock would ingest it as a document.
+SYNC_MANIFEST_PATH = os.getenv('SYNC_MANIFEST_PATH', 'sync_manifest.json')
+SYNC_MANIFEST_BUCKET = os.getenv('SYNC_MANIFEST_BUCKET')
+SYNC_MANIFEST_KEY = os.getenv('SYNC_MANIFEST_KEY', 'd-chat/sync_manifest.json')
+# Port for the sync worker's Prometheus endpoint (0 disables it)
+SYNC_METRICS_PORT = int(os.getenv('SYNC_METRICS_PORT', '0'))
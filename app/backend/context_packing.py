@@ -0,0 +1,180 @@
+# Context assembly for the chat prompt: take a wider set of retrieved
+# candidates, drop duplicates and weak matches, rerank them locally with
+# BM25 against the question, and pack the best into a token budget with
+# their source URLs attached.
+import re
+import json
+import math
+import zlib
+import logging
+from collections import Counter
+
+from metrics import CONTEXT_PASSAGES_DROPPED
+from sessions import count_tokens
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+_URL = re.compile(r"https?://[^\s\"'<>\],]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i if in is it its me my of on or so that the "
+    "this to was what when where which who why will with you your".split()
+)
+
+
+def tokenize(text):
+    return [word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS]
+
+
+def passage_text(result):
+    """Plain text of a retrieved passage.
+
+    Scraped records are stored as JSON; when a passage is a whole record its
+    keys and punctuation are dropped, which saves prompt tokens. Chunks cut
+    mid-record are used as-is.
+    """
+    text = result['content']['text'] if 'text' in result['content'] else str(result['content'])
+    try:
+        record = json.loads(text)
+    except (json.JSONDecodeError, TypeError):
+        return text.strip()
+    if not isinstance(record, dict):
+        return text.strip()
+
+    lines = []
+
+    def flatten(value):
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if key != 'href':
+                    flatten(item)
+        elif isinstance(value, list):
+            for item in value:
+                flatten(item)
+        elif value:
+            lines.append(str(value).strip())
+
+    flatten(record.get('content', record))
+    return "\n".join(line for line in lines if line)
+
+
+def passage_urls(result):
+    """URLs a retrieved passage can be cited by: its href metadata, web location and any hrefs in its text."""
+    urls = []
+    # Corpus documents carry their article's href in their metadata sidecar
+    href = (result.get('metadata') or {}).get('href')
+    if isinstance(href, str):
+        urls.append(href)
+    location = result.get('location', {})
+    if location.get('type') == 'WEB':
+        urls.append(location['webLocation']['url'])
+    text = result['content'].get('text', '')
+    urls.extend(_URL.findall(text))
+    try:
+        record = json.loads(text)
+        if isinstance(record, dict) and record.get('href'):
+            urls.insert(0, record['href'])
+    except (json.JSONDecodeError, TypeError):
+        pass
+    return list(dict.fromkeys(urls))
+
+
+def shingles(words, size=5):
+    """Hashes of the passage's overlapping word ``size``-grams."""
+    if len(words) < size:
+        return {zlib.crc32(" ".join(words).encode('utf-8'))}
+    return {zlib.crc32(" ".join(words[i:i + size]).encode('utf-8')) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def bm25_scores(query_terms, documents, k1=1.2, b=0.75):
+    """BM25 of each tokenized document against the query, with IDF over ``documents``."""
+    if not documents:
+        return []
+    average_length = sum(len(doc) for doc in documents) / len(documents) or 1.0
+    document_frequency = Counter(term for doc in documents for term in set(doc))
+    scores = []
+    for doc in documents:
+        frequencies = Counter(doc)
+        score = 0.0
+        for term in set(query_terms):
+            frequency = frequencies.get(term)
+            if not frequency:
+                continue
+            idf = math.log(1 + (len(documents) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            score += idf * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * len(doc) / average_length))
+        scores.append(score)
+    return scores
+
+
+def pack_context(query, results, token_budget=800, min_score=0.0, bm25_weight=0.3, duplicate_similarity=0.8):
+    """Build prompt context from retrieval results.
+
+    Returns ``(context, urls, passages)``. ``context`` holds the kept
+    passages, best first, each headed by its source URL; ``urls`` are the
+    URLs those passages can be cited by. Passages are dropped when their
+    retrieval score is below ``min_score``, when they repeat a better
+    passage's URL or most of its text (``duplicate_similarity`` Jaccard over
+    word 5-grams), or when they no longer fit ``token_budget``.
+    """
+    dropped = Counter()
+    candidates = []
+    for result in sorted(results, key=lambda r: r.get('score') or 0.0, reverse=True):
+        score = result.get('score')
+        if score is not None and score < min_score:
+            dropped['low_score'] += 1
+            continue
+        text = passage_text(result)
+        words = text.lower().split()
+        candidates.append({
+            'text': text,
+            'urls': passage_urls(result),
+            'score': score or 0.0,
+            'terms': tokenize(text),
+            'shingles': shingles(words),
+        })
+
+    # Keep the best-scoring passage per href and drop near-duplicate text
+    unique, seen_urls = [], set()
+    for candidate in candidates:
+        href = candidate['urls'][0] if candidate['urls'] else None
+        if (href and href in seen_urls) or any(
+                jaccard(candidate['shingles'], kept['shingles']) >= duplicate_similarity for kept in unique):
+            dropped['duplicate'] += 1
+            continue
+        if href:
+            seen_urls.add(href)
+        unique.append(candidate)
+
+    # Blend the retriever's score with BM25 over the candidates, both scaled to [0, 1]
+    lexical = bm25_scores(tokenize(query), [candidate['terms'] for candidate in unique])
+    top_lexical = max(lexical, default=0.0) or 1.0
+    top_vector = max((candidate['score'] for candidate in unique), default=0.0) or 1.0
+    for candidate, lexical_score in zip(unique, lexical):
+        candidate['rank'] = (1 - bm25_weight) * candidate['score'] / top_vector + bm25_weight * lexical_score / top_lexical
+    unique.sort(key=lambda candidate: candidate['rank'], reverse=True)
+
+    blocks, urls, passages, used = [], [], [], 0
+    for candidate in unique:
+        header = f"Source: {candidate['urls'][0]}\n" if candidate['urls'] else ''
+        block = header + candidate['text']
+        tokens = count_tokens(block)
+        if used + tokens > token_budget:
+            if passages:
+                dropped['budget'] += 1
+                continue
+            # Always keep (the start of) the best passage
+            block = block[:token_budget * 4]
+            tokens = count_tokens(block)
+        blocks.append(block)
+        urls.extend(candidate['urls'])
+        passages.append({'urls': candidate['urls'], 'score': candidate['score'], 'rank': candidate['rank'], 'tokens': tokens})
+        used += tokens
+
+    for reason, count in dropped.items():
+        CONTEXT_PASSAGES_DROPPED.labels(reason=reason).inc(count)
+    logger.debug(f"Packed {len(passages)} of {len(results)} passages ({used} tokens), dropped {dict(dropped)}")
+    return "\n\n".join(blocks), urls, passages
@@ -0,0 +1,24 @@
+# Titan text embeddings, as used by the prototype's embeddings_call.
+import json
+
+from config import EMBEDDING_MODEL_ID, EMBEDDING_DIMENSIONS
+
+
+def embeddings_call(bedrock_runtime, text, dimensions=EMBEDDING_DIMENSIONS):
+    """Embed ``text`` with Titan and return a unit-length vector (list of floats)."""
+    # Prepare the request body
+    request_body = {
+        "inputText": text,
+        "dimensions": dimensions,
+        "normalize": True
+    }
+
+    # Invoke the model
+    response = bedrock_runtime.invoke_model(
+        modelId=EMBEDDING_MODEL_ID,
+        body=json.dumps(request_body)
+    )
+
+    # Parse and return the response
+    response_body = json.loads(response['body'].read())
+    return response_body['embedding']
@@ -0,0 +1,53 @@
+# Production serving: gunicorn with threaded workers.
+#
+# /api/chat spends nearly all of its time waiting on Bedrock, so each worker
+# process runs many threads; the streaming endpoint also holds a thread for
+# the whole generation. Size the botocore pool to match (see config.py).
+import os
+import multiprocessing
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+worker_class = 'gthread'
+workers = int(os.getenv('GUNICORN_WORKERS', str(multiprocessing.cpu_count())))
+threads = int(os.getenv('GUNICORN_THREADS', '32'))
+
+# Keep client connections open between requests, and allow for long streams
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = 30
+
+# Don't preload: boto3 clients must be created in each worker, not before fork
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    # Workers split the Bedrock RPM/TPM quotas between them (config.py);
+    # export the final worker count, including a --workers override
+    os.environ['GUNICORN_WORKERS'] = str(server.cfg.workers)
+
+    # Start each deployment with an empty multiprocess metrics directory
+    multiproc_dir = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if multiproc_dir:
+        os.makedirs(multiproc_dir, exist_ok=True)
+        for name in os.listdir(multiproc_dir):
+            os.remove(os.path.join(multiproc_dir, name))
+
+
+def post_worker_init(worker):
+    # Clients are built lazily; build them in the background now so the
+    # worker serves right away and its first request doesn't pay for them
+    if os.getenv('AWS_CLIENTS_PREWARM', 'true').lower() == 'true':
+        import threading
+        from main import warm_clients
+        threading.Thread(target=warm_clients, name='warm-aws-clients', daemon=True).start()
+
+
+def child_exit(server, worker):
+    # With PROMETHEUS_MULTIPROC_DIR set, /metrics aggregates every worker's
+    # samples; drop the live gauges of workers that have exited.
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
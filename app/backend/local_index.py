@@ -0,0 +1,203 @@
+# In-process vector index over the scraped USDA records.
+#
+# Layout of LOCAL_INDEX_DIR:
+#   CURRENT                    name of the live version directory; the one
+#                              before it is kept until the next build
+#   <version>/embeddings.f32   row-major float32 matrix, one unit vector per chunk
+#   <version>/chunks.jsonl     one {"href", "title", "text", "hash"} object per row
+#   <version>/meta.json        {"count", "dimensions", "model"}
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_record(record, chunk_words=200, overlap=40):
+    """Split one scraped ``{"href", "content": {"h2", "paragraph"}}`` record into chunks."""
+    href = record.get('href', '')
+    content = record.get('content') or {}
+    title = " / ".join(h for h in content.get('h2', []) if h)
+    words = (content.get('paragraph') or '').split()
+    if not words:
+        return []
+
+    chunks = []
+    step = max(1, chunk_words - overlap)
+    for start in range(0, len(words), step):
+        body = " ".join(words[start:start + chunk_words])
+        chunks.append({
+            'href': href,
+            'title': title,
+            # Keep the href in the text so the model can cite it as a source
+            'text': f"href: {href}\n{title}\n{body}",
+        })
+        if start + chunk_words >= len(words):
+            break
+    return chunks
+
+
+def iter_records(paths):
+    """Yield records from JSON batch files (lists of records) or JSONL files."""
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            if path.endswith('.jsonl'):
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+            else:
+                data = json.load(f)
+                yield from (data if isinstance(data, list) else [data])
+
+
+def current_version(index_dir):
+    """Name of the live version directory, or None before the first build."""
+    try:
+        with open(os.path.join(index_dir, 'CURRENT'), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def chunk_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def load_previous_vectors(index_dir, model, dimensions):
+    """Vectors of the live index version keyed by chunk hash, if it used the same model.
+
+    The rows are copied into memory so the new version can safely reuse them.
+    """
+    version = current_version(index_dir)
+    if version is None:
+        return {}
+    version_dir = os.path.join(index_dir, version)
+    try:
+        with open(os.path.join(version_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('model') != model or meta.get('dimensions') != dimensions or not meta.get('count'):
+            return {}
+        with open(os.path.join(version_dir, 'chunks.jsonl'), 'r', encoding='utf-8') as f:
+            hashes = [json.loads(line).get('hash') for line in f]
+        matrix = np.array(np.memmap(os.path.join(version_dir, 'embeddings.f32'), dtype=np.float32, mode='r',
+                                    shape=(meta['count'], dimensions)))
+    except (OSError, ValueError) as e:
+        logger.info(f"No previous local index vectors to reuse: {e}")
+        return {}
+    return {key: matrix[row] for row, key in enumerate(hashes) if key}
+
+
+def build_index(records, embed, index_dir, model, dimensions, max_workers=8):
+    """Chunk and embed ``records`` into a new index version and make it live.
+
+    Chunks whose text is unchanged since the live version reuse its vectors,
+    so a sync that changed a few files only embeds their chunks.
+    Returns the number of chunks indexed.
+    """
+    chunks = [chunk for record in records for chunk in chunk_record(record)]
+    for chunk in chunks:
+        chunk['hash'] = chunk_hash(chunk['text'])
+    previous = load_previous_vectors(index_dir, model, dimensions)
+    missing = [chunk for chunk in chunks if chunk['hash'] not in previous]
+
+    # Unique per build, so two builds in the same second never share a directory
+    version = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    # Written under a hidden name and renamed once complete, so a concurrent
+    # build's cleanup never sees (or removes) a half-written version
+    version_dir = os.path.join(index_dir, f".{version}.tmp")
+    os.makedirs(version_dir)
+
+    matrix = np.memmap(os.path.join(version_dir, 'embeddings.f32'), dtype=np.float32, mode='w+',
+                       shape=(max(len(chunks), 1), dimensions))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        embedded = dict(zip((chunk['hash'] for chunk in missing),
+                            executor.map(lambda chunk: embed(chunk['text']), missing)))
+    for row, chunk in enumerate(chunks):
+        vector = previous.get(chunk['hash'])
+        if vector is None:
+            vector = np.asarray(embedded[chunk['hash']], dtype=np.float32)
+            vector = vector / (np.linalg.norm(vector) or 1.0)
+        matrix[row] = vector
+    matrix.flush()
+    del matrix
+
+    with open(os.path.join(version_dir, 'chunks.jsonl'), 'w', encoding='utf-8') as f:
+        for chunk in chunks:
+            f.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+    with open(os.path.join(version_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({'count': len(chunks), 'dimensions': dimensions, 'model': model}, f)
+
+    # Switch readers over atomically. The version they may still be loading
+    # is kept until the next build; anything older is dropped.
+    os.rename(version_dir, os.path.join(index_dir, version))
+    previous_version = current_version(index_dir)
+    tmp_path = os.path.join(index_dir, f"CURRENT.{version}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(index_dir, 'CURRENT'))
+    for name in os.listdir(index_dir):
+        path = os.path.join(index_dir, name)
+        if name not in (version, previous_version) and not name.startswith('.') and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+    logger.info(f"Built local index version {version} with {len(chunks)} chunks "
+                f"({len(chunks) - len(missing)} reused, {len(missing)} embedded)")
+    return len(chunks)
+
+
+class LocalIndex:
+    """Memory-mapped, read-only view of the live index version.
+
+    The ``CURRENT`` pointer is re-checked at most every ``reload_interval``
+    seconds, so a rebuild by the sync worker is picked up without restarts.
+    """
+
+    def __init__(self, index_dir, reload_interval=10.0):
+        self.index_dir = index_dir
+        self.reload_interval = reload_interval
+        self.version = None
+        self.matrix = None
+        self.chunks = []
+        self.meta = {}
+        self._checked_at = 0.0
+
+    def refresh(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        version = current_version(self.index_dir)
+        if version is None or version == self.version:
+            return
+
+        version_dir = os.path.join(self.index_dir, version)
+        with open(os.path.join(version_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        with open(os.path.join(version_dir, 'chunks.jsonl'), 'r', encoding='utf-8') as f:
+            chunks = [json.loads(line) for line in f]
+        matrix = np.memmap(os.path.join(version_dir, 'embeddings.f32'), dtype=np.float32, mode='r',
+                           shape=(max(meta['count'], 1), meta['dimensions']))[:meta['count']]
+        self.meta, self.chunks, self.matrix, self.version = meta, chunks, matrix, version
+        logger.info(f"Loaded local index version {version} ({meta['count']} chunks)")
+
+    def search(self, embedding, k):
+        """Return ``[(chunk, score)]`` for the top ``k`` chunks by cosine similarity."""
+        self.refresh()
+        if self.matrix is None or not self.chunks:
+            return []
+        query = np.asarray(embedding, dtype=np.float32)
+        if query.shape[0] != self.matrix.shape[1]:
+            raise ValueError(f"Query has {query.shape[0]} dimensions, index {self.version} has {self.matrix.shape[1]}")
+        query = query / (np.linalg.norm(query) or 1.0)
+        scores = self.matrix @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.chunks[i], float(scores[i])) for i in top]
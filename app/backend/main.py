@@ -1,316 +1,573 @@
 # To all the code in the same file. :)
 # Red flag coder
-import os
+import re
 import json
-import boto3
-import hashlib
-import time
-import requests
 import logging
-import urllib3
-from flask import Flask, request, jsonify
 from botocore.exceptions import ClientError
-from dotenv import load_dotenv
+import time
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 
+from config import (
+    KNOWLEDGE_BASE_ID, BEDROCK_MODEL_ID, TEMPERATURE, MAX_TOKENS,
+    RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_SECONDS, RESPONSE_CACHE_SIMILARITY,
+    RETRIEVER, LOCAL_INDEX_DIR,
+    CONTEXT_CANDIDATES, CONTEXT_TOKEN_BUDGET, CONTEXT_MIN_SCORE, CONTEXT_BM25_WEIGHT, CONTEXT_DUPLICATE_SIMILARITY,
+    RETRIEVAL_CACHE_ENABLED, RETRIEVAL_CACHE_MAX_ENTRIES, RETRIEVAL_CACHE_TTL_SECONDS, RETRIEVAL_CACHE_STALE_SECONDS,
+    BEDROCK_RPM, BEDROCK_TPM, BEDROCK_MAX_CONCURRENCY, BEDROCK_MAX_QUEUE, BEDROCK_QUEUE_TIMEOUT, SERVING_WORKERS,
+    SESSION_STORE_URL, SESSION_MAX_ENTRIES, SESSION_TTL_SECONDS, SESSION_HISTORY_TOKENS,
+    SESSION_SUMMARY_MAX_TOKENS, SESSION_REWRITE_MAX_TOKENS,
+)
+from admission import AdmissionController, Overloaded, SingleFlight
+from aws_clients import LazyClient
+from embeddings import embeddings_call
+from metrics import (
+    CHAT_STAGE_SECONDS, HTTP_REQUESTS, RESPONSE_CACHE_LOOKUPS, ADMISSION_SHED, ANSWER_SOURCES_DROPPED, RequestIdFilter,
+    new_request_id, record_usage, render_metrics, setup_tracing, span,
+)
+from retrievers import BedrockRetriever, LocalRetriever
+from retrieval_cache import CachedRetriever
+from context_packing import pack_context
+from response_cache import ResponseCache, normalize_query
+from sessions import (
+    create_session_store, new_session, new_session_id, history_messages, split_history, needs_rewrite,
+    build_rewrite_request, build_summary_request,
+)
+from sync_status import read_sync_status, current_kb_version
+
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": "*"}})
 
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [%(request_id)s] %(message)s')
+for handler in logging.getLogger().handlers:
+    handler.addFilter(RequestIdFilter())
 logger = logging.getLogger(__name__)
 
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
-# Load environment 
-# variables from .env file
-load_dotenv()
-
-# AWS configurations
-S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME')
-KNOWLEDGE_BASE_ID = os.getenv('KNOWLEDGE_BASE_ID')
-DATA_SOURCE_ID= os.getenv('DATA_SOURCE_ID')
-BEDROCK_MODEL_ID = os.getenv('BEDROCK_MODEL_ID')
-TEMPERATURE = float(os.getenv('TEMPERATURE', '0.7'))
-MAX_TOKENS = int(os.getenv('MAX_TOKENS', '1000'))
-
-# Pinata configurations
-PINATA_API_KEY = os.getenv('PINATA_API_KEY')
-PINATA_SECRET_API_KEY = os.getenv('PINATA_SECRET_API_KEY')
-PINATA_JWT = os.getenv('PINATA_JWT')
-
-# Initialize AWS clients using environment variables
-s3_client = boto3.client('s3',
-    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-    region_name=os.getenv('AWS_REGION')
+setup_tracing('d-chat-api')
+
+
+@app.before_request
+def assign_request_id():
+    g.request_id = new_request_id(request.headers.get('X-Request-ID'))
+
+
+@app.after_request
+def echo_request_id(response):
+    response.headers['X-Request-ID'] = g.request_id
+    HTTP_REQUESTS.labels(endpoint=request.endpoint or 'unknown', status=response.status_code).inc()
+    return response
+
+# AWS clients, built on first use from one shared session (aws_clients.py).
+# The Pinata/S3/knowledge base sync runs in sync_worker.py, so the API
+# only needs the runtime clients, and importing it makes no AWS calls.
+bedrock_agent_runtime = LazyClient('bedrock-agent-runtime')
+bedrock_runtime = LazyClient('bedrock-runtime')
+
+if RETRIEVER == 'local':
+    from local_index import LocalIndex
+    local_index = LocalIndex(LOCAL_INDEX_DIR)
+    retriever = LocalRetriever(local_index, embed=lambda text: embeddings_call(bedrock_runtime, text))
+else:
+    local_index = None
+    retriever = BedrockRetriever(bedrock_agent_runtime, KNOWLEDGE_BASE_ID)
+
+
+def retrieval_version():
+    """Version of whatever the retriever searches: the local index build or the KB ingestion."""
+    if local_index is not None:
+        local_index.refresh()
+        return local_index.version
+    return current_kb_version()
+
+
+if RETRIEVAL_CACHE_ENABLED:
+    retriever = CachedRetriever(
+        retriever,
+        max_entries=RETRIEVAL_CACHE_MAX_ENTRIES,
+        ttl=RETRIEVAL_CACHE_TTL_SECONDS,
+        stale_ttl=RETRIEVAL_CACHE_STALE_SECONDS,
+        version=retrieval_version,
+    )
+
+# Admission control in front of model calls. Every worker process has its
+# own controller, so each gets an equal share of the account's quotas.
+bedrock_gate = AdmissionController(
+    rpm=BEDROCK_RPM / SERVING_WORKERS,
+    tpm=BEDROCK_TPM / SERVING_WORKERS,
+    max_concurrency=BEDROCK_MAX_CONCURRENCY,
+    max_queue=BEDROCK_MAX_QUEUE,
+    queue_timeout=BEDROCK_QUEUE_TIMEOUT,
 )
+inflight_queries = SingleFlight()
+
+# Answers are cached until what the active retriever searches changes: a new
+# knowledge base ingestion, or a new local index build (sync or by hand)
+response_cache = ResponseCache(
+    embed=lambda text: embeddings_call(bedrock_runtime, text),
+    max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+    ttl=RESPONSE_CACHE_TTL_SECONDS,
+    threshold=RESPONSE_CACHE_SIMILARITY,
+    version=retrieval_version,
+) if RESPONSE_CACHE_ENABLED else None
+
+# Conversation history for follow-up questions
+session_store = create_session_store(SESSION_STORE_URL, max_entries=SESSION_MAX_ENTRIES, ttl=SESSION_TTL_SECONDS,
+                                     workers=SERVING_WORKERS)
+
+
+def warm_clients():
+    """Build the AWS clients this process will call, ahead of its first request."""
+    clients = [bedrock_runtime]
+    if local_index is None:
+        clients.append(bedrock_agent_runtime)
+    for client in clients:
+        # Benchmarks swap in fakes, which have nothing to build
+        if isinstance(client, LazyClient):
+            started = time.perf_counter()
+            client.load()
+            logger.info(f"Built {client.service_name} client in {time.perf_counter() - started:.3f}s")
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
+@app.route('/api/sync/status', methods=['GET'])
+def sync_status():
+    """Report the last sync run and ingestion job state from the sync worker."""
+    status = read_sync_status()
+    if status is None:
+        return jsonify({'state': 'never_run'})
+    return jsonify(status)
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Report response and retrieval cache hit rates for tuning."""
+    stats = {'enabled': response_cache is not None}
+    if response_cache is not None:
+        stats.update(response_cache.snapshot())
+    if isinstance(retriever, CachedRetriever):
+        stats['retrieval'] = retriever.snapshot()
+    return jsonify(stats)
+
+
+# Structured reply: the answer and its sources come back as tool input
+ANSWER_TOOL = {
+    "name": "answer",
+    "description": "Reply to the user.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "answer": {"type": "string", "description": "The reply shown to the user."},
+            "sources": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "URLs of the passages the answer is based on; empty if none apply."
+            }
+        },
+        "required": ["answer", "sources"]
+    }
+}
+
+
+def retrieve_context(user_message, query_embedding=None):
+    """Retrieve relevant information from the knowledge base as prompt context.
+
+    Returns ``(context, urls)``, where ``urls`` are the citable URLs of the
+    passages packed into the context.
+    """
+    results = retriever.retrieve(user_message, CONTEXT_CANDIDATES, embedding=query_embedding)
+
+    # Dedupe, rerank and fit the retrieved passages into the context budget
+    context, urls, _ = pack_context(
+        user_message, results,
+        token_budget=CONTEXT_TOKEN_BUDGET,
+        min_score=CONTEXT_MIN_SCORE,
+        bm25_weight=CONTEXT_BM25_WEIGHT,
+        duplicate_similarity=CONTEXT_DUPLICATE_SIMILARITY,
+    )
+    return context, urls
+
+
+def build_request_body(context, user_message, session=None):
+    """Construct the Bedrock request body with the retrieved information.
+
+    Prior turns from ``session`` go before the question as chat messages,
+    and the summary of older turns goes in the system prompt.
+    """
+    # prompt = f"""You are a human like assistant.
+    # Based on the following information:\n\n{context}\n\nAnswer the question: {user_message}\n\nOnly use the information provided above to answer the question.
+    # Always provider the output in the following structure - 
+    # ans: answer_here,
+    # sources: [list of href links from the retreived information (could be multiple)]
+    # """
+    prompt = f"""Answer using the passages below; cite the Source URLs you used.
+    If it doesn't help, reply as a friendly assistant for greetings and small talk; otherwise only answer with a valid source.
+
+    {context}
+
+    Question: {user_message}"""
+
+    # Prepare the request body for Bedrock
+    request_body = {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": MAX_TOKENS,
+        "temperature": TEMPERATURE,
+        "tools": [ANSWER_TOOL],
+        "tool_choice": {"type": "tool", "name": ANSWER_TOOL["name"]},
+        "messages": history_messages(session) + [
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+    }
+    if session and session['summary']:
+        request_body["system"] = f"Summary of the earlier conversation with this user: {session['summary']}"
+    return request_body
 
-bedrock_agent_runtime = boto3.client('bedrock-agent-runtime',
-    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-    region_name=os.getenv('AWS_REGION')
-)
 
-bedrock_runtime = boto3.client('bedrock-runtime',
-    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-    region_name=os.getenv('AWS_REGION')
-)
+def check_sources(sources, allowed_urls):
+    """Keep only sources that match a retrieved passage's URL."""
+    allowed = {url.rstrip('/') for url in allowed_urls}
+    checked = []
+    for source in sources:
+        if not isinstance(source, str):
+            continue
+        source = source.strip()
+        if source.rstrip('/') in allowed and source not in checked:
+            checked.append(source)
+    if len(checked) < len(sources):
+        logger.info(f"Dropped {len(sources) - len(checked)} source(s) not found in the retrieved passages")
+        ANSWER_SOURCES_DROPPED.inc(len(sources) - len(checked))
+    return checked
+
+
+def parse_answer(tool_input, allowed_urls):
+    """Validate the answer tool input; returns ``(answer, sources, parsed_ok)``."""
+    if not isinstance(tool_input, dict) or not isinstance(tool_input.get('answer'), str):
+        return "Unable to parse answer correctly", [], False
+    sources = tool_input.get('sources')
+    sources = check_sources(sources if isinstance(sources, list) else [], allowed_urls)
+    return tool_input['answer'].strip(), sources, True
+
+
+def answer_from_response(response_body, allowed_urls):
+    """Pick the answer tool call out of an invoke_model response."""
+    for block in response_body['content']:
+        if block['type'] == 'tool_use' and block['name'] == ANSWER_TOOL['name']:
+            return parse_answer(block['input'], allowed_urls)
+    return parse_answer(None, allowed_urls)
+
+
+_ANSWER_KEY = re.compile(r'"answer"\s*:\s*"')
+_JSON_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+class AnswerStream:
+    """Incrementally pick the answer text out of the streamed tool input.
+
+    ``feed`` takes ``input_json_delta`` fragments and returns the newly
+    decoded characters of the "answer" string, so the reply can be shown
+    before the JSON is complete. ``text`` accumulates the raw JSON.
+    """
+
+    def __init__(self):
+        self.text = ''
+        self.pos = None  # index in self.text of the next undecoded answer character
+        self.started = False
+        self.finished = False
+
+    def feed(self, delta):
+        self.text += delta
+        if self.finished:
+            return ''
+        if self.pos is None:
+            match = _ANSWER_KEY.search(self.text)
+            if match is None:
+                return ''
+            self.pos = match.end()
+
+        chunk = []
+        i = self.pos
+        while i < len(self.text):
+            char = self.text[i]
+            if char == '"':
+                self.finished = True
+                break
+            if char == '\\':
+                # Wait for the rest of an escape sequence split across deltas
+                escape = self.text[i + 1:i + 2]
+                if not escape or (escape == 'u' and len(self.text) < i + 6):
+                    break
+                if escape == 'u':
+                    code = int(self.text[i + 2:i + 6], 16)
+                    if 0xD800 <= code < 0xDC00:
+                        if len(self.text) < i + 12:
+                            break
+                        chunk.append(json.loads(f'"{self.text[i:i + 12]}"'))
+                        i += 12
+                        continue
+                    chunk.append(chr(code))
+                    i += 6
+                    continue
+                chunk.append(_JSON_ESCAPES.get(escape, escape))
+                i += 2
+                continue
+            chunk.append(char)
+            i += 1
+        self.pos = i
 
-bedrock = boto3.client('bedrock-agent',
-    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-    region_name=os.getenv('AWS_REGION')
-)
+        text = ''.join(chunk)
+        if not self.started:
+            text = text.lstrip()
+            self.started = bool(text)
+        return text
 
+    def result(self, allowed_urls):
+        try:
+            tool_input = json.loads(self.text)
+        except json.JSONDecodeError:
+            tool_input = None
+        return parse_answer(tool_input, allowed_urls)
 
-def fetch_files_from_pinata():
-    """Fetch files from Pinata and return their content."""
-    url = "https://api.pinata.cloud/data/pinList"
-    headers = {
-        "Authorization": f"Bearer {PINATA_JWT}"
-    }
-    
-    params = {
-        "status": "pinned",
-        "pageLimit": 100,  # Adjust the limit as needed (max is usually 1000)
-        "pageOffset": 0     # Start from the first page
-    }
 
-    files = []
-    
-    while True:
-        response = requests.get(url, headers=headers, params=params, verify=False)
-        response.raise_for_status()
-        
-        data = response.json()
-        files.extend(data['rows'])
-
-        # Check if we've received the maximum number of files and if we should continue
-        if len(data['rows']) < params['pageLimit']:  # Change 'limit' to 'pageLimit'
-            break  # Exit loop if no more files are returned
-        
-        # Update pageOffset for the next request
-        params['pageOffset'] += params['pageLimit']
-
-    # Fetch content for each file
-    file_contents = []
-    for item in files:
-        file_url = f"https://gateway.pinata.cloud/ipfs/{item['ipfs_pin_hash']}"
-        file_content = requests.get(file_url, verify=False).text
-        file_contents.append({
-            'name': item['metadata']['name'],
-            'content': file_content
-        })
-
-    return file_contents
-
-def sync_files_with_s3():
-    """Sync Pinata files with S3 bucket only if there are changes."""
-    logger.info("Starting sync process")
-    files = fetch_files_from_pinata()
-    logger.info(f"Fetched {len(files)} files from Pinata")
-
-    # Keep track of files already in S3
-    s3_files = {}
-    for file in files:
-        file_name = file['name']
-        file_content = file['content'].encode('utf-8')
-        local_size = len(file_content)
-
-        # Check if file exists in S3
-        try:
-            s3_object = s3_client.head_object(Bucket=S3_BUCKET_NAME, Key=file_name)
-            s3_etag = s3_object['ETag'].strip('"')
-            s3_size = s3_object['ContentLength']
-            s3_files[file_name] = (s3_etag, s3_size)  # Store ETag and size for comparison
-        except ClientError as e:
-            if e.response['Error']['Code'] == '404':
-                # File does not exist in S3, mark it for upload
-                s3_files[file_name] = (None, 0)
-                logger.info(f"File {file_name} not found in S3. Marking for upload.")
-                continue
-            else:
-                logger.error(f"Error accessing S3 for {file_name}: {e}")
-                continue
-        # Check if file exists in S3
-        try:
-            s3_object = s3_client.head_object(Bucket=S3_BUCKET_NAME, Key=file_name)
-            s3_etag = s3_object['ETag'].strip('"')
-            s3_size = s3_object['ContentLength']
-            s3_files[file_name] = (s3_etag, s3_size)  # Store ETag and size for comparison
-        except ClientError as e:
-            if e.response['Error']['Code'] == '404':
-                # File does not exist in S3, mark it for upload
-                s3_files[file_name] = (None, 0)
-                logger.info(f"File {file_name} not found in S3. Marking for upload.")
-                continue
-            else:
-                logger.error(f"Error accessing S3 for {file_name}: {e}")
-                continue
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-    # Compare and upload/update files only if there are changes
-    for file in files:
-        file_name = file['name']
-        file_content = file['content'].encode('utf-8')
-        local_size = len(file_content)
 
-        s3_etag, s3_size = s3_files[file_name]
+def estimate_tokens(request_body):
+    """Upper-bound token cost of a call for the TPM limiter (~4 chars per token)."""
+    prompt_chars = len(request_body.get('system', ''))
+    prompt_chars += sum(len(message['content']) for message in request_body['messages'])
+    return prompt_chars // 4 + request_body['max_tokens']
 
-        # If file does not exist in S3, upload it
-        if s3_etag is None:
-            logger.info(f"Uploading {file_name} to S3...")
-            s3_client.put_object(Bucket=S3_BUCKET_NAME, Key=file_name, Body=file_content)
-            logger.info(f"File {file_name} uploaded successfully.")
-            continue
-        
-        # If sizes match, check for content equality
-        if local_size == s3_size:
-            existing_s3_content = s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=file_name)['Body'].read()
-            if existing_s3_content == file_content:
-                logger.info(f"File {file_name} is already up to date in S3.")
-                continue
-        
-        # If we reach here, we need to upload/update
-        logger.info(f"Uploading/updating {file_name} in S3...")
-        s3_client.put_object(Bucket=S3_BUCKET_NAME, Key=file_name, Body=file_content)
-        logger.info(f"File {file_name} uploaded/updated successfully.")
 
-    logger.info("Sync process completed")
+def call_model(request_body, stage):
+    """Call the model within the account's quotas and return the response body."""
+    waiting_since = time.perf_counter()
+    with bedrock_gate.admit(estimate_tokens(request_body)) as settle:
+        CHAT_STAGE_SECONDS.labels(stage='admission_wait').observe(time.perf_counter() - waiting_since)
+        with span(CHAT_STAGE_SECONDS, stage):
+            response = bedrock_runtime.invoke_model(
+                modelId=BEDROCK_MODEL_ID,
+                body=json.dumps(request_body)
+            )
+            response_body = json.loads(response['body'].read())
+        usage = response_body.get('usage')
+        record_usage(usage)
+        settle(usage['input_tokens'] + usage['output_tokens'] if usage else None)
+    return response_body
 
 
-def sync_knowledge_base():
-    """Sync AWS Bedrock knowledge base."""
-    try:
-        response = bedrock.start_ingestion_job(
-            knowledgeBaseId=KNOWLEDGE_BASE_ID,
-            dataSourceId=DATA_SOURCE_ID,
-        )
-        job_id = response['ingestionJob']['ingestionJobId']
-        print(f"Knowledge base sync started. Job ID: {job_id}")
-
-        # Wait for the ingestion job to complete
-        while True:
-            try:
-                job_status = bedrock.get_ingestion_job(
-                    dataSourceId=DATA_SOURCE_ID,
-                    knowledgeBaseId=KNOWLEDGE_BASE_ID,
-                    ingestionJobId=job_id
-                )['ingestionJob']['status']
-                
-                if job_status == 'COMPLETE':
-                    print("Knowledge base sync completed successfully.")
-                    break
-                elif job_status in ['FAILED', 'STOPPED']:
-                    print(f"Knowledge base sync {job_status}.")
-                    break
-                else:
-                    print(f"Knowledge base sync in progress. Status: {job_status}")
-                    time.sleep(5) 
-            except ClientError as e:
-                print(f"Error checking ingestion job status: {e}")
-                break
+def invoke_text(request_body, stage):
+    """Call the model and return its text output."""
+    return call_model(request_body, stage)['content'][0]['text']
 
-    except ClientError as e:
-        print(f"Error starting ingestion job: {e}")
-    except Exception as e:
-        print(f"Unexpected error syncing knowledge base: {e}")
+
+def generate_answer(user_message, query_embedding=None, retrieval_query=None, session=None):
+    """Retrieve context and ask the model; returns ``(result, parsed_ok)``."""
+    with span(CHAT_STAGE_SECONDS, 'retrieve'):
+        context, urls = retrieve_context(retrieval_query or user_message, query_embedding)
+    request_body = build_request_body(context, user_message, session)
+
+    # Call Bedrock API for model inference
+    response_body = call_model(request_body, 'invoke_model')
+
+    # Parse the response
+    with span(CHAT_STAGE_SECONDS, 'parse'):
+        answer, sources, parsed = answer_from_response(response_body, urls)
+
+    return {
+        'response': answer,
+        'sources': sources
+    }, parsed
+
+
+def start_turn(session_id, user_message):
+    """Load the session and pick the retrieval query for ``user_message``.
+
+    Returns ``(session, retrieval_query)``. Follow-ups that lean on earlier
+    turns ("what about frozen ones?") are rewritten into a standalone
+    question; self-contained messages are used as-is, without a model call.
+    """
+    session = session_store.get(session_id) or new_session()
+    if not needs_rewrite(session, user_message):
+        return session, user_message
+    request_body = build_rewrite_request(session, user_message, SESSION_REWRITE_MAX_TOKENS)
+    rewritten = invoke_text(request_body, 'rewrite_query').strip()
+    logger.info(f"Rewrote follow-up question to: {rewritten}")
+    return session, rewritten or user_message
 
 
-#  Sync files and knowledge base before starting the server
-sync_files_with_s3()
-sync_knowledge_base()
+def remember_turn(session_id, session, user_message, result):
+    session['turns'].append({'user': user_message, 'answer': result['response'], 'sources': result['sources']})
+    session_store.save(session_id, session)
+
+
+def compact_session(session_id, session):
+    """Fold the turns that no longer fit the history budget into the summary.
+
+    Runs after the answer has been sent, so summarizing doesn't add latency.
+    """
+    older, recent = split_history(session['turns'], SESSION_HISTORY_TOKENS)
+    if not older:
+        return
+    try:
+        request_body = build_summary_request(session, older, SESSION_SUMMARY_MAX_TOKENS)
+        session['summary'] = invoke_text(request_body, 'summarize').strip()
+    except Exception as e:
+        # Still drop the older turns so the prompt stays bounded
+        logger.warning(f"Failed to summarize session {session_id}: {e}")
+    session['turns'] = recent
+    session_store.save(session_id, session)
+
+
+def lookup_cache(user_message):
+    """Return ``(cached_result, query_embedding)`` from the response cache."""
+    if response_cache is None:
+        return None, None
+    with span(CHAT_STAGE_SECONDS, 'cache_lookup'):
+        cached, query_embedding = response_cache.get(user_message)
+    if cached is None:
+        RESPONSE_CACHE_LOOKUPS.labels(result='miss').inc()
+    else:
+        # Exact hits return before the query is embedded
+        RESPONSE_CACHE_LOOKUPS.labels(result='exact' if query_embedding is None else 'semantic').inc()
+    return cached, query_embedding
+
+
+def error_response(e):
+    """Map an exception from the chat pipeline to a JSON error response."""
+    if isinstance(e, Overloaded):
+        ADMISSION_SHED.labels(reason=e.kind).inc()
+        return jsonify({'error': 'The service is busy, please try again shortly.'}), 503, {'Retry-After': str(e.retry_after)}
+    if isinstance(e, ClientError) and e.response['Error']['Code'] == 'ThrottlingException':
+        return jsonify({'error': 'The service is busy, please try again shortly.'}), 429, {'Retry-After': '2'}
+    return jsonify({
+        'error': 'An error occurred while processing your request.'
+    }), 500
+
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
     user_message = request.json.get('message')
+    session_id = request.json.get('session_id') or new_session_id()
     
     try:
-        # First, retrieve relevant information from the knowledge base
-        retrieve_response = bedrock_agent_runtime.retrieve(
-            knowledgeBaseId=KNOWLEDGE_BASE_ID,
-            retrievalQuery={
-                'text': user_message
-            },
-            retrievalConfiguration={
-                'vectorSearchConfiguration': {
-                    'numberOfResults': 3
-                }
-            }
-        )
-
-        # Extract the retrieved passages
-        retrieved_passages = [result['content']['text'] if 'text' in result['content'] else str(result['content']) for result in retrieve_response['retrievalResults']]
-
-        # Construct the prompt with retrieved information
-        context = "\n".join(retrieved_passages)
-        # prompt = f"""You are a human like assistant.
-        # Based on the following information:\n\n{context}\n\nAnswer the question: {user_message}\n\nOnly use the information provided above to answer the question.
-        # Always provider the output in the following structure - 
-        # ans: answer_here,
-        # sources: [list of href links from the retreived information (could be multiple)]
-        # """
-        prompt = f"""
-        You are a human-like assistant.
-        Based on the following information:\n\n{context}\n\nAnswer the question: {user_message}
-
-        If the information provided above doesn't help answer the question, respond as a friendly assistant, especially for greetings, small talk, or common phrases, if not answer only with a valid source.
-
-        Always provide the output in the following structure:
-        ans: answer_here,
-        sources: [list of href links from the retrieved information (could be multiple) or 'No specific sources for general knowledge' if no sources are applicable]
-        """
-
-        # Prepare the request body for Bedrock
-        request_body = {
-            "anthropic_version": "bedrock-2023-05-31",
-            "max_tokens": MAX_TOKENS,
-            "temperature": TEMPERATURE,
-            "messages": [
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-        }
-
-        # Call Bedrock API for model inference
-        response = bedrock_runtime.invoke_model(
-            modelId=BEDROCK_MODEL_ID,
-            body=json.dumps(request_body)
-        )
-
-        # Parse the response
-        response_body = json.loads(response['body'].read())
-        ai_response = response_body['content'][0]['text']
-
-        # Extract answer (everything after "ans:" and before "sources:")
-        ans_start = ai_response.find("ans:")
-        sources_start = ai_response.find("sources:")
-        
-        if ans_start != -1 and sources_start != -1:
-            answer = ai_response[ans_start + 4:sources_start].strip()
+        session, retrieval_query = start_turn(session_id, user_message)
+        has_history = bool(session['turns'] or session['summary'])
+
+        # Serve repeated and near-identical questions from the cache
+        cached, query_embedding = lookup_cache(retrieval_query)
+        if cached is not None:
+            result, parsed = cached, False
+        elif has_history:
+            result, parsed = generate_answer(user_message, query_embedding, retrieval_query, session)
         else:
-            answer = "Unable to parse answer correctly"
+            # Identical questions already in flight share one model call
+            result, parsed = inflight_queries.do(
+                normalize_query(user_message),
+                lambda: generate_answer(user_message, query_embedding)
+            )
+
+        # Don't cache answers the model failed to format, or that depend on history
+        if response_cache is not None and parsed and not has_history:
+            response_cache.put(retrieval_query, result, embedding=query_embedding)
+        remember_turn(session_id, session, user_message, result)
+
+        with span(CHAT_STAGE_SECONDS, 'respond'):
+            response = jsonify({**result, 'session_id': session_id})
+        response.call_on_close(lambda: compact_session(session_id, session))
+        return response
 
-        # Extract sources as a list
-        sources = []
-        if sources_start != -1:
-            sources_str = ai_response[sources_start + 8:].strip()
-            if sources_str.startswith('[') and sources_str.endswith(']'):
-                sources = [s.strip(' "[]') for s in sources_str[1:-1].split(',')]
+    except Exception as e:
+        logger.error(f"Error processing request: {e}")
+        return error_response(e)
 
-        return jsonify({
-            'response': answer,
-            'sources': sources
-        })
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Stream the answer as Server-Sent Events.
 
-    except Exception as e:
-        print(f"Error processing request: {e}")
-        return jsonify({
-            'error': 'An error occurred while processing your request.'
-        }), 500
+    Emits ``delta`` events with answer text as the model generates it, then
+    one ``done`` event with the parsed response, sources and session id (or
+    ``error``).
+    """
+    user_message = request.json.get('message')
+    session_id = request.json.get('session_id') or new_session_id()
+    turn = {}
+
+    def generate():
+        try:
+            session, retrieval_query = start_turn(session_id, user_message)
+            turn['session'] = session
+            has_history = bool(session['turns'] or session['summary'])
+
+            cached, query_embedding = lookup_cache(retrieval_query)
+            if cached is not None:
+                remember_turn(session_id, session, user_message, cached)
+                yield sse('delta', {'text': cached['response']})
+                yield sse('done', {**cached, 'session_id': session_id})
+                return
+
+            with span(CHAT_STAGE_SECONDS, 'retrieve'):
+                context, urls = retrieve_context(retrieval_query, query_embedding)
+            request_body = build_request_body(context, user_message, session)
+
+            # The admission slot is held for the whole stream
+            answer_stream = AnswerStream()
+            waiting_since = time.perf_counter()
+            with bedrock_gate.admit(estimate_tokens(request_body)) as settle:
+                started = time.perf_counter()
+                CHAT_STAGE_SECONDS.labels(stage='admission_wait').observe(started - waiting_since)
+                response = bedrock_runtime.invoke_model_with_response_stream(
+                    modelId=BEDROCK_MODEL_ID,
+                    body=json.dumps(request_body)
+                )
+
+                usage = {'input_tokens': 0, 'output_tokens': 0}
+                first_token = True
+                for event in response['body']:
+                    chunk = json.loads(event['chunk']['bytes'])
+                    if chunk['type'] == 'message_start':
+                        usage['input_tokens'] = chunk['message'].get('usage', {}).get('input_tokens', 0)
+                    elif chunk['type'] == 'message_delta':
+                        usage['output_tokens'] = chunk.get('usage', {}).get('output_tokens', 0)
+                    elif chunk['type'] == 'content_block_delta' and chunk['delta']['type'] == 'input_json_delta':
+                        if first_token:
+                            CHAT_STAGE_SECONDS.labels(stage='first_token').observe(time.perf_counter() - started)
+                            first_token = False
+                        text = answer_stream.feed(chunk['delta']['partial_json'])
+                        if text:
+                            yield sse('delta', {'text': text})
+                CHAT_STAGE_SECONDS.labels(stage='invoke_model_stream').observe(time.perf_counter() - started)
+                record_usage(usage)
+                settle(usage['input_tokens'] + usage['output_tokens'] or None)
+
+            answer, sources, parsed = answer_stream.result(urls)
+            result = {
+                'response': answer,
+                'sources': sources
+            }
+            if response_cache is not None and parsed and not has_history:
+                response_cache.put(retrieval_query, result, embedding=query_embedding)
+            remember_turn(session_id, session, user_message, result)
+            yield sse('done', {**result, 'session_id': session_id})
+
+        except Exception as e:
+            logger.error(f"Error processing request: {e}")
+            body, status = error_response(e)[:2]
+            yield sse('error', {**body.get_json(), 'status': status})
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+    # Compact once the client has the whole stream, as chat() does
+    response.call_on_close(lambda: 'session' in turn and compact_session(session_id, turn['session']))
+    return response
 
 if __name__ == '__main__':
     app.run(debug=False)
@@ -0,0 +1,118 @@
+# Prometheus metrics, timing spans and request IDs for the API and the
+# sync worker. OpenTelemetry tracing is enabled when the SDK and OTLP
+# exporter are installed and OTEL_EXPORTER_OTLP_ENDPOINT is set.
+import os
+import time
+import uuid
+import logging
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess, REGISTRY,
+)
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+except ImportError:
+    trace = None
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+
+CHAT_STAGE_SECONDS = Histogram(
+    'dchat_chat_stage_seconds', 'Time spent in each stage of a chat request', ['stage'], buckets=LATENCY_BUCKETS)
+SYNC_STAGE_SECONDS = Histogram(
+    'dchat_sync_stage_seconds', 'Time spent in each stage of a sync run', ['stage'], buckets=LATENCY_BUCKETS)
+HTTP_REQUESTS = Counter(
+    'dchat_http_requests_total', 'API requests by endpoint and HTTP status', ['endpoint', 'status'])
+BEDROCK_TOKENS = Counter(
+    'dchat_bedrock_tokens_total', 'Tokens reported in Bedrock response usage', ['direction'])
+RESPONSE_CACHE_LOOKUPS = Counter(
+    'dchat_response_cache_lookups_total', 'Response cache lookups by result', ['result'])
+ADMISSION_SHED = Counter(
+    'dchat_admission_shed_total', 'Model calls shed by admission control', ['reason'])
+ANSWER_SOURCES_DROPPED = Counter(
+    'dchat_answer_sources_dropped_total', 'Cited sources not found among the retrieved passages')
+CONTEXT_PASSAGES_DROPPED = Counter(
+    'dchat_context_passages_dropped_total', 'Retrieved passages left out of the prompt context', ['reason'])
+RETRIEVAL_CACHE_LOOKUPS = Counter(
+    'dchat_retrieval_cache_lookups_total', 'Retrieval cache lookups by result', ['result'])
+RETRIEVAL_CACHE_SAVED_SECONDS = Counter(
+    'dchat_retrieval_cache_saved_seconds_total', 'Retrieval latency avoided by cache hits')
+RETRIEVAL_CACHE_REFRESHES = Counter(
+    'dchat_retrieval_cache_refreshes_total', 'Background retrieval cache refreshes by result', ['result'])
+
+_tracer = None
+
+
+def setup_tracing(service_name):
+    """Export spans over OTLP when configured; a no-op otherwise."""
+    global _tracer
+    if trace is None or not os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT'):
+        return
+    provider = TracerProvider(resource=Resource.create({'service.name': service_name}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer(service_name)
+    logger.info("OpenTelemetry tracing enabled")
+
+
+@contextmanager
+def span(histogram, stage, **attributes):
+    """Time a stage into ``histogram`` and, when tracing is on, an OTel span."""
+    start = time.perf_counter()
+    otel_span = _tracer.start_as_current_span(stage, attributes=attributes) if _tracer else None
+    if otel_span is not None:
+        otel_span.__enter__()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        histogram.labels(stage=stage).observe(elapsed)
+        if otel_span is not None:
+            otel_span.__exit__(None, None, None)
+        logger.debug(f"stage={stage} seconds={elapsed:.4f}")
+
+
+def record_usage(usage):
+    """Count input/output tokens from a Bedrock ``usage`` dict."""
+    if usage:
+        BEDROCK_TOKENS.labels(direction='input').inc(usage.get('input_tokens', 0))
+        BEDROCK_TOKENS.labels(direction='output').inc(usage.get('output_tokens', 0))
+
+
+def render_metrics():
+    """Return ``(body, content_type)`` for a /metrics response.
+
+    Under gunicorn set PROMETHEUS_MULTIPROC_DIR so all workers are aggregated.
+    """
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def new_request_id(incoming=None):
+    """Reuse a sane caller-supplied ID (e.g. from a load balancer) or mint one."""
+    if incoming and len(incoming) <= 128 and incoming.replace('-', '').isalnum():
+        return incoming
+    return uuid.uuid4().hex
+
+
+class RequestIdFilter(logging.Filter):
+    """Adds ``request_id`` to log records (``-`` outside a request)."""
+
+    def filter(self, record):
+        try:
+            from flask import g, has_request_context
+            record.request_id = g.get('request_id', '-') if has_request_context() else '-'
+        except ImportError:
+            record.request_id = '-'
+        return True
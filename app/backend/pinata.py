@@ -0,0 +1,123 @@
+# Pinata API / IPFS gateway client used by the sync worker.
+import json
+import logging
+import requests
+import urllib3
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import PINATA_JWT, PINATA_API_URL, PINATA_GATEWAY_URL, PINATA_FETCH_WORKERS, PINATA_PIN_SOURCE
+
+logger = logging.getLogger(__name__)
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def create_session(pool_size=PINATA_FETCH_WORKERS, retries=5, backoff_factor=0.5):
+    """Build a keep-alive session sized for ``pool_size`` concurrent requests.
+
+    Gateway 429/5xx responses are retried with exponential backoff, honouring
+    Retry-After when the gateway sends it.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET']),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.verify = False
+    return session
+
+
+def list_pins(session, page_limit=1000, api_url=PINATA_API_URL):
+    """Yield every pinned item from ``pinList``, one page at a time."""
+    url = f"{api_url}/data/pinList"
+    headers = {
+        "Authorization": f"Bearer {PINATA_JWT}"
+    }
+    params = {
+        "status": "pinned",
+        "pageLimit": page_limit,
+        "pageOffset": 0
+    }
+    # Only sync pins uploaded by the data pipeline when a source is configured
+    if PINATA_PIN_SOURCE:
+        params["metadata[keyvalues]"] = json.dumps({"source": {"value": PINATA_PIN_SOURCE, "op": "eq"}})
+
+    while True:
+        response = session.get(url, headers=headers, params=params)
+        response.raise_for_status()
+        rows = response.json()['rows']
+        yield from rows
+
+        # A short page means we've reached the end
+        if len(rows) < page_limit:
+            break
+        params['pageOffset'] += page_limit
+
+
+def fetch_pin(session, pin, gateway_url=PINATA_GATEWAY_URL):
+    """Download one pin's content from the gateway and return ``(name, bytes)``."""
+    response = session.get(f"{gateway_url}/ipfs/{pin['ipfs_pin_hash']}")
+    response.raise_for_status()
+    return pin['metadata']['name'], response.content
+
+
+def open_pin(session, pin, gateway_url=PINATA_GATEWAY_URL):
+    """Open a streaming gateway response for ``pin``; read it via ``response.raw``.
+
+    Use it as a context manager so the connection goes back to the pool.
+    """
+    response = session.get(f"{gateway_url}/ipfs/{pin['ipfs_pin_hash']}", stream=True)
+    response.raise_for_status()
+    response.raw.decode_content = True
+    return response
+
+
+def map_pins(fn, pins, max_workers=PINATA_FETCH_WORKERS):
+    """Run ``fn(pin)`` on a thread pool and yield each result as it finishes.
+
+    At most ``max_workers`` calls are in flight, so ``pins`` may be a lazy
+    iterator (e.g. ``list_pins``) and results are never all held at once.
+    Pins whose call still fails (after the session's retries) are logged
+    and skipped.
+    """
+    pins = iter(pins)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = {}
+
+        def submit_next():
+            pin = next(pins, None)
+            if pin is None:
+                return False
+            in_flight[executor.submit(fn, pin)] = pin
+            return True
+
+        for _ in range(max_workers):
+            if not submit_next():
+                break
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                pin = in_flight.pop(future)
+                submit_next()
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to process {pin['metadata']['name']} ({pin['ipfs_pin_hash']}): {e}")
+                    continue
+                yield result
+
+
+def iter_pin_contents(pins, session, max_workers=PINATA_FETCH_WORKERS, gateway_url=PINATA_GATEWAY_URL):
+    """Download ``pins`` concurrently and yield ``(name, bytes)`` as each finishes."""
+    return map_pins(lambda pin: fetch_pin(session, pin, gateway_url), pins, max_workers)
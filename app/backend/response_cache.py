@@ -0,0 +1,152 @@
+# Two-tier response cache for /api/chat: exact match on the normalized
+# query, then nearest cached query by embedding cosine similarity.
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text):
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return _WHITESPACE.sub(' ', _PUNCTUATION.sub(' ', text.lower())).strip()
+
+
+class ResponseCache:
+    """LRU + TTL cache of chat responses with an exact and a semantic tier.
+
+    ``embed`` maps a string to a unit-length vector. Embeddings are kept in
+    one preallocated float32 matrix so a semantic lookup is a single
+    matrix-vector product. ``version`` returns the current version of what
+    the retriever searches (knowledge base ingestion or local index build);
+    when it changes every entry is dropped, since answers may differ.
+    """
+
+    def __init__(self, embed, max_entries=1000, ttl=3600, threshold=0.92, version=None):
+        self.embed = embed
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.version = version or (lambda: None)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # normalized query -> (value, expires_at, slot)
+        self._matrix = None
+        self._slot_keys = [None] * max_entries
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+        self._version = None
+        self.stats = {'exact_hits': 0, 'semantic_hits': 0, 'misses': 0, 'invalidations': 0, 'embedding_errors': 0}
+
+    def get(self, query):
+        """Return ``(value, embedding)``; ``value`` is None on a miss.
+
+        Pass the returned embedding to ``put`` so a miss is embedded once.
+        """
+        key = normalize_query(query)
+        with self._lock:
+            self._check_version()
+            value = self._get_exact(key)
+            if value is not None:
+                self.stats['exact_hits'] += 1
+                return value, None
+
+        embedding = self._embed(key)
+        with self._lock:
+            if embedding is not None:
+                value = self._get_semantic(embedding)
+                if value is not None:
+                    self.stats['semantic_hits'] += 1
+                    return value, embedding
+            self.stats['misses'] += 1
+        return None, embedding
+
+    def put(self, query, value, embedding=None):
+        key = normalize_query(query)
+        with self._lock:
+            self._check_version()
+            self._remove(key)
+            while len(self._entries) >= self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+            slot = None
+            if embedding is not None:
+                vector = np.asarray(embedding, dtype=np.float32)
+                if self._matrix is None:
+                    self._matrix = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+                slot = self._free_slots.pop()
+                self._matrix[slot] = vector
+                self._slot_keys[slot] = key
+            self._entries[key] = (value, time.monotonic() + self.ttl, slot)
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def snapshot(self):
+        """Return hit/miss counters, hit rate and size for tuning the threshold."""
+        with self._lock:
+            stats = dict(self.stats)
+            lookups = stats['exact_hits'] + stats['semantic_hits'] + stats['misses']
+            stats['hit_rate'] = (stats['exact_hits'] + stats['semantic_hits']) / lookups if lookups else 0.0
+            stats['entries'] = len(self._entries)
+            stats['threshold'] = self.threshold
+            return stats
+
+    def _embed(self, key):
+        try:
+            return self.embed(key)
+        except Exception as e:
+            logger.warning(f"Query embedding failed, skipping semantic cache: {e}")
+            with self._lock:
+                self.stats['embedding_errors'] += 1
+            return None
+
+    def _get_exact(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] < time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def _get_semantic(self, embedding):
+        if self._matrix is None or not self._entries:
+            return None
+        # Free slots hold zero vectors, so they can never clear the threshold
+        scores = self._matrix @ np.asarray(embedding, dtype=np.float32)
+        slot = int(np.argmax(scores))
+        if scores[slot] < self.threshold or self._slot_keys[slot] is None:
+            return None
+        return self._get_exact(self._slot_keys[slot])
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None and entry[2] is not None:
+            slot = entry[2]
+            self._matrix[slot] = 0.0
+            self._slot_keys[slot] = None
+            self._free_slots.append(slot)
+
+    def _check_version(self):
+        version = self.version()
+        if version != self._version:
+            if self._entries:
+                logger.info(f"Retrieval version changed to {version}, clearing response cache")
+                self.stats['invalidations'] += 1
+            self._clear()
+            self._version = version
+
+    def _clear(self):
+        self._entries.clear()
+        self._slot_keys = [None] * self.max_entries
+        self._free_slots = list(range(self.max_entries - 1, -1, -1))
+        if self._matrix is not None:
+            self._matrix[:] = 0.0
@@ -0,0 +1,124 @@
+# Cache of retriever results, shared by every prompt and answer variant that
+# retrieves for the same question. Entries are keyed on the normalized query
+# and the knowledge base version, and hot entries are refreshed in the
+# background once they go stale instead of blocking a request.
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import RETRIEVAL_CACHE_LOOKUPS, RETRIEVAL_CACHE_SAVED_SECONDS, RETRIEVAL_CACHE_REFRESHES
+from response_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+
+class CachedRetriever:
+    """Wraps a retriever (see retrievers.py) with an LRU stale-while-revalidate cache.
+
+    Results younger than ``ttl`` are served as-is. Results up to
+    ``ttl + stale_ttl`` old are served too, and one background refresh is
+    started for them. ``version`` returns the current knowledge base
+    version; entries from other versions are never served.
+    """
+
+    def __init__(self, retriever, max_entries=5000, ttl=600, stale_ttl=3600, version=None, refresh_workers=2):
+        self.retriever = retriever
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.version = version or (lambda: None)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (normalized query, k) -> (results, fetched_at, latency)
+        self._refreshing = set()
+        self._refresher = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix='retrieval-refresh')
+        self._version = None
+        self.stats = {'fresh_hits': 0, 'stale_hits': 0, 'misses': 0, 'refreshes': 0, 'refresh_errors': 0,
+                      'invalidations': 0, 'saved_seconds': 0.0}
+
+    def retrieve(self, query, k, embedding=None):
+        key = (normalize_query(query), k)
+        version = self.version()
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                results, fetched_at, latency = entry
+                age = time.monotonic() - fetched_at
+                if age < self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    stale = age >= self.ttl
+                    self._record_hit('stale' if stale else 'fresh', latency)
+                    if stale and key not in self._refreshing:
+                        self._refreshing.add(key)
+                        self._refresher.submit(self._refresh, key, query, version)
+                    return results
+                del self._entries[key]
+            self.stats['misses'] += 1
+        RETRIEVAL_CACHE_LOOKUPS.labels(result='miss').inc()
+
+        results, latency = self._fetch(query, k, embedding)
+        self._store(key, results, latency, version)
+        return results
+
+    def snapshot(self):
+        """Return hit/miss counters, hit rate, saved time and size."""
+        with self._lock:
+            stats = dict(self.stats)
+            hits = stats['fresh_hits'] + stats['stale_hits']
+            lookups = hits + stats['misses']
+            stats['hit_rate'] = hits / lookups if lookups else 0.0
+            stats['entries'] = len(self._entries)
+            return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _fetch(self, query, k, embedding=None):
+        start = time.perf_counter()
+        results = self.retriever.retrieve(query, k, embedding=embedding)
+        return results, time.perf_counter() - start
+
+    def _refresh(self, key, query, version):
+        try:
+            results, latency = self._fetch(query, key[1])
+            self._store(key, results, latency, version)
+            RETRIEVAL_CACHE_REFRESHES.labels(result='ok').inc()
+            with self._lock:
+                self.stats['refreshes'] += 1
+        except Exception as e:
+            # Keep serving the stale entry until it expires
+            logger.warning(f"Background retrieval refresh failed: {e}")
+            RETRIEVAL_CACHE_REFRESHES.labels(result='error').inc()
+            with self._lock:
+                self.stats['refresh_errors'] += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _store(self, key, results, latency, version):
+        with self._lock:
+            # Don't let a slow fetch from before a sync overwrite the new version
+            if version != self._version:
+                return
+            self._entries.pop(key, None)
+            while len(self._entries) >= self.max_entries:
+                self._entries.popitem(last=False)
+            self._entries[key] = (results, time.monotonic(), latency)
+
+    def _record_hit(self, result, latency):
+        # A hit saves roughly what the original fetch cost
+        self.stats[f'{result}_hits'] += 1
+        self.stats['saved_seconds'] += latency
+        RETRIEVAL_CACHE_LOOKUPS.labels(result=result).inc()
+        RETRIEVAL_CACHE_SAVED_SECONDS.inc(latency)
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._entries:
+                logger.info(f"Knowledge base version changed to {version}, clearing retrieval cache")
+                self.stats['invalidations'] += 1
+            self._entries.clear()
+            self._version = version
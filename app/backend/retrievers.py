@@ -0,0 +1,52 @@
+# Retrievers return passages in the shape of Bedrock's retrievalResults:
+# [{'content': {'text': ...}, 'location': {...}, 'score': ...}]
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BedrockRetriever:
+    """Retrieve from the Bedrock knowledge base (one network round trip)."""
+
+    def __init__(self, client, knowledge_base_id):
+        self.client = client
+        self.knowledge_base_id = knowledge_base_id
+
+    def retrieve(self, query, k, embedding=None):
+        response = self.client.retrieve(
+            knowledgeBaseId=self.knowledge_base_id,
+            retrievalQuery={
+                'text': query
+            },
+            retrievalConfiguration={
+                'vectorSearchConfiguration': {
+                    'numberOfResults': k
+                }
+            }
+        )
+        return response['retrievalResults']
+
+
+class LocalRetriever:
+    """Retrieve from the in-process memory-mapped index (see local_index.py).
+
+    Queries must be embedded with the model the index was built with. Pass
+    ``embedding`` when the caller already has one (e.g. from the response
+    cache) to skip the embedding call.
+    """
+
+    def __init__(self, index, embed):
+        self.index = index
+        self.embed = embed
+
+    def retrieve(self, query, k, embedding=None):
+        if embedding is None:
+            embedding = self.embed(query)
+        return [
+            {
+                'content': {'text': chunk['text']},
+                'location': {'type': 'WEB', 'webLocation': {'url': chunk['href']}},
+                'score': score,
+            }
+            for chunk, score in self.index.search(embedding, k)
+        ]
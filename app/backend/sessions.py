@@ -0,0 +1,165 @@
+# Server-side conversation sessions for /api/chat: a bounded store of
+# recent turns plus a running summary of older ones, so follow-up questions
+# work without the client re-sending the conversation.
+import re
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Words that usually point back into the conversation ("what about it?")
+_FOLLOW_UP = re.compile(
+    r"\b(it|its|it's|that|this|these|those|they|them|their|there|he|she|him|her|same|above|previous|else)\b"
+    r"|^(and|or|but|also|what about|how about)\b",
+    re.IGNORECASE,
+)
+
+
+def count_tokens(text):
+    """Rough token count (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+def new_session():
+    return {'summary': '', 'turns': []}
+
+
+def turn_tokens(turn):
+    return count_tokens(turn['user']) + count_tokens(turn['answer'])
+
+
+def history_messages(session):
+    """Alternating user/assistant messages for the turns kept in the session."""
+    messages = []
+    for turn in session['turns'] if session else []:
+        messages.append({'role': 'user', 'content': turn['user']})
+        messages.append({'role': 'assistant', 'content': turn['answer']})
+    return messages
+
+
+def split_history(turns, budget):
+    """Split turns into ``(older, recent)``; ``recent`` is the newest turns within ``budget`` tokens."""
+    used = 0
+    keep = len(turns)
+    while keep > 0 and used + turn_tokens(turns[keep - 1]) <= budget:
+        used += turn_tokens(turns[keep - 1])
+        keep -= 1
+    return turns[:keep], turns[keep:]
+
+
+def needs_rewrite(session, user_message):
+    """A message needs rewriting for retrieval only if it leans on earlier turns."""
+    if not session or not (session['turns'] or session['summary']):
+        return False
+    return len(user_message.split()) <= 3 or bool(_FOLLOW_UP.search(user_message.strip()))
+
+
+def _transcript(session, turns):
+    lines = []
+    if session['summary']:
+        lines.append(f"Summary of earlier conversation: {session['summary']}")
+    for turn in turns:
+        lines.append(f"User: {turn['user']}")
+        lines.append(f"Assistant: {turn['answer']}")
+    return "\n".join(lines)
+
+
+def build_rewrite_request(session, user_message, max_tokens):
+    """Request body asking the model for a standalone retrieval query."""
+    prompt = f"""{_transcript(session, session['turns'][-2:])}
+
+    Rewrite the user's next message as a standalone question that can be understood without the conversation above.
+    Next message: {user_message}
+
+    Reply with the rewritten question only."""
+    return {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": max_tokens,
+        "temperature": 0,
+        "messages": [{"role": "user", "content": prompt}],
+    }
+
+
+def build_summary_request(session, turns, max_tokens):
+    """Request body asking the model to fold ``turns`` into the running summary."""
+    prompt = f"""{_transcript(session, turns)}
+
+    Write a short summary of the conversation above for an assistant that will answer follow-up questions.
+    Keep the topics, facts and names the user asked about. Reply with the summary only."""
+    return {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": max_tokens,
+        "temperature": 0,
+        "messages": [{"role": "user", "content": prompt}],
+    }
+
+
+class MemorySessionStore:
+    """In-process LRU of sessions; entries expire ``ttl`` seconds after last use."""
+
+    def __init__(self, max_entries=10000, ttl=1800):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()  # session id -> (session, expires_at)
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            session, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return json.loads(session)
+
+    def save(self, session_id, session):
+        # Stored serialized, so callers can't mutate a shared session in place
+        value = json.dumps(session)
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            while len(self._sessions) >= self.max_entries:
+                self._sessions.popitem(last=False)
+            self._sessions[session_id] = (value, time.monotonic() + self.ttl)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class RedisSessionStore:
+    """Sessions in Redis, shared by all workers; ``client`` needs get/setex."""
+
+    def __init__(self, client, ttl=1800, prefix='dchat:session:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, session_id):
+        value = self.client.get(self.prefix + session_id)
+        return json.loads(value) if value is not None else None
+
+    def save(self, session_id, session):
+        self.client.setex(self.prefix + session_id, self.ttl, json.dumps(session))
+
+
+def create_session_store(url=None, max_entries=10000, ttl=1800, workers=1):
+    """Redis-backed store when ``url`` is set (needs the redis package), else in-memory."""
+    if url:
+        import redis
+        logger.info("Storing chat sessions in Redis")
+        return RedisSessionStore(redis.Redis.from_url(url), ttl=ttl)
+    if workers > 1:
+        # Follow-ups land on any worker, and only one of them has the session
+        logger.warning(f"Chat sessions are kept in process memory by each of {workers} workers; "
+                       f"follow-up questions will lose their history. Set SESSION_STORE_URL to share them.")
+    return MemorySessionStore(max_entries=max_entries, ttl=ttl)
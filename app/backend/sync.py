@@ -0,0 +1,266 @@
+# Pinata -> S3 -> Bedrock knowledge base sync.
+# Runs from sync_worker.py, never from the API process.
+import os
+import json
+import time
+from boto3.s3.transfer import TransferConfig
+import logging
+from botocore.exceptions import ClientError
+
+from config import (
+    S3_BUCKET_NAME, KNOWLEDGE_BASE_ID, DATA_SOURCE_ID,
+    SYNC_POLL_SECONDS, SYNC_MANIFEST_PATH, SYNC_MANIFEST_BUCKET, SYNC_MANIFEST_KEY,
+    S3_MULTIPART_THRESHOLD, S3_MULTIPART_CHUNKSIZE, S3_UPLOAD_CONCURRENCY, RETRIEVER,
+)
+from aws_clients import LazyClient
+from pinata import create_session, list_pins, open_pin, map_pins
+from sync_status import read_sync_status, write_sync_status, utc_now
+from metrics import SYNC_STAGE_SECONDS, span
+
+logger = logging.getLogger(__name__)
+
+# AWS clients, built on first use from the shared session (aws_clients.py)
+s3_client = LazyClient('s3')
+bedrock = LazyClient('bedrock-agent')
+
+# Objects above the threshold go up as multipart uploads. A non-seekable
+# stream is buffered part by part; s3transfer allows 10 parts in memory per
+# upload by default, so cap that at the parts actually in flight. Memory per
+# upload is then about max(threshold, chunksize * max_concurrency).
+def transfer_config(threshold=S3_MULTIPART_THRESHOLD, chunksize=S3_MULTIPART_CHUNKSIZE, concurrency=S3_UPLOAD_CONCURRENCY):
+    config = TransferConfig(multipart_threshold=threshold, multipart_chunksize=chunksize, max_concurrency=concurrency)
+    config.max_in_memory_upload_chunks = concurrency
+    return config
+
+
+TRANSFER_CONFIG = transfer_config()
+
+
+class _CountingReader:
+    """File-like wrapper that counts the bytes read through it."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = self.raw.read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+def upload_pin(session, pin):
+    """Stream one pin from the gateway straight into S3 without buffering it.
+
+    Returns ``(key, manifest_entry)``.
+    """
+    file_name = pin['metadata']['name']
+    logger.info(f"Uploading/updating {file_name} in S3...")
+    with open_pin(session, pin) as response:
+        body = _CountingReader(response.raw)
+        s3_client.upload_fileobj(body, S3_BUCKET_NAME, file_name, Config=TRANSFER_CONFIG)
+    s3_object = s3_client.head_object(Bucket=S3_BUCKET_NAME, Key=file_name)
+    return file_name, {
+        'cid': pin['ipfs_pin_hash'],
+        'etag': s3_object['ETag'].strip('"'),
+        'size': body.bytes_read,
+        'synced_at': utc_now(),
+    }
+
+
+def load_manifest():
+    """Load the sync manifest: S3 key name -> {cid, etag, size, synced_at}.
+
+    The manifest lives in S3 when SYNC_MANIFEST_BUCKET is set, otherwise in
+    the local SYNC_MANIFEST_PATH file. A missing manifest is an empty one.
+    """
+    try:
+        if SYNC_MANIFEST_BUCKET:
+            body = s3_client.get_object(Bucket=SYNC_MANIFEST_BUCKET, Key=SYNC_MANIFEST_KEY)['Body'].read()
+            return json.loads(body)
+        with open(SYNC_MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+            return {}
+        raise
+
+
+def save_manifest(manifest):
+    """Persist the sync manifest to wherever load_manifest reads it from."""
+    body = json.dumps(manifest, indent=2, sort_keys=True)
+    if SYNC_MANIFEST_BUCKET:
+        s3_client.put_object(Bucket=SYNC_MANIFEST_BUCKET, Key=SYNC_MANIFEST_KEY, Body=body.encode('utf-8'))
+        return
+    directory = os.path.dirname(SYNC_MANIFEST_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{SYNC_MANIFEST_PATH}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(body)
+    os.replace(tmp_path, SYNC_MANIFEST_PATH)
+
+
+def sync_files_with_s3():
+    """Sync Pinata files with S3 bucket only if there are changes.
+
+    IPFS CIDs are content addresses, so a pin whose CID matches the manifest
+    is unchanged and is neither downloaded nor compared. Only new or changed
+    pins are transferred, and keys whose pins were removed are deleted.
+
+    Returns a summary dict with the number of pins listed, uploaded, deleted
+    and left unchanged.
+    """
+    logger.info("Starting sync process")
+    session = create_session()
+    with span(SYNC_STAGE_SECONDS, 'manifest_load'):
+        manifest = load_manifest()
+
+    # pinList returns the newest pins first, so keep the first CID per name
+    pins = {}
+    with span(SYNC_STAGE_SECONDS, 'pinata_list'):
+        for pin in list_pins(session):
+            pins.setdefault(pin['metadata']['name'], pin)
+    logger.info(f"Listed {len(pins)} pins from Pinata")
+
+    changed = [pin for name, pin in pins.items() if manifest.get(name, {}).get('cid') != pin['ipfs_pin_hash']]
+    removed = [name for name in manifest if name not in pins]
+    uploaded = 0
+
+    # Stream only the pins whose CID changed from the gateway into S3
+    with span(SYNC_STAGE_SECONDS, 's3_upload'):
+        for file_name, entry in map_pins(lambda pin: upload_pin(session, pin), changed):
+            manifest[file_name] = entry
+            uploaded += 1
+
+    # Delete keys whose pins were removed, 1000 keys per request (the S3 limit)
+    deleted = 0
+    for i in range(0, len(removed), 1000):
+        batch = removed[i:i + 1000]
+        with span(SYNC_STAGE_SECONDS, 's3_delete'):
+            response = s3_client.delete_objects(
+                Bucket=S3_BUCKET_NAME,
+                Delete={'Objects': [{'Key': name} for name in batch], 'Quiet': True}
+            )
+        failed = {error['Key'] for error in response.get('Errors', [])}
+        for name in batch:
+            if name in failed:
+                logger.error(f"Failed to delete {name} from S3")
+                continue
+            logger.info(f"Deleted {name} from S3.")
+            del manifest[name]
+            deleted += 1
+
+    if uploaded or deleted:
+        with span(SYNC_STAGE_SECONDS, 'manifest_save'):
+            save_manifest(manifest)
+
+    logger.info("Sync process completed")
+    return {
+        'listed': len(pins),
+        'uploaded': uploaded,
+        'deleted': deleted,
+        'unchanged': len(pins) - len(changed),
+    }
+
+
+def sync_knowledge_base(on_status=None):
+    """Sync AWS Bedrock knowledge base.
+
+    Polls the ingestion job until it reaches a terminal state and returns
+    {'job_id': ..., 'status': ...}. ``on_status`` is called with the same
+    dict on every poll so callers can publish progress.
+    """
+    result = {'job_id': None, 'status': None}
+    try:
+        response = bedrock.start_ingestion_job(
+            knowledgeBaseId=KNOWLEDGE_BASE_ID,
+            dataSourceId=DATA_SOURCE_ID,
+        )
+        job_id = response['ingestionJob']['ingestionJobId']
+        result['job_id'] = job_id
+        logger.info(f"Knowledge base sync started. Job ID: {job_id}")
+
+        # Wait for the ingestion job to complete
+        while True:
+            try:
+                job_status = bedrock.get_ingestion_job(
+                    dataSourceId=DATA_SOURCE_ID,
+                    knowledgeBaseId=KNOWLEDGE_BASE_ID,
+                    ingestionJobId=job_id
+                )['ingestionJob']['status']
+                result['status'] = job_status
+                if on_status:
+                    on_status(dict(result))
+                
+                if job_status == 'COMPLETE':
+                    logger.info("Knowledge base sync completed successfully.")
+                    break
+                elif job_status in ['FAILED', 'STOPPED']:
+                    logger.error(f"Knowledge base sync {job_status}.")
+                    break
+                else:
+                    logger.info(f"Knowledge base sync in progress. Status: {job_status}")
+                    time.sleep(SYNC_POLL_SECONDS)
+            except ClientError as e:
+                logger.error(f"Error checking ingestion job status: {e}")
+                result['status'] = 'UNKNOWN'
+                break
+
+    except ClientError as e:
+        logger.error(f"Error starting ingestion job: {e}")
+        result['status'] = 'NOT_STARTED'
+    except Exception as e:
+        logger.error(f"Unexpected error syncing knowledge base: {e}")
+        result['status'] = 'NOT_STARTED'
+
+    return result
+
+
+def run_sync():
+    """Run one full Pinata -> S3 -> knowledge base sync and record its status."""
+    status = read_sync_status() or {}
+    status.update({
+        'state': 'running',
+        'started_at': utc_now(),
+        'finished_at': None,
+        'error': None,
+    })
+    write_sync_status(status)
+
+    try:
+        with span(SYNC_STAGE_SECONDS, 'files'):
+            files = status['files'] = sync_files_with_s3()
+
+        def publish(job):
+            status['ingestion_job'] = job
+            write_sync_status(status)
+
+        # Nothing changed and the last ingestion finished: the index is current
+        last_job = status.get('ingestion_job') or {}
+        if files['uploaded'] or files['deleted'] or last_job.get('status') != 'COMPLETE':
+            with span(SYNC_STAGE_SECONDS, 'ingestion'):
+                status['ingestion_job'] = sync_knowledge_base(on_status=publish)
+            if status['ingestion_job']['status'] == 'COMPLETE':
+                status['kb_version'] = status['ingestion_job']['job_id']
+        else:
+            logger.info("No changes since last sync, skipping knowledge base ingestion")
+
+        # Keep the in-process index in step with the bucket when the API uses it
+        if RETRIEVER == 'local' and (files['uploaded'] or files['deleted']):
+            from build_local_index import build_from_s3
+            with span(SYNC_STAGE_SECONDS, 'local_index'):
+                status['local_index_chunks'] = build_from_s3(s3_client)
+        status['state'] = 'idle'
+        status['last_success_at'] = utc_now()
+    except Exception as e:
+        logger.exception("Sync failed")
+        status['state'] = 'failed'
+        status['error'] = str(e)
+    finally:
+        status['finished_at'] = utc_now()
+        write_sync_status(status)
+
+    return status
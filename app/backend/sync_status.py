@@ -0,0 +1,50 @@
+# Sync status shared between the sync worker (writer) and the API (reader).
+# Kept free of AWS imports so the API process stays light.
+import os
+import json
+import time
+from datetime import datetime, timezone
+
+from config import SYNC_STATUS_PATH
+
+
+def utc_now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def read_sync_status(path=SYNC_STATUS_PATH):
+    """Return the last status written by the sync worker, or None."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def write_sync_status(status, path=SYNC_STATUS_PATH):
+    """Atomically persist the sync status so the API can read it at any time."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(status, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+_kb_version = {'value': None, 'checked_at': 0.0}
+
+
+def current_kb_version(max_age=5.0):
+    """Return the ingestion job ID of the last completed knowledge base sync.
+
+    Caches derived from the knowledge base compare this stamp to notice a
+    finished sync. The status file is re-read at most every ``max_age``
+    seconds so the check is cheap enough to run on every request.
+    """
+    now = time.monotonic()
+    if now - _kb_version['checked_at'] >= max_age:
+        status = read_sync_status() or {}
+        _kb_version['value'] = status.get('kb_version')
+        _kb_version['checked_at'] = now
+    return _kb_version['value']
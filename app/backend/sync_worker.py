@@ -0,0 +1,43 @@
+# Background sync service: keeps S3 and the Bedrock knowledge base in line
+# with Pinata on a schedule, independently of the API process.
+import time
+import logging
+import argparse
+
+from prometheus_client import start_http_server
+
+from config import SYNC_INTERVAL_SECONDS, SYNC_METRICS_PORT
+from metrics import setup_tracing
+from sync import run_sync
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def main(interval, once=False):
+    setup_tracing('d-chat-sync')
+    if SYNC_METRICS_PORT and not once:
+        start_http_server(SYNC_METRICS_PORT)
+        logger.info(f"Serving sync metrics on :{SYNC_METRICS_PORT}/metrics")
+
+    while True:
+        started = time.monotonic()
+        status = run_sync()
+        logger.info(f"Sync finished with state={status['state']}")
+        if once:
+            return 0 if status['state'] != 'failed' else 1
+
+        # Keep a fixed cadence regardless of how long the sync took
+        elapsed = time.monotonic() - started
+        time.sleep(max(0, interval - elapsed))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Sync Pinata files to S3 and the Bedrock knowledge base')
+    parser.add_argument('-i', '--interval', type=int, default=SYNC_INTERVAL_SECONDS,
+                        help=f'Seconds between sync runs (default: {SYNC_INTERVAL_SECONDS})')
+    parser.add_argument('--once', action='store_true', help='Run a single sync and exit')
+
+    args = parser.parse_args()
+
+    raise SystemExit(main(args.interval, args.once))
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# The backend modules are run from app/backend, not installed
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+os.environ.setdefault('AWS_REGION', 'us-east-1')
+os.environ['SYNC_MANIFEST_BUCKET'] = ''
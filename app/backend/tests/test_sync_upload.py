@@ -0,0 +1,110 @@
+import time
+import socket
+import tracemalloc
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+import pytest
+
+import sync
+
+BUCKET = 'd-chat-test'
+MB = 2**20
+# S3's smallest multipart part
+CHUNKSIZE = 5 * MB
+
+
+def run_moto(port):
+    import logging
+    from moto.server import ThreadedMotoServer
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = ThreadedMotoServer(port=port, verbose=False)
+    server.start()
+    server._thread.join()
+
+
+@pytest.fixture(scope='module')
+def s3():
+    # moto in a child process, so the objects it stores aren't traced here
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    server = multiprocessing.Process(target=run_moto, args=(port,), daemon=True)
+    server.start()
+    client = boto3.client('s3', endpoint_url=f"http://127.0.0.1:{port}", region_name='us-east-1')
+    for _ in range(50):
+        try:
+            client.create_bucket(Bucket=BUCKET)
+            break
+        except Exception:
+            time.sleep(0.2)
+    yield client
+    server.terminate()
+
+
+class StreamingBody:
+    """A gateway response body of ``size`` bytes, produced as it is read."""
+
+    def __init__(self, size):
+        self.remaining = size
+
+    def read(self, amount=-1):
+        amount = self.remaining if amount is None or amount < 0 else min(amount, self.remaining)
+        self.remaining -= amount
+        return b'x' * amount
+
+
+@pytest.fixture
+def streamed_pins(s3, monkeypatch):
+    sizes = {}
+
+    @contextmanager
+    def open_pin(session, pin):
+        class Response:
+            raw = StreamingBody(sizes[pin['ipfs_pin_hash']])
+        yield Response
+
+    monkeypatch.setattr(sync, 's3_client', s3)
+    monkeypatch.setattr(sync, 'S3_BUCKET_NAME', BUCKET)
+    monkeypatch.setattr(sync, 'open_pin', open_pin)
+    monkeypatch.setattr(sync, 'TRANSFER_CONFIG', sync.transfer_config(threshold=CHUNKSIZE, chunksize=CHUNKSIZE, concurrency=2))
+
+    def make_pin(name, size):
+        sizes[f"cid-{name}"] = size
+        return {'ipfs_pin_hash': f"cid-{name}", 'metadata': {'name': name}}
+    return make_pin
+
+
+def traced_peak(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_upload_pin_memory_is_bounded_by_parts_in_flight(streamed_pins, s3):
+    pin = streamed_pins('large.json', 60 * MB)
+    results = []
+    peak = traced_peak(lambda: results.append(sync.upload_pin(None, pin)))
+
+    name, entry = results[0]
+    assert name == 'large.json' and entry['size'] == 60 * MB
+    assert s3.head_object(Bucket=BUCKET, Key='large.json')['ContentLength'] == 60 * MB
+    # Two parts in flight plus the one being read, far below the 60MB body
+    assert peak < 4 * CHUNKSIZE, f"peak {peak / MB:.1f}MB"
+
+
+def test_concurrent_uploads_stay_within_workers_times_the_per_upload_bound(streamed_pins):
+    workers = 3
+    pins = [streamed_pins(f"file-{i}.json", 30 * MB) for i in range(6)]
+
+    def upload_all():
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            assert len(list(executor.map(lambda pin: sync.upload_pin(None, pin), pins))) == len(pins)
+
+    peak = traced_peak(upload_all)
+    assert peak < workers * 4 * CHUNKSIZE, f"peak {peak / MB:.1f}MB"
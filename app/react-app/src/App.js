@@ -17,9 +17,45 @@ function App() {
         }
     }, [messages]);
 
+    const nextMessageId = useRef(0);
+    // Server-side conversation session, so follow-up questions keep their context
+    const sessionId = useRef(null);
+
     const addMessage = (content, isUser = false, sources = [], isError = false) => {
-        const message = { content, isUser, sources, isError };
+        const message = { id: nextMessageId.current++, content, isUser, sources, isError };
         setMessages((prevMessages) => [...prevMessages, message]);
+        return message.id;
+    };
+
+    const updateMessage = (id, update) => {
+        setMessages((prevMessages) => prevMessages.map((msg) => (msg.id === id ? { ...msg, ...update(msg) } : msg)));
+    };
+
+    // Read Server-Sent Events from a fetch() response body and call onEvent(event, data) for each one
+    const readEventStream = async (response, onEvent) => {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let event = 'message';
+                let data = '';
+                for (const line of rawEvent.split('\n')) {
+                    if (line.startsWith('event:')) event = line.slice(6).trim();
+                    else if (line.startsWith('data:')) data += line.slice(5).trim();
+                }
+                if (data) onEvent(event, JSON.parse(data));
+            }
+        }
     };
 
     const sendMessage = async () => {
@@ -30,20 +66,30 @@ function App() {
             setIsWaiting(true);
 
             try {
-                const response = await fetch('http://localhost:5000/api/chat', {
+                const response = await fetch('http://localhost:5000/api/chat/stream', {
                     method: 'POST',
                     headers: {
                         'Content-Type': 'application/json',
                     },
-                    body: JSON.stringify({ message }),
+                    body: JSON.stringify({ message, session_id: sessionId.current }),
                 });
 
                 if (!response.ok) {
                     throw new Error(`HTTP error! status: ${response.status}`);
                 }
 
-                const data = await response.json();
-                addMessage(data.response, false, data.sources);
+                // Render answer tokens as they arrive, then settle on the parsed answer and sources
+                const botMessageId = addMessage('', false);
+                await readEventStream(response, (event, data) => {
+                    if (event === 'delta') {
+                        updateMessage(botMessageId, (msg) => ({ content: msg.content + data.text }));
+                    } else if (event === 'done') {
+                        sessionId.current = data.session_id;
+                        updateMessage(botMessageId, () => ({ content: data.response, sources: data.sources }));
+                    } else if (event === 'error') {
+                        updateMessage(botMessageId, () => ({ content: `Error: ${data.error}`, isError: true }));
+                    }
+                });
             } catch (error) {
                 console.error('Error:', error);
                 addMessage(`Error: ${error.message}`, false, [], true);
@@ -106,8 +152,8 @@ function App() {
                         <button className="close-btn" onClick={toggleChat}>×</button>
                     </div>
                     <div className="chat-messages" ref={chatMessagesRef}>
-                        {messages.map((msg, index) => (
-                            <div key={index} className={`message ${msg.isUser ? 'user-message' : 'bot-message'} ${msg.isError ? 'error' : ''}`}>
+                        {messages.map((msg) => (
+                            <div key={msg.id} className={`message ${msg.isUser ? 'user-message' : 'bot-message'} ${msg.isError ? 'error' : ''}`}>
                                 <div className="message-content">{msg.content}</div>
                                 {msg.sources.length > 0 && (
                                     <div className="sources">
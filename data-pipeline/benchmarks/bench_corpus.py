@@ -0,0 +1,180 @@
+# Compare the knowledge base corpus layouts on a synthetic FAQ corpus:
+#   batches:  exported record batch files, chunked by Bedrock's default
+#             fixed-size strategy (~300 tokens, 20% overlap)
+#   articles: build_corpus documents (one per article or article section),
+#             ingested with the NONE chunking strategy
+# Passage relevance is measured with a bag-of-words retriever (the same for
+# both layouts). Ingestion is modelled as Bedrock processes a data source:
+# a fixed cost per document plus one embedding call per chunk whose latency
+# grows with its tokens, at a fixed concurrency; both the full ingestion and
+# the re-ingestion after a refresh changed a fraction of the articles are timed.
+#
+#   python benchmarks/bench_corpus.py --articles 600 --queries 300 --changed 0.05
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from build_corpus import article_documents  # noqa: E402
+from file_operations import RECORDS_PER_SHARD  # noqa: E402
+
+VOCABULARY = [f"w{i}" for i in range(5000)]
+COMMON = [f"c{i}" for i in range(60)]
+
+# Bedrock's default chunking: 300 tokens with 20% overlap; ~0.75 words per token
+CHUNK_WORDS = 225
+CHUNK_OVERLAP = 45
+
+
+def make_section(rng, words):
+    topic = rng.sample(VOCABULARY, 40)
+    lines = [f"{' '.join(rng.sample(topic, 5))}?"]
+    remaining = words
+    while remaining > 0:
+        length = min(remaining, rng.randint(20, 90))
+        lines.append(" ".join(rng.choice(topic) if rng.random() < 0.6 else rng.choice(COMMON) for _ in range(length)) + ".")
+        remaining -= length
+    return topic, "\n".join(lines)
+
+
+def make_corpus(rng, articles):
+    records, sections = [], []
+    for i in range(articles):
+        parts = []
+        for s in range(rng.choice((1, 1, 2, 3, 4))):
+            topic, text = make_section(rng, rng.randint(60, 400))
+            sections.append({'article': i, 'topic': topic})
+            parts.append(text)
+        records.append({'href': f"https://ask.usda.gov/s/article/faq-{i}",
+                        'content': {'h2': [f"Question {i}"], 'paragraph': "\n".join(parts)}})
+    return records, sections
+
+
+def batch_passages(records, batch_records):
+    """Fixed-size chunks of the batch files, with each chunk's words per article."""
+    files, passages = [], []
+    for start in range(0, len(records), batch_records):
+        words, owners = [], []
+        for i, record in enumerate(records[start:start + batch_records], start=start):
+            record_words = json.dumps(record, ensure_ascii=False, separators=(',', ':')).split()
+            words.extend(record_words)
+            owners.extend([i] * len(record_words))
+        files.append([])
+        step = CHUNK_WORDS - CHUNK_OVERLAP
+        for offset in range(0, len(words), step):
+            passages.append({'text': " ".join(words[offset:offset + CHUNK_WORDS]),
+                             'articles': Counter(owners[offset:offset + CHUNK_WORDS])})
+            files[-1].append(passages[-1])
+            if offset + CHUNK_WORDS >= len(words):
+                break
+    return files, passages
+
+
+def article_passages(records):
+    """build_corpus documents, one passage each, grouped per article."""
+    files, passages = [], []
+    for i, record in enumerate(records):
+        files.append([])
+        for _, text, _ in article_documents(record):
+            passages.append({'text': text, 'articles': Counter({i: len(text.split())})})
+            files[-1].append(passages[-1])
+    return files, passages
+
+
+def tokens(text):
+    return [word.strip('.?,:"{}[]\\') for word in text.split()]
+
+
+class BagOfWordsRetriever:
+    """Cosine similarity over term counts, through an inverted index."""
+
+    def __init__(self, passages):
+        self.passages = passages
+        self.postings = {}
+        self.norms = []
+        for index, passage in enumerate(passages):
+            counts = Counter(tokens(passage['text']))
+            self.norms.append(math.sqrt(sum(c * c for c in counts.values())) or 1.0)
+            for term, count in counts.items():
+                self.postings.setdefault(term, []).append((index, count))
+
+    def retrieve(self, query, k):
+        scores = Counter()
+        for term, weight in Counter(tokens(query)).items():
+            for index, count in self.postings.get(term, ()):
+                scores[index] += weight * count / self.norms[index]
+        return [self.passages[index] for index, _ in scores.most_common(k)]
+
+
+def relevance(passages, sections, queries, rng, k):
+    retriever = BagOfWordsRetriever(passages)
+    hits, relevant, purity, mixed = 0, 0.0, [], []
+    for _ in range(queries):
+        section = rng.choice(sections)
+        query = " ".join(rng.sample(section['topic'], 6) + rng.sample(COMMON, 2))
+        results = retriever.retrieve(query, k)
+        hits += bool(results) and section['article'] in results[0]['articles']
+        # Share of the retrieved text that comes from the question's article
+        relevant += sum(r['articles'][section['article']] for r in results) / max(1, sum(sum(r['articles'].values()) for r in results))
+        for r in results:
+            purity.append(max(r['articles'].values()) / sum(r['articles'].values()))
+            mixed.append(len(r['articles']))
+    return {'hit@1': hits / queries, 'relevant_share': relevant / queries,
+            'purity': sum(purity) / len(purity), 'articles_per_passage': sum(mixed) / len(mixed)}
+
+
+def ingest(files, document_overhead, call_latency, per_1k_tokens, concurrency):
+    """Time a simulated ingestion job over ``files`` (lists of their chunks)."""
+    tasks = [document_overhead] * len(files) + [
+        call_latency + per_1k_tokens * len(chunk['text'].split()) / 0.75 / 1000 for chunks in files for chunk in chunks]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(time.sleep, tasks))
+    return time.perf_counter() - started
+
+
+def main(articles, queries, k, changed, batch_records, document_overhead, call_latency, per_1k_tokens, concurrency):
+    rng = random.Random(23)
+    records, sections = make_corpus(rng, articles)
+    changed_articles = set(rng.sample(range(articles), max(1, int(articles * changed))))
+
+    layouts = {
+        f'batches ({batch_records} records/file, fixed-size chunks)': (batch_passages(records, batch_records), batch_records),
+        'articles (build_corpus documents)': (article_passages(records), 1),
+    }
+    for name, ((files, passages), records_per_file) in layouts.items():
+        scores = relevance(passages, sections, queries, random.Random(7), k)
+        full = ingest(files, document_overhead, call_latency, per_1k_tokens, concurrency)
+        # A changed article makes its whole file a modified document
+        touched = [files[i] for i in sorted({a // records_per_file for a in changed_articles})]
+        incremental = ingest(touched, document_overhead, call_latency, per_1k_tokens, concurrency)
+        print(f"{name}: {len(files)} documents, {len(passages)} passages, "
+              f"{sum(len(p['text'].split()) for p in passages)} words embedded")
+        print(f"  relevance: hit@1 {scores['hit@1']:.1%}, relevant share of top-{k} text {scores['relevant_share']:.1%}, "
+              f"passage purity {scores['purity']:.1%}, {scores['articles_per_passage']:.2f} articles per passage")
+        print(f"  ingestion: full {full:.2f}s, after {len(changed_articles)} articles changed "
+              f"{incremental:.2f}s ({sum(len(f) for f in touched)} passages re-embedded)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare the batch file and per-article corpus layouts')
+    parser.add_argument('--articles', type=int, default=600)
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('-k', type=int, default=5, help='Passages retrieved per query')
+    parser.add_argument('--changed', type=float, default=0.05, help='Fraction of articles changed by a refresh')
+    parser.add_argument('--batch-records', type=int, default=RECORDS_PER_SHARD, help='Records per batch file')
+    parser.add_argument('--document-overhead', type=float, default=0.01, help='Simulated seconds per document')
+    parser.add_argument('--call-latency', type=float, default=0.01, help='Simulated seconds per embedding call')
+    parser.add_argument('--per-1k-tokens', type=float, default=0.01, help='Simulated seconds per 1k embedded tokens')
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    main(args.articles, args.queries, args.k, args.changed, args.batch_records,
+         args.document_overhead, args.call_latency, args.per_1k_tokens, args.concurrency)
@@ -0,0 +1,107 @@
+# Compare one-at-a-time embedding (as in prototype/main.py:embeddings_call)
+# with the concurrent, cached embedding stage, against a stub model with a
+# fixed per-call latency. Runs: cold cache, unchanged rerun, and a rerun
+# after a fraction of the records changed.
+#
+#   python benchmarks/bench_embeddings.py --records 300 --latency 0.05 --workers 8 --changed 0.1
+import os
+import sys
+import time
+import random
+import hashlib
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from file_operations import ShardWriter  # noqa: E402
+from build_corpus import article_chunks  # noqa: E402
+from embed_chunks import EmbeddingCache, embed_corpus  # noqa: E402
+
+WORDS = [f"w{i}" for i in range(3000)]
+
+
+# Stand-in for Titan: a fixed latency per call and a deterministic vector
+class StubEmbedder:
+    def __init__(self, latency, dimensions=512):
+        self.latency = latency
+        self.dimensions = dimensions
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, text):
+        time.sleep(self.latency)
+        with self.lock:
+            self.calls += 1
+        seed = int.from_bytes(hashlib.md5(text.encode('utf-8')).digest()[:8], 'little')
+        rng = random.Random(seed)
+        return [rng.uniform(-1, 1) for _ in range(self.dimensions)]
+
+
+def write_records(output_dir, records):
+    with ShardWriter(output_dir, "bench") as writer:
+        for record in records:
+            writer.write(record)
+
+
+def make_records(rng, count):
+    return [
+        {"href": f"https://ask.usda.gov/s/article/faq-{i}",
+         "content": {"h2": [f"Question {i}"], "paragraph": " ".join(rng.choices(WORDS, k=rng.randint(60, 500)))}}
+        for i in range(count)
+    ]
+
+
+def run(label, output_dir, embedder, cache, workers):
+    calls_before = embedder.calls
+    started = time.perf_counter()
+    summary = embed_corpus(output_dir, "bench", embedder, cache, workers=workers)
+    elapsed = time.perf_counter() - started
+    print(f"{label}: {elapsed:.2f}s, {embedder.calls - calls_before} model calls, "
+          f"{summary['cached']} cached of {summary['chunks']} chunks")
+    return elapsed
+
+
+def main(records, latency, workers, changed):
+    rng = random.Random(5)
+    corpus = make_records(rng, records)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        first_run = os.path.join(tmp, "run1")
+        write_records(first_run, corpus)
+
+        # Baseline: one blocking call per chunk, nothing cached
+        embedder = StubEmbedder(latency)
+        chunks = [chunk for record in corpus for chunk in article_chunks(record)]
+        started = time.perf_counter()
+        for chunk in chunks:
+            embedder(chunk['text'])
+        serial = time.perf_counter() - started
+        print(f"serial, uncached: {serial:.2f}s, {len(chunks)} model calls")
+
+        embedder = StubEmbedder(latency)
+        with EmbeddingCache(os.path.join(tmp, "cache.sqlite")) as cache:
+            cold = run(f"cold cache, {workers} workers", first_run, embedder, cache, workers)
+            run("rerun, nothing changed", first_run, embedder, cache, workers)
+
+            # Next scrape: a fraction of the articles were edited
+            second_run = os.path.join(tmp, "run2")
+            updated = [dict(record) for record in corpus]
+            for record in rng.sample(updated, int(len(updated) * changed)):
+                record["content"] = dict(record["content"], paragraph=record["content"]["paragraph"] + " updated")
+            write_records(second_run, updated)
+            run(f"rerun, {changed:.0%} of records changed", second_run, embedder, cache, workers)
+
+    print(f"cold-cache speedup over serial: {serial / cold:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the embedding stage against a stub model')
+    parser.add_argument('--records', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds per stub embedding call')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--changed', type=float, default=0.1, help='Fraction of records changed before the last run')
+    args = parser.parse_args()
+
+    main(args.records, args.latency, args.workers, args.changed)
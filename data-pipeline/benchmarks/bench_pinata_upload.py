@@ -0,0 +1,71 @@
+# Compare the old one-at-a-time Pinata upload with the concurrent, deduplicating
+# uploader, against the local fake Pinata server from app/backend/benchmarks.
+#
+#   python benchmarks/bench_pinata_upload.py --files 60 --latency 0.1 --workers 8
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, '..', 'app', 'backend', 'benchmarks'))
+
+from upload_to_pinata import upload_to_pinata  # noqa: E402
+from fake_pinata import FakePinata  # noqa: E402
+
+
+def serial_upload(directory, filenames, url):
+    """The previous behaviour: a fresh requests.post per file, no dedup."""
+    for filename in filenames:
+        with open(os.path.join(directory, filename), 'rb') as file:
+            metadata = {"name": filename, "keyvalues": {"customKey": "customValue"}}
+            requests.post(f"{url}/pinning/pinFileToIPFS", files={'file': (filename, file)},
+                          data={"pinataMetadata": json.dumps(metadata)}).raise_for_status()
+
+
+def main(files, latency, workers, changed):
+    with tempfile.TemporaryDirectory() as directory:
+        filenames = []
+        for i in range(files):
+            filename = f"food-{i * 100 + 1}-{i * 100 + 100}.json"
+            with open(os.path.join(directory, filename), 'w', encoding='utf-8') as f:
+                json.dump([{"href": f"https://ask.usda.gov/s/article/{i}-{j}", "content": {"h2": [], "paragraph": "x" * 1500}}
+                           for j in range(100)], f)
+            filenames.append(filename)
+
+        with FakePinata(latency=latency) as fake:
+            start = time.perf_counter()
+            serial_upload(directory, filenames, fake.url)
+            serial_s = time.perf_counter() - start
+
+        with FakePinata(latency=latency) as fake:
+            start = time.perf_counter()
+            first = upload_to_pinata(directory, 'jwt', filenames, workers=workers, api_url=fake.url)
+            first_s = time.perf_counter() - start
+
+            # Rerun after a refresh that changed a few files
+            for filename in filenames[:changed]:
+                with open(os.path.join(directory, filename), 'a', encoding='utf-8') as f:
+                    f.write(" ")
+            start = time.perf_counter()
+            second = upload_to_pinata(directory, 'jwt', filenames, workers=workers, api_url=fake.url)
+            second_s = time.perf_counter() - start
+
+    print(f"\nfiles={files} latency={latency}s workers={workers}")
+    print(f"serial upload:          {serial_s:6.2f}s")
+    print(f"concurrent upload:      {first_s:6.2f}s {first}")
+    print(f"rerun, {changed} files changed: {second_s:6.2f}s {second}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark Pinata uploads against a local fake server')
+    parser.add_argument('--files', type=int, default=60)
+    parser.add_argument('--latency', type=float, default=0.1, help='Per-upload server latency in seconds')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--changed', type=int, default=3)
+    args = parser.parse_args()
+    main(args.files, args.latency, args.workers, args.changed)
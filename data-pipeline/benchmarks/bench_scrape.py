@@ -0,0 +1,179 @@
+# Time the scrape stages against a local static server of USDA-style
+# article pages (no browser, no network): a cold HTTP scrape into shards,
+# the batch export, the corpus build, and --refresh passes with nothing
+# changed and after a fraction of the articles changed and a few were taken down.
+#
+# Pages carry an ETag and Last-Modified and answer conditional GETs with
+# 304, like ask.usda.gov's CDN.
+#
+#   python benchmarks/bench_scrape.py --articles 400 --latency 0.02 --workers 8 --output scrape.json
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import resource
+import tempfile
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from driver_pool import DriverPool  # noqa: E402
+from file_operations import ShardWriter, export_batches  # noqa: E402
+from build_corpus import build_corpus  # noqa: E402
+from change_detection import FingerprintStore, refresh_articles  # noqa: E402
+
+WORDS = [f"w{i}" for i in range(3000)]
+
+PAGE = """<!DOCTYPE html>
+<html><head><title>{title}</title></head>
+<body>
+<header><nav>Ask USDA</nav></header>
+<main>
+<h2>{title}</h2>
+<div class="slds-rich-text-editor__output">{body}</div>
+<h2>Related Articles</h2>
+</main>
+</body></html>
+"""
+
+
+# Static article pages served from memory, with a fixed latency per response
+class StaticArticleServer:
+    def __init__(self, pages, latency=0.02, host='127.0.0.1', port=0):
+        self.pages = pages
+        self.latency = latency
+        self.requests = {'200': 0, '304': 0, '404': 0}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_port}"
+
+    def set_page(self, path, html):
+        self.pages[path] = {'html': html.encode('utf-8'), 'etag': '"' + hashlib.md5(html.encode('utf-8')).hexdigest() + '"',
+                            'last_modified': formatdate(time.time(), usegmt=True)}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                time.sleep(fake.latency)
+                page = fake.pages.get(self.path)
+                if page is None:
+                    status, body, headers = 404, b'Not found', {}
+                elif self.headers.get('If-None-Match') == page['etag']:
+                    status, body, headers = 304, b'', {'ETag': page['etag']}
+                else:
+                    status, body = 200, page['html']
+                    headers = {'ETag': page['etag'], 'Last-Modified': page['last_modified'], 'Content-Type': 'text/html; charset=utf-8'}
+                with fake.lock:
+                    fake.requests[str(status)] += 1
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_page(rng, index, revision=0):
+    paragraphs = ["<p>" + " ".join(rng.choices(WORDS, k=rng.randint(30, 120))) + ".</p>" for _ in range(rng.randint(1, 8))]
+    return PAGE.format(title=f"Question {index} (revision {revision})", body="\n".join(paragraphs))
+
+
+def timed(results, stage, fn):
+    started = time.perf_counter()
+    value = fn()
+    results[stage] = round(time.perf_counter() - started, 3)
+    print(f"{stage}: {results[stage]:.2f}s")
+    return value
+
+
+def main(articles, latency, workers, changed, removed):
+    rng = random.Random(24)
+    server = StaticArticleServer({}, latency=latency)
+    for i in range(articles):
+        server.set_page(f"/s/article/faq-{i}", make_page(rng, i))
+    hrefs = [f"{server.url}/s/article/faq-{i}" for i in range(articles)]
+    make_record = lambda href, page_content: {"href": href, "content": page_content}  # noqa: E731
+
+    seconds = {}
+    with server, tempfile.TemporaryDirectory() as output_dir:
+        def scrape():
+            with DriverPool(None, workers=workers, mode="http") as pool, ShardWriter(output_dir, "bench") as writer:
+                for href, page_content in pool.scrape(hrefs):
+                    writer.write(make_record(href, page_content))
+                return dict(pool.stats)
+
+        stats = timed(seconds, 'scrape', scrape)
+        timed(seconds, 'export', lambda: export_batches(output_dir, "bench"))
+        timed(seconds, 'corpus', lambda: build_corpus(output_dir, "bench"))
+
+        def refresh():
+            with FingerprintStore(output_dir) as store:
+                if not len(store):
+                    store.backfill(output_dir, "bench")
+                with DriverPool(None, workers=workers, mode="http") as pool, ShardWriter(output_dir, "bench") as writer:
+                    return refresh_articles(hrefs, store, pool.session, pool, writer, make_record, workers=workers)
+
+        # A refresh with nothing changed also stores each page's validators
+        timed(seconds, 'refresh_unchanged', refresh)
+
+        # The site changes: some articles are edited, a few are taken down
+        for i in rng.sample(range(articles), int(articles * changed)):
+            server.set_page(f"/s/article/faq-{i}", make_page(rng, i, revision=1))
+        for i in rng.sample(range(articles), int(articles * removed)):
+            server.pages.pop(f"/s/article/faq-{i}", None)
+        before_refresh = dict(server.requests)
+
+        delta = timed(seconds, 'refresh', refresh)
+        timed(seconds, 'refresh_corpus', lambda: build_corpus(output_dir, "bench", exclude=set(delta["removed"])))
+        refresh_requests = {status: count - before_refresh.get(status, 0) for status, count in server.requests.items()}
+
+    return {
+        'config': {'articles': articles, 'latency': latency, 'workers': workers, 'changed': changed, 'removed': removed},
+        'seconds': seconds,
+        'pages_per_second': round(stats['pages'] / seconds['scrape'], 1) if seconds['scrape'] else None,
+        'scrape': stats,
+        'refresh': {key: len(value) if isinstance(value, list) else value for key, value in delta.items()},
+        'refresh_requests': refresh_requests,
+        # ru_maxrss is in kilobytes on Linux
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark scraping against a local static USDA article server')
+    parser.add_argument('--articles', type=int, default=400)
+    parser.add_argument('--latency', type=float, default=0.02, help='Per-response server latency in seconds')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--changed', type=float, default=0.05, help='Fraction of articles edited before the refresh')
+    parser.add_argument('--removed', type=float, default=0.01, help='Fraction of articles taken down before the refresh')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    result = main(args.articles, args.latency, args.workers, args.changed, args.removed)
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
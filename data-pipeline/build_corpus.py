@@ -0,0 +1,151 @@
+import os
+import re
+import json
+
+from file_operations import iter_latest_batches
+
+# Knowledge base documents: one per article, or one per section-aligned part
+# of a long article, each with a Bedrock metadata sidecar
+# (`{document}.metadata.json`) carrying its href and headings for filtering.
+# Documents are already chunked, so the S3 data source should use the
+# NONE chunking strategy; each document is then exactly one passage.
+CORPUS_DIR = "corpus"
+DOCUMENT_SUFFIX = ".txt"
+METADATA_SUFFIX = ".metadata.json"
+
+# Words per document. ~300 words is ~400 tokens, well within Titan's input
+# limit and close to the passage size the chat prompt budget is tuned for.
+DOCUMENT_WORDS = 300
+# A trailing part shorter than this is merged into the one before it
+MIN_DOCUMENT_WORDS = 60
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+_UNSAFE_NAME = re.compile(r"[^A-Za-z0-9_-]+")
+
+# Function to turn an article URL into a stable document name,
+# e.g. https://ask.usda.gov/s/article/How-do-I-... -> How-do-I-...
+def article_slug(href):
+    path = href.split('?', 1)[0].split('#', 1)[0].rstrip('/')
+    slug = _UNSAFE_NAME.sub('-', path.rsplit('/', 1)[-1]).strip('-')
+    return slug[:150] or "article"
+
+# Function to split article text into its smallest meaningful blocks: the
+# lines the page was rendered with (paragraphs, list items, headings), with
+# lines longer than max_words cut at sentence ends, and only then at words.
+def split_blocks(paragraph, max_words=DOCUMENT_WORDS):
+    blocks = []
+    for line in paragraph.splitlines():
+        words = line.split()
+        if not words:
+            continue
+        if len(words) <= max_words:
+            blocks.append(" ".join(words))
+            continue
+        for sentence in _SENTENCE_END.split(line):
+            words = sentence.split()
+            for start in range(0, len(words), max_words):
+                blocks.append(" ".join(words[start:start + max_words]))
+    return blocks
+
+# Function to pack an article's blocks into parts of at most max_words,
+# breaking only between blocks. A short heading-like line (ending in ':' or
+# '?') starts a new part once the current one is of useful size, so parts
+# follow the article's own sections.
+def chunk_article(paragraph, max_words=DOCUMENT_WORDS, min_words=MIN_DOCUMENT_WORDS):
+    parts, current, count = [], [], 0
+    for block in split_blocks(paragraph, max_words):
+        words = len(block.split())
+        is_heading = words <= 15 and block.endswith((':', '?'))
+        if current and (count + words > max_words or (is_heading and count >= min_words)):
+            parts.append(current)
+            current, count = [], 0
+        current.append(block)
+        count += words
+    if current:
+        # Fold a short tail back into the previous part rather than emit a stub
+        if parts and count < min_words and sum(len(b.split()) for b in parts[-1]) + count <= max_words + min_words:
+            parts[-1].extend(current)
+        else:
+            parts.append(current)
+    return ["\n".join(part) for part in parts]
+
+# Function to build the documents for one scraped record.
+# Returns [(name, text, metadata)] with the sidecar's metadataAttributes.
+def article_documents(record, max_words=DOCUMENT_WORDS):
+    href = record["href"]
+    content = record.get("content") or {}
+    headings = [h for h in content.get("h2", []) if h]
+    title = " / ".join(headings)
+    parts = chunk_article(content.get("paragraph") or "", max_words)
+    slug = article_slug(href)
+
+    documents = []
+    for number, body in enumerate(parts, start=1):
+        name = slug if len(parts) == 1 else f"{slug}--{number}"
+        # The href stays in the text too, so the model can cite it
+        text = f"{title}\nSource: {href}\n\n{body}\n" if title else f"Source: {href}\n\n{body}\n"
+        attributes = {"href": href, "part": number, "parts": len(parts)}
+        if title:
+            attributes["title"] = title
+        # Bedrock rejects empty list attributes, so only set non-empty ones
+        if headings:
+            attributes["h2"] = headings
+        if record.get("terms"):
+            attributes["terms"] = record["terms"]
+        documents.append((name + DOCUMENT_SUFFIX, text, {"metadataAttributes": attributes}))
+    return documents
+
+# Function to split a record into {"href", "title", "text"} chunks the same
+# way the corpus does, for the embedding stage
+def article_chunks(record, max_words=DOCUMENT_WORDS):
+    return [{"href": metadata["metadataAttributes"]["href"], "title": metadata["metadataAttributes"].get("title", ""), "text": text}
+            for _, text, metadata in article_documents(record, max_words)]
+
+# Function to write a file only when its content differs from what's on disk
+def write_if_changed(path, data):
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+    with open(path + ".tmp", 'wb') as f:
+        f.write(data)
+    os.replace(path + ".tmp", path)
+    return True
+
+# Function to build the knowledge base corpus from a run's shards into
+# {output_dir}/corpus. Only documents whose text or metadata changed are
+# rewritten, and documents of removed or shortened articles are deleted.
+# Returns (changed, stale): file names to upload and file names to unpin.
+def build_corpus(output_dir, prefix, href_terms=None, exclude=None, max_words=DOCUMENT_WORDS):
+    corpus_dir = os.path.join(output_dir, CORPUS_DIR)
+    os.makedirs(corpus_dir, exist_ok=True)
+    existing = set(os.listdir(corpus_dir))
+
+    written, changed, articles = set(), [], 0
+    for batch in iter_latest_batches(output_dir, prefix):
+        for record in batch:
+            if (exclude and record["href"] in exclude) or not (record.get("content") or {}).get("paragraph"):
+                continue
+            if href_terms is not None:
+                record["terms"] = href_terms.get(record["href"], record.get("terms", []))
+            articles += 1
+            for name, text, metadata in article_documents(record, max_words):
+                sidecar = name + METADATA_SUFFIX
+                if name in written:
+                    continue  # another URL of the same article
+                written.update((name, sidecar))
+                if write_if_changed(os.path.join(corpus_dir, name), text.encode('utf-8')):
+                    changed.append(name)
+                if write_if_changed(os.path.join(corpus_dir, sidecar),
+                                    json.dumps(metadata, ensure_ascii=False, sort_keys=True).encode('utf-8')):
+                    changed.append(sidecar)
+
+    stale = sorted(name for name in existing if name.endswith((DOCUMENT_SUFFIX, METADATA_SUFFIX)) and name not in written)
+    for name in stale:
+        os.remove(os.path.join(corpus_dir, name))
+
+    documents = sum(1 for name in written if name.endswith(DOCUMENT_SUFFIX))
+    print(f"Corpus: {articles} articles -> {documents} documents, {len(changed)} files changed, {len(stale)} removed")
+    return changed, stale
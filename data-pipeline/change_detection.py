@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from http_scraping import parse_article_html
+from file_operations import iter_latest_batches
+
+FINGERPRINTS_FILE = "fingerprints.sqlite"
+DELTA_FILE = "delta.json"
+PENDING_UNPINS_FILE = "pending_unpins.json"
+
+# Function to reduce text to what both scrapers agree on. BeautifulSoup puts a
+# line break between inline tags and keeps non-breaking spaces, Selenium
+# follows the rendered layout, so the same article differs only in whitespace.
+def normalize_text(text):
+    return "".join((text or "").split())
+
+# Function to hash scraped page content independently of key order and of
+# which scraper (HTTP or browser) produced it
+def content_hash(page_content):
+    normalized = {
+        "h2": [h2 for h2 in (normalize_text(h2) for h2 in page_content.get("h2", [])) if h2],
+        "paragraph": normalize_text(page_content.get("paragraph")),
+    }
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def utc_now():
+    return datetime.now(timezone.utc).isoformat()
+
+# Per-href fingerprints of scraped articles: content hash, the HTTP
+# validators (ETag / Last-Modified) when the site sends them, and when the
+# article was last seen and last changed.
+class FingerprintStore:
+    def __init__(self, output_dir):
+        self.conn = sqlite3.connect(os.path.join(output_dir, FINGERPRINTS_FILE))
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS fingerprints (
+            href TEXT PRIMARY KEY, content_hash TEXT NOT NULL, etag TEXT, last_modified TEXT,
+            last_seen TEXT NOT NULL, last_changed TEXT NOT NULL, removed INTEGER NOT NULL DEFAULT 0)""")
+
+    def get(self, href):
+        row = self.conn.execute("SELECT content_hash, etag, last_modified FROM fingerprints WHERE href = ? AND removed = 0", (href,)).fetchone()
+        if row is None:
+            return None
+        return {"content_hash": row[0], "etag": row[1], "last_modified": row[2]}
+
+    def record(self, href, digest, etag=None, last_modified=None, changed=True):
+        now = utc_now()
+        if changed:
+            self.conn.execute("""INSERT OR REPLACE INTO fingerprints
+                (href, content_hash, etag, last_modified, last_seen, last_changed) VALUES (?, ?, ?, ?, ?, ?)""",
+                              (href, digest, etag, last_modified, now, now))
+        else:
+            self.conn.execute("""UPDATE fingerprints SET last_seen = ?,
+                etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE href = ?""",
+                              (now, etag, last_modified, href))
+
+    # Removed articles are kept (flagged) so exports keep leaving them out
+    def remove(self, href):
+        self.conn.execute("UPDATE fingerprints SET removed = 1, last_seen = ? WHERE href = ?", (utc_now(), href))
+
+    def removed_hrefs(self):
+        return {row[0] for row in self.conn.execute("SELECT href FROM fingerprints WHERE removed = 1")}
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+
+    # Function to seed the store from shards scraped before fingerprints were kept
+    def backfill(self, output_dir, prefix):
+        count = 0
+        for batch in iter_latest_batches(output_dir, prefix):
+            for record in batch:
+                if record["content"].get("paragraph"):
+                    self.record(record["href"], content_hash(record["content"]))
+                    count += 1
+        self.commit()
+        return count
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# Function to load the hrefs flagged as removed by refresh runs, if any
+def load_removed_hrefs(output_dir):
+    if not os.path.exists(os.path.join(output_dir, FINGERPRINTS_FILE)):
+        return set()
+    with FingerprintStore(output_dir) as store:
+        return store.removed_hrefs()
+
+# Function to check one known article with the cheapest request that answers
+# "did it change?": a conditional GET when validators are stored (304 means
+# unchanged, no body), otherwise a plain GET compared by content hash.
+# Returns (status, page_content, etag, last_modified) where status is one of
+# unchanged / changed / removed / needs_browser / error.
+def check_article(session, href, fingerprint, timeout=15):
+    headers = {}
+    if fingerprint.get("etag"):
+        headers["If-None-Match"] = fingerprint["etag"]
+    if fingerprint.get("last_modified"):
+        headers["If-Modified-Since"] = fingerprint["last_modified"]
+    try:
+        response = session.get(href, headers=headers, timeout=timeout)
+    except requests.RequestException as e:
+        print(f"Change check failed for {href}: {e}")
+        return "error", None, None, None
+
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if response.status_code == 304:
+        return "unchanged", None, etag, last_modified
+    if response.status_code in (404, 410):
+        return "removed", None, None, None
+    if not response.ok:
+        print(f"Change check got HTTP {response.status_code} for {href}")
+        return "error", None, None, None
+
+    page_content = parse_article_html(response.text)
+    if page_content is None:
+        return "needs_browser", None, etag, last_modified
+    if content_hash(page_content) == fingerprint["content_hash"]:
+        return "unchanged", None, etag, last_modified
+    return "changed", page_content, etag, last_modified
+
+# Function to refresh a set of hrefs: check known articles cheaply, scrape only
+# new ones and those that changed (or can only be checked in a browser), and
+# write them with `writer`. `make_record(href, page_content)` builds the record.
+# Returns the delta: added / changed / removed hrefs and counts.
+def refresh_articles(hrefs, store, session, pool, writer, make_record, workers=4):
+    started = time.perf_counter()
+    delta = {"added": [], "changed": [], "removed": [], "unchanged": 0, "errors": 0}
+    known = [(href, store.get(href)) for href in hrefs]
+    new = [href for href, fingerprint in known if fingerprint is None]
+    known = [(href, fingerprint) for href, fingerprint in known if fingerprint is not None]
+    print(f"Checking {len(known)} known articles for changes, {len(new)} new")
+
+    browser_checks = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        checks = executor.map(lambda item: (item[0], item[1], check_article(session, item[0], item[1])), known)
+        for href, fingerprint, (status, page_content, etag, last_modified) in checks:
+            if status == "unchanged":
+                store.record(href, fingerprint["content_hash"], etag, last_modified, changed=False)
+                delta["unchanged"] += 1
+            elif status == "changed":
+                writer.write(make_record(href, page_content))
+                store.record(href, content_hash(page_content), etag, last_modified)
+                delta["changed"].append(href)
+            elif status == "removed":
+                store.remove(href)
+                delta["removed"].append(href)
+            elif status == "needs_browser":
+                browser_checks[href] = fingerprint
+            else:
+                delta["errors"] += 1
+    store.commit()
+
+    # New pages, and known ones whose content only renders in a browser
+    to_scrape = new + list(browser_checks)
+    for href, page_content in pool.scrape(to_scrape):
+        if not page_content["paragraph"]:
+            delta["errors"] += 1
+            continue
+        digest = content_hash(page_content)
+        fingerprint = browser_checks.get(href)
+        if fingerprint is not None and fingerprint["content_hash"] == digest:
+            store.record(href, digest, changed=False)
+            delta["unchanged"] += 1
+            continue
+        writer.write(make_record(href, page_content))
+        store.record(href, digest)
+        delta["changed" if fingerprint is not None else "added"].append(href)
+    store.commit()
+
+    delta["seconds"] = round(time.perf_counter() - started, 2)
+    print(f"Refresh: {len(delta['added'])} added, {len(delta['changed'])} changed, {len(delta['removed'])} removed, "
+          f"{delta['unchanged']} unchanged, {delta['errors']} errors in {delta['seconds']}s")
+    return delta
+
+# Function to hash the exported batch files, to tell which ones an export changed
+def batch_hashes(paths):
+    hashes = {}
+    for path in paths:
+        with open(path, 'rb') as f:
+            hashes[path] = hashlib.sha256(f.read()).hexdigest()
+    return hashes
+
+# Function to save the delta of a run next to its output, for the downstream
+# Pinata upload and S3 sync: the batch files whose content changed, and the
+# ones that no longer exist (whose pins are now stale)
+def save_delta(output_dir, delta, batch_files, stale_files=()):
+    delta = dict(delta, run_at=utc_now(), batch_files=[os.path.basename(path) for path in batch_files],
+                 stale_batch_files=[os.path.basename(path) for path in stale_files])
+    path = os.path.join(output_dir, DELTA_FILE)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(delta, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+    return delta
+
+# Function to load the file names whose pins still have to be removed:
+# files deleted locally by an earlier run whose unpin failed
+def load_pending_unpins(output_dir):
+    path = os.path.join(output_dir, PENDING_UNPINS_FILE)
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'r', encoding='utf-8') as f:
+        return set(json.load(f))
+
+# Function to save the file names left to unpin, for the next run to retry
+def save_pending_unpins(output_dir, names):
+    path = os.path.join(output_dir, PENDING_UNPINS_FILE)
+    if not names:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(sorted(names), f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
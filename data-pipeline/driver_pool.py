@@ -0,0 +1,136 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib3.exceptions import HTTPError as Urllib3Error
+from selenium.common.exceptions import WebDriverException
+from scraping import setup_driver, scrape_page
+from http_scraping import setup_session, fetch_article
+
+SCRAPE_MODES = ("auto", "http", "browser")
+HTTP_PROBE_PAGES = 5
+
+# Errors that mean the driver is unusable: WebDriver errors (including a
+# browser that fails to start), and the connection errors Selenium's client
+# raises when chromedriver itself has died
+DRIVER_ERRORS = (WebDriverException, Urllib3Error, ConnectionError)
+
+# Pool of headless drivers that scrapes hrefs in parallel.
+# Each worker thread owns one driver; a driver that crashes is replaced
+# and the page retried. Results come back in the same order as the hrefs.
+#
+# mode="auto" tries a plain HTTP fetch first and only starts a browser for
+# pages whose content is rendered client-side; "http" never starts one and
+# "browser" always uses Selenium.
+class DriverPool:
+    def __init__(self, driver_path, workers=4, headless=True, retries=1, mode="auto"):
+        if mode not in SCRAPE_MODES:
+            raise ValueError(f"mode must be one of {SCRAPE_MODES}, got {mode!r}")
+        self.driver_path = driver_path
+        self.workers = workers
+        self.headless = headless
+        self.retries = retries
+        self.mode = mode
+        self.session = setup_session(pool_size=workers) if mode != "browser" else None
+        self.stats = {"pages": 0, "failures": 0, "restarts": 0, "http_pages": 0, "browser_pages": 0, "seconds": 0.0}
+        self._http_misses = 0
+        self._local = threading.local()
+        self._drivers = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # In auto mode, stop paying for the HTTP attempt once it has missed
+    # HTTP_PROBE_PAGES times without a single hit: the site renders client-side
+    def _http_enabled(self):
+        return self.mode == "http" or self.stats["http_pages"] > 0 or self._http_misses < HTTP_PROBE_PAGES
+
+    # Function to get (or lazily start) the calling thread's driver
+    def _driver(self):
+        driver = getattr(self._local, "driver", None)
+        if driver is None:
+            driver = setup_driver(self.driver_path, headless=self.headless)
+            self._local.driver = driver
+            with self._lock:
+                self._drivers.append(driver)
+        return driver
+
+    # Function to throw away a crashed driver so the next call starts a fresh one.
+    # There may be no driver at all when setup_driver itself failed.
+    def _restart(self):
+        driver = getattr(self._local, "driver", None)
+        self._local.driver = None
+        with self._lock:
+            self.stats["restarts"] += 1
+            if driver is None or driver not in self._drivers:
+                return
+            self._drivers.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _scrape(self, href):
+        if self.session is not None and self._http_enabled():
+            page_content = fetch_article(self.session, href)
+            with self._lock:
+                if page_content is None:
+                    self._http_misses += 1
+                else:
+                    self.stats["pages"] += 1
+                    self.stats["http_pages"] += 1
+            if page_content is not None:
+                return href, page_content
+            if self.mode == "http":
+                with self._lock:
+                    self.stats["pages"] += 1
+                    self.stats["failures"] += 1
+                return href, {"h2": [], "paragraph": ""}
+
+        for attempt in range(self.retries + 1):
+            try:
+                page_content = scrape_page(self._driver(), href)
+                break
+            except DRIVER_ERRORS as e:
+                print(f"Driver failed on {href} (attempt {attempt + 1}): {e}")
+                self._restart()
+        else:
+            page_content = {"h2": [], "paragraph": ""}
+
+        with self._lock:
+            self.stats["pages"] += 1
+            self.stats["browser_pages"] += 1
+            if not page_content["paragraph"]:
+                self.stats["failures"] += 1
+        return href, page_content
+
+    # Function to scrape hrefs in parallel, yielding (href, page_content) in input order
+    def scrape(self, hrefs):
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                yield from executor.map(self._scrape, hrefs)
+        finally:
+            self.stats["seconds"] += time.perf_counter() - start
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+        with self._lock:
+            drivers, self._drivers = self._drivers, []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+    # Function to print the throughput report for the run
+    def report(self):
+        seconds = self.stats["seconds"] or 1e-9
+        print(f"Scraped {self.stats['pages']} pages in {self.stats['seconds']:.1f}s "
+              f"({self.stats['pages'] / seconds:.2f} pages/s) with {self.workers} workers, "
+              f"{self.stats['failures']} failures, {self.stats['restarts']} driver restarts "
+              f"({self.stats['http_pages']} via HTTP, {self.stats['browser_pages']} via browser)")
@@ -0,0 +1,170 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from array import array
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from file_operations import iter_latest_batches
+from build_corpus import article_chunks
+
+EMBEDDING_MODEL_ID = os.getenv('EMBEDDING_MODEL_ID', 'amazon.titan-embed-text-v2:0')
+EMBEDDING_DIMENSIONS = int(os.getenv('EMBEDDING_DIMENSIONS', '512'))
+EMBEDDING_CACHE = os.getenv('EMBEDDING_CACHE', 'embedding_cache.sqlite')
+
+# Rows written to the cache per transaction
+CACHE_COMMIT_EVERY = 100
+
+# Function to set up a Bedrock runtime client pooled for the embedding workers.
+# Titan has no multi-text invoke_model call, so throughput comes from
+# concurrent requests; adaptive retries back off on throttling.
+def setup_bedrock(workers=8):
+    import boto3
+    from botocore.config import Config
+    config = Config(max_pool_connections=workers, retries={'max_attempts': 8, 'mode': 'adaptive'})
+    return boto3.client('bedrock-runtime', region_name=os.getenv('AWS_REGION'), config=config)
+
+# Function to embed one text with Titan, returning a unit-length vector
+def titan_embed(bedrock_runtime, text, model_id=EMBEDDING_MODEL_ID, dimensions=EMBEDDING_DIMENSIONS):
+    request_body = {"inputText": text, "dimensions": dimensions, "normalize": True}
+    response = bedrock_runtime.invoke_model(modelId=model_id, body=json.dumps(request_body))
+    return json.loads(response['body'].read())['embedding']
+
+# Function to hash a chunk for the cache. The model and dimensions are part of
+# the key, so switching either never returns a stale vector.
+def chunk_hash(text, model_id=EMBEDDING_MODEL_ID, dimensions=EMBEDDING_DIMENSIONS):
+    return hashlib.sha256(f"{model_id}\n{dimensions}\n{text}".encode('utf-8')).hexdigest()
+
+# On-disk cache of embeddings keyed by content hash, stored as float32 blobs.
+# Only the calling thread touches the connection; workers just return vectors.
+class EmbeddingCache:
+    def __init__(self, path=EMBEDDING_CACHE):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS embeddings (hash TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self.pending = 0
+
+    def get_many(self, hashes, batch_size=500):
+        found = {}
+        for i in range(0, len(hashes), batch_size):
+            batch = hashes[i:i + batch_size]
+            placeholders = ",".join("?" * len(batch))
+            for key, blob in self.conn.execute(f"SELECT hash, vector FROM embeddings WHERE hash IN ({placeholders})", batch):
+                found[key] = blob
+        return found
+
+    def put(self, key, vector):
+        self.conn.execute("INSERT OR REPLACE INTO embeddings (hash, vector) VALUES (?, ?)",
+                          (key, array('f', vector).tobytes()))
+        self.pending += 1
+        if self.pending >= CACHE_COMMIT_EVERY:
+            self.commit()
+
+    def commit(self):
+        self.conn.commit()
+        self.pending = 0
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+# Function to embed chunks that aren't cached yet, at most `workers` requests
+# in flight. Yields (hash, vector) as they finish; failures are reported and skipped.
+def embed_missing(embed, missing, workers=8):
+    todo = iter(missing.items())
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = {}
+        for key, text in todo:
+            in_flight[executor.submit(embed, text)] = key
+            if len(in_flight) >= workers * 2:
+                break
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = in_flight.pop(future)
+                try:
+                    yield key, future.result()
+                except Exception as e:
+                    print(f"Failed to embed chunk {key[:12]}: {e}")
+                    yield key, None
+                next_item = next(todo, None)
+                if next_item is not None:
+                    in_flight[executor.submit(embed, next_item[1])] = next_item[0]
+
+# Function to chunk and embed every record of a run, reusing cached vectors.
+# Writes {output_dir}/embeddings/chunks.jsonl (one chunk per line) and
+# vectors.f32 (row-major float32, same order) plus meta.json. Records are split
+# the same way the corpus is (build_corpus.article_chunks), so each vector
+# matches one knowledge base document; records whose href is in `exclude` are skipped.
+def embed_corpus(output_dir, prefix, embed, cache, workers=8, dimensions=EMBEDDING_DIMENSIONS, model_id=EMBEDDING_MODEL_ID,
+                 chunker=article_chunks, exclude=None):
+    started = time.perf_counter()
+    chunks = []
+    for batch in iter_latest_batches(output_dir, prefix):
+        for record in batch:
+            if exclude and record["href"] in exclude:
+                continue
+            for chunk in chunker(record):
+                chunk['hash'] = chunk_hash(chunk['text'], model_id, dimensions)
+                chunks.append(chunk)
+
+    # Unchanged chunks hash the same as last run and come straight from the cache
+    vectors = cache.get_many(list(dict.fromkeys(chunk['hash'] for chunk in chunks)))
+    missing = {chunk['hash']: chunk['text'] for chunk in chunks if chunk['hash'] not in vectors}
+    cached = sum(1 for chunk in chunks if chunk['hash'] not in missing)
+    print(f"{len(chunks)} chunks, {cached} cached, {len(missing)} to embed")
+
+    failed = 0
+    for count, (key, vector) in enumerate(embed_missing(embed, missing, workers), start=1):
+        if vector is None:
+            failed += 1
+            continue
+        if len(vector) != dimensions:
+            raise ValueError(f"Expected {dimensions}-dimensional embeddings, got {len(vector)}")
+        cache.put(key, vector)
+        vectors[key] = array('f', vector).tobytes()
+        if count % 500 == 0:
+            print(f"Embedded {count}/{len(missing)} chunks")
+    cache.commit()
+
+    # Rewrite the output in full; with a warm cache this is just disk I/O
+    embeddings_dir = os.path.join(output_dir, "embeddings")
+    os.makedirs(embeddings_dir, exist_ok=True)
+    written = 0
+    with open(os.path.join(embeddings_dir, "chunks.jsonl.tmp"), 'w', encoding='utf-8') as chunks_file, \
+            open(os.path.join(embeddings_dir, "vectors.f32.tmp"), 'wb') as vectors_file:
+        for chunk in chunks:
+            blob = vectors.get(chunk['hash'])
+            if blob is None:
+                continue
+            chunks_file.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+            vectors_file.write(blob)
+            written += 1
+    os.replace(os.path.join(embeddings_dir, "chunks.jsonl.tmp"), os.path.join(embeddings_dir, "chunks.jsonl"))
+    os.replace(os.path.join(embeddings_dir, "vectors.f32.tmp"), os.path.join(embeddings_dir, "vectors.f32"))
+    with open(os.path.join(embeddings_dir, "meta.json"), 'w', encoding='utf-8') as meta_file:
+        json.dump({"model": model_id, "dimensions": dimensions, "count": written}, meta_file)
+
+    summary = {
+        "chunks": len(chunks),
+        "embedded": len(missing) - failed,
+        "cached": cached,
+        "failed": failed,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+    print(f"Embedding summary: {summary}")
+    return summary
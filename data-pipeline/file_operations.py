@@ -1,6 +1,17 @@
 import os
+import re
+import gzip
 import json
 
+# Shard limits. Each exported shard becomes one Pinata pin and one S3 object
+# for Bedrock: 100 records (~100-300KB) keeps pin/gateway/S3 per-file
+# overhead low while staying far below Bedrock's 50MB per-document limit.
+RECORDS_PER_SHARD = 100
+MAX_SHARD_BYTES = 1_000_000
+CHECKPOINT_FILE = "checkpoint.txt"
+# Search terms that matched each href, for batch runs over several terms
+HREF_TERMS_FILE = "href_terms.json"
+
 # Function to save content locally
 def save_content_locally(contents, output_dir, search_term, batch_size=20):
     os.makedirs(output_dir, exist_ok=True)
@@ -10,3 +21,149 @@ def save_content_locally(contents, output_dir, search_term, batch_size=20):
         with open(json_file_name, 'w', encoding='utf-8') as json_file:
             json.dump(batch, json_file, ensure_ascii=False, indent=4)
         print(f"Saved {json_file_name}")
+
+# Function to list existing shard files for a prefix, in write order
+def list_shards(output_dir, prefix):
+    pattern = re.compile(rf"^{re.escape(prefix)}-(\d+)\.jsonl\.gz$")
+    shards = []
+    if os.path.isdir(output_dir):
+        for name in os.listdir(output_dir):
+            match = pattern.match(name)
+            if match:
+                shards.append((int(match.group(1)), os.path.join(output_dir, name)))
+    return [path for _, path in sorted(shards)]
+
+# Function to load the hrefs already written to shards by earlier runs
+def load_checkpoint(output_dir):
+    checkpoint_path = os.path.join(output_dir, CHECKPOINT_FILE)
+    if not os.path.exists(checkpoint_path):
+        return set()
+    with open(checkpoint_path, 'r', encoding='utf-8') as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+# Function to load the search terms recorded for each href by earlier batch runs
+def load_href_terms(output_dir):
+    path = os.path.join(output_dir, HREF_TERMS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+# Function to atomically save the href -> search terms map
+def save_href_terms(output_dir, href_terms):
+    path = os.path.join(output_dir, HREF_TERMS_FILE)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(href_terms, f, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
+
+# Function to read records back from a shard. A shard cut short by a crash
+# is read up to its last complete record.
+def iter_shard_records(shard_path):
+    with gzip.open(shard_path, 'rt', encoding='utf-8') as f:
+        try:
+            for line in f:
+                if line.endswith("\n"):
+                    yield json.loads(line)
+        except EOFError:
+            pass
+
+# Streams scraped records to gzip-compressed JSONL shards as they arrive.
+# Every record is flushed before its href goes into the checkpoint file
+# (callers only write pages that have content, failures are retried),
+# so a crash loses at most the page being written.
+class ShardWriter:
+    def __init__(self, output_dir, prefix, records_per_shard=RECORDS_PER_SHARD, max_shard_bytes=MAX_SHARD_BYTES):
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.records_per_shard = records_per_shard
+        self.max_shard_bytes = max_shard_bytes
+        # Never append to a shard from an earlier (possibly crashed) run
+        self.shard_index = len(list_shards(output_dir, prefix))
+        self.file = None
+        self.records = 0
+        self.bytes = 0
+        self.checkpoint = open(os.path.join(output_dir, CHECKPOINT_FILE), 'a', encoding='utf-8')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, record):
+        if self.file is None:
+            self.shard_index += 1
+            shard_path = os.path.join(self.output_dir, f"{self.prefix}-{self.shard_index:05d}.jsonl.gz")
+            self.file = gzip.open(shard_path, 'wb')
+            self.records = 0
+            self.bytes = 0
+
+        data = (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n").encode('utf-8')
+        self.file.write(data)
+        self.file.flush()
+        self.checkpoint.write(record["href"] + "\n")
+        self.checkpoint.flush()
+
+        self.records += 1
+        self.bytes += len(data)
+        if self.records >= self.records_per_shard or self.bytes >= self.max_shard_bytes:
+            self._close_shard()
+
+    def _close_shard(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def close(self):
+        self._close_shard()
+        self.checkpoint.close()
+
+# Function to read shards back one batch at a time with each href's latest
+# version. A re-scraped article takes the place of its first copy, so
+# earlier batches keep their size and only the batch holding it changes;
+# its later copies are skipped. Only re-scraped records are held in memory.
+def iter_latest_batches(output_dir, prefix):
+    shards = list_shards(output_dir, prefix)
+    seen = set()
+    latest = {}
+    for shard_path in shards:
+        for record in iter_shard_records(shard_path):
+            if record["href"] in seen:
+                latest[record["href"]] = record
+            seen.add(record["href"])
+
+    emitted = set()
+    for shard_path in shards:
+        batch = []
+        for record in iter_shard_records(shard_path):
+            href = record["href"]
+            if href in emitted:
+                continue
+            emitted.add(href)
+            batch.append(latest.get(href, record))
+        yield batch
+
+# Function to export shards as compact JSON batch files for upload,
+# one shard in memory at a time. Returns the exported file paths.
+# With href_terms, each record is tagged with every search term that found it,
+# including terms from later runs than the one that scraped it. Records
+# whose href is in `exclude` (e.g. articles since removed) are left out.
+def export_batches(output_dir, prefix, href_terms=None, exclude=None):
+    exported = []
+    count = 0
+    for batch in iter_latest_batches(output_dir, prefix):
+        if exclude:
+            batch = [record for record in batch if record["href"] not in exclude]
+        if not batch:
+            continue
+        if href_terms is not None:
+            for record in batch:
+                record["terms"] = href_terms.get(record["href"], record.get("terms", []))
+        json_file_name = os.path.join(output_dir, f"{prefix}-{count + 1}-{count + len(batch)}.json")
+        with open(json_file_name, 'w', encoding='utf-8') as json_file:
+            json.dump(batch, json_file, ensure_ascii=False, separators=(',', ':'))
+        count += len(batch)
+        exported.append(json_file_name)
+    print(f"Exported {count} records to {len(exported)} batch files")
+    return exported
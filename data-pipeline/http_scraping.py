@@ -0,0 +1,51 @@
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Prefer lxml when it's installed, it is several times faster than html.parser
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml",
+}
+
+# Function to set up a pooled keep-alive session for article fetches
+def setup_session(pool_size=10, retries=3):
+    retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset(["GET"]))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(HEADERS)
+    return session
+
+# Function to extract H2 tags and paragraph content from article HTML.
+# Returns None when the content isn't in the HTML (rendered client-side).
+def parse_article_html(html):
+    soup = BeautifulSoup(html, HTML_PARSER)
+    paragraph = soup.find(class_="slds-rich-text-editor__output")
+    if paragraph is None or not paragraph.get_text(strip=True):
+        return None
+
+    return {
+        "h2": [h2.get_text(" ", strip=True) for h2 in soup.find_all("h2")],
+        "paragraph": paragraph.get_text("\n", strip=True),
+    }
+
+# Function to scrape an article with a plain HTTP request.
+# Returns None if the page needs a browser to render its content.
+def fetch_article(session, href, timeout=15):
+    try:
+        response = session.get(href, timeout=timeout)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        print(f"HTTP fetch failed for {href}: {e}")
+        return None
+    return parse_article_html(response.text)
@@ -1,41 +1,221 @@
 from dotenv import load_dotenv
-from scraping import setup_driver, collect_hrefs, scrape_page
-from file_operations import save_content_locally
-from upload_to_pinata import upload_to_pinata
+from scraping import setup_driver, collect_hrefs
+from driver_pool import DriverPool, SCRAPE_MODES
+from file_operations import ShardWriter, load_checkpoint, export_batches, load_href_terms, save_href_terms
+from upload_to_pinata import upload_to_pinata, unpin_files, list_batch_pin_names
+from embed_chunks import EmbeddingCache, EMBEDDING_CACHE, embed_corpus, setup_bedrock, titan_embed
+from change_detection import (FingerprintStore, refresh_articles, batch_hashes, save_delta, load_removed_hrefs,
+                              load_pending_unpins, save_pending_unpins)
+from build_corpus import CORPUS_DIR, build_corpus
+from http_scraping import setup_session
 import os
+import glob
 import argparse
 
-def main(search_term, limit):
+SEARCH_URL = 'https://ask.usda.gov/s/global-search/{search_term}?tabset-fd9ce=2'
+DRIVER_PATH = "D:\chromedriver-win64\chromedriver-win64\chromedriver.exe" # update this before running
+BATCH_OUTPUT_DIR = "usdac_data_scrap_batch"
+BATCH_PREFIX = "corpus"
+# What gets published: one document per article (with metadata sidecars), or
+# the record batch files as they are exported
+LAYOUTS = ("articles", "batches")
+
+def main(search_term, limit, workers=4, mode="auto", resume=False, embed=False, embed_workers=8, embedding_cache=EMBEDDING_CACHE,
+         refresh=False, layout="articles"):
     load_dotenv()
     pinata_jwt = os.getenv('PINATA_JWT')
-    url = f'https://ask.usda.gov/s/global-search/{search_term}?tabset-fd9ce=2'
+    url = SEARCH_URL.format(search_term=search_term)
     output_dir = f"usdac_data_scrap_{search_term}"
-    driver_path = "D:\chromedriver-win64\chromedriver-win64\chromedriver.exe" # update this before running
+    driver_path = DRIVER_PATH
+
+    # Href collection progress, kept so --resume can pick up where a run stopped
+    os.makedirs(output_dir, exist_ok=True)
+    cursor_path = os.path.join(output_dir, "hrefs_cursor.json")
+    if not resume and os.path.exists(cursor_path):
+        os.remove(cursor_path)
 
     driver = setup_driver(driver_path)
 
     try:
-        hrefs = collect_hrefs(driver, url, limit=limit)
+        hrefs = collect_hrefs(driver, url, limit=limit, cursor_path=cursor_path)
         print(f"Collected {len(hrefs)} hrefs")
+    finally:
+        driver.quit()
+
+    batch_files, stale_files = scrape_and_export(output_dir, search_term, hrefs,
+                                                 lambda href, page_content: {"href": href, "content": page_content},
+                                                 workers, mode, refresh)
+    publish(output_dir, search_term, batch_files, stale_files, pinata_jwt, embed, embed_workers, embedding_cache, layout)
+
+# Function to export the batch files and diff them with the previous export.
+# Removals shift the record ranges in later batch names, so files that no
+# longer exist are deleted; their pins are stale and must be unpinned.
+# Returns (batch_files, changed_files, stale_files).
+def export_and_diff(output_dir, prefix, href_terms=None, exclude=None):
+    previous = batch_hashes(glob.glob(os.path.join(glob.escape(output_dir), f"{glob.escape(prefix)}-*-*.json")))
+    batch_files = export_batches(output_dir, prefix, href_terms=href_terms, exclude=exclude)
+    current = batch_hashes(batch_files)
+    changed_files = [path for path in batch_files if previous.get(path) != current[path]]
+    stale_files = [path for path in previous if path not in current]
+    for path in stale_files:
+        os.remove(path)
+    return batch_files, changed_files, stale_files
+
+# Function to scrape hrefs into the output's shards and export the batch files
+# to publish. A normal run skips hrefs already scraped; a refresh run rechecks
+# them and only refetches new and changed articles, and lists the batch files
+# whose content changed in delta.json. Articles marked removed by a refresh
+# stay out of the export either way. Returns (batch_files, stale_files).
+def scrape_and_export(output_dir, prefix, hrefs, make_record, workers=4, mode="auto", refresh=False, href_terms=None):
+    if not refresh:
+        # Skip hrefs already written to shards by an earlier run
+        scraped = load_checkpoint(output_dir)
+        pending = [href for href in hrefs if href not in scraped]
+        print(f"{len(hrefs) - len(pending)} hrefs already scraped, {len(pending)} to go")
+
+        # Stream each page to disk as it arrives instead of holding them all.
+        # Pages that came back empty are neither written nor checkpointed, so
+        # the next run (or --resume) tries them again.
+        failed = 0
+        with DriverPool(DRIVER_PATH, workers=workers, mode=mode) as pool, ShardWriter(output_dir, prefix) as writer:
+            for count, (href, page_content) in enumerate(pool.scrape(pending), start=1):
+                if not page_content["paragraph"]:
+                    failed += 1
+                    print(f"No content for link {count}: {href}, will retry next run")
+                    continue
+                writer.write(make_record(href, page_content))
+                print(f"Scraped link {count}: {href}")
+            pool.report()
+        if failed:
+            print(f"{failed} pages failed and were not checkpointed")
+
+        batch_files, _, stale_files = export_and_diff(output_dir, prefix, href_terms, exclude=load_removed_hrefs(output_dir))
+        return batch_files, stale_files
+
+    with FingerprintStore(output_dir) as store:
+        if not len(store):
+            print(f"Seeded fingerprints from {store.backfill(output_dir, prefix)} scraped articles")
+        with DriverPool(DRIVER_PATH, workers=workers, mode=mode) as pool, ShardWriter(output_dir, prefix) as writer:
+            session = pool.session or setup_session(pool_size=workers)
+            delta = refresh_articles(hrefs, store, session, pool, writer, make_record, workers=workers)
+            pool.report()
+
+    batch_files, changed_files, stale_files = export_and_diff(output_dir, prefix, href_terms, exclude=load_removed_hrefs(output_dir))
+    save_delta(output_dir, delta, changed_files, stale_files)
+    print(f"{len(changed_files)} of {len(batch_files)} batch files changed, {len(stale_files)} stale")
+    return batch_files, stale_files
 
-        all_contents = []
-        for count, href in enumerate(hrefs, start=1):
-            page_content = scrape_page(driver, href)
-            all_contents.append({"href": href, "content": page_content})
-            print(f"Scraped link {count}: {href}")
+# Function to publish a run. The articles layout builds the per-article
+# corpus and publishes its documents; the batches layout publishes the
+# exported batch files. Every current file is passed to the
+# upload, which skips what is already pinned, so a failed upload is retried
+# by the next run. Files that went away are unpinned, and names whose unpin
+# failed are kept in pending_unpins.json and retried too.
+def publish(output_dir, prefix, batch_files, stale_files, pinata_jwt, embed=False, embed_workers=8, embedding_cache=EMBEDDING_CACHE,
+            layout="articles", href_terms=None):
+    removed = load_removed_hrefs(output_dir)
+    if layout == "articles":
+        _, stale = build_corpus(output_dir, prefix, href_terms=href_terms, exclude=removed)
+        # Batch files pinned by earlier batches-layout runs are superseded by the corpus
+        stale = set(stale) | list_batch_pin_names(pinata_jwt, prefix)
+        corpus_dir = os.path.join(output_dir, CORPUS_DIR)
+        upload_to_pinata(corpus_dir, pinata_jwt)
+        current = set(os.listdir(corpus_dir))
+    else:
+        upload_to_pinata(output_dir, pinata_jwt, filenames=[os.path.basename(path) for path in batch_files])
+        stale = [os.path.basename(path) for path in stale_files]
+        current = {os.path.basename(path) for path in batch_files}
 
-        save_content_locally(all_contents, output_dir, search_term)
+    # Record the names to unpin before trying, so a failure (or a crash) leaves
+    # them for the next run; a name published again since must stay pinned
+    pending = (load_pending_unpins(output_dir) | set(stale)) - current
+    save_pending_unpins(output_dir, pending)
+    save_pending_unpins(output_dir, unpin_files(pinata_jwt, pending))
 
+    # Opt-in: vectors for offline use, chunked like the corpus documents.
+    # New and changed chunks are embedded; everything else comes from the cache
+    if embed:
+        bedrock_runtime = setup_bedrock(embed_workers)
+        with EmbeddingCache(embedding_cache) as cache:
+            embed_corpus(output_dir, prefix, lambda text: titan_embed(bedrock_runtime, text), cache, workers=embed_workers,
+                         exclude=removed)
+
+# Function to read search terms from a file, one per line ('#' starts a comment)
+def read_terms_file(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.split('#', 1)[0].strip() for line in f if line.split('#', 1)[0].strip()]
+
+# Function to scrape several search terms into one corpus. Their hrefs are merged
+# into a single frontier, so an article found by several terms is fetched once
+# and tagged with all of them.
+def run_batch(search_terms, limit, workers=4, mode="auto", resume=False, embed=False, embed_workers=8,
+              embedding_cache=EMBEDDING_CACHE, refresh=False, layout="articles", output_dir=BATCH_OUTPUT_DIR):
+    load_dotenv()
+    pinata_jwt = os.getenv('PINATA_JWT')
+    search_terms = list(dict.fromkeys(search_terms))
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Frontier: href -> terms that found it, merged with earlier batch runs
+    href_terms = load_href_terms(output_dir)
+    frontier = {}
+    collected = 0
+
+    driver = setup_driver(DRIVER_PATH)
+    try:
+        for search_term in search_terms:
+            cursor_path = os.path.join(output_dir, f"hrefs_cursor_{search_term}.json")
+            if not resume and os.path.exists(cursor_path):
+                os.remove(cursor_path)
+            hrefs = collect_hrefs(driver, SEARCH_URL.format(search_term=search_term), limit=limit, cursor_path=cursor_path)
+            collected += len(hrefs)
+            for href in hrefs:
+                frontier.setdefault(href, [])
+                if search_term not in frontier[href]:
+                    frontier[href].append(search_term)
+            print(f"Collected {len(hrefs)} hrefs for '{search_term}', {len(frontier)} unique so far")
     finally:
         driver.quit()
 
-    upload_to_pinata(output_dir, pinata_jwt)
+    for href, terms in frontier.items():
+        href_terms[href] = sorted(set(href_terms.get(href, [])) | set(terms))
+    save_href_terms(output_dir, href_terms)
+    print(f"Collected {collected} hrefs across {len(search_terms)} terms, {len(frontier)} unique "
+          f"({collected - len(frontier)} duplicate fetches avoided)")
+
+    batch_files, stale_files = scrape_and_export(output_dir, BATCH_PREFIX, list(frontier),
+                                                 lambda href, page_content: {"href": href, "content": page_content, "terms": href_terms[href]},
+                                                 workers, mode, refresh, href_terms=href_terms)
+    publish(output_dir, BATCH_PREFIX, batch_files, stale_files, pinata_jwt, embed, embed_workers, embedding_cache, layout, href_terms)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Scrape USDA website and upload to Pinata')
-    parser.add_argument('search_term', type=str, help='Search term for USDA website')
+    parser.add_argument('search_terms', nargs='*', metavar='search_term',
+                        help='Search term(s) for USDA website; several terms are scraped into one corpus')
+    parser.add_argument('-f', '--terms-file', help='File with one search term per line (batch mode)')
     parser.add_argument('-l', '--limit', type=int, default=10, help='Limit of links to scrape (default: 10)')
+    parser.add_argument('-w', '--workers', type=int, default=4, help='Number of parallel browser drivers (default: 4)')
+    parser.add_argument('-m', '--mode', choices=SCRAPE_MODES, default='auto',
+                        help='auto: plain HTTP first, browser fallback; http: no browser; browser: Selenium only (default: auto)')
+    parser.add_argument('--resume', action='store_true', help='Resume href collection from the cursor saved by a previous run')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Recheck already-scraped articles and refetch only new or changed ones')
+    parser.add_argument('--layout', choices=LAYOUTS, default='articles',
+                        help='articles: one knowledge base document per article with metadata sidecars; '
+                             'batches: upload the record batch files (default: articles)')
+    parser.add_argument('--embed', action='store_true',
+                        help='Also embed the corpus chunks with Titan into {output_dir}/embeddings, for offline use')
+    parser.add_argument('--embed-workers', type=int, default=8, help='Concurrent embedding requests (default: 8)')
+    parser.add_argument('--embedding-cache', default=EMBEDDING_CACHE, help=f'SQLite embedding cache (default: {EMBEDDING_CACHE})')
     
     args = parser.parse_args()
-    
-    main(args.search_term, args.limit)
\ No newline at end of file
+
+    search_terms = args.search_terms + (read_terms_file(args.terms_file) if args.terms_file else [])
+    if not search_terms:
+        parser.error("give at least one search term or --terms-file")
+    options = dict(workers=args.workers, mode=args.mode, resume=args.resume, embed=args.embed,
+                   embed_workers=args.embed_workers, embedding_cache=args.embedding_cache, refresh=args.refresh,
+                   layout=args.layout)
+    if len(search_terms) == 1 and not args.terms_file:
+        main(search_terms[0], args.limit, **options)
+    else:
+        run_batch(search_terms, args.limit, **options)
\ No newline at end of file
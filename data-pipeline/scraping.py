@@ -4,7 +4,9 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
-import time
+from selenium.common.exceptions import TimeoutException, StaleElementReferenceException, NoSuchElementException
+import os
+import json
 
 # Function to set up the WebDriver
 def setup_driver(driver_path, headless=True):
@@ -18,8 +20,45 @@ def setup_driver(driver_path, headless=True):
     driver = webdriver.Chrome(executable_path=driver_path, options=chrome_options)
     return driver
 
-# Function to collect hrefs from the page until a specified limit is reached
-def collect_hrefs(driver, url, limit=1000):
+# Script that reads the hrefs of the <li> items from index arguments[1] onwards
+# in one round trip, instead of two WebDriver calls per item
+NEW_LINKS_SCRIPT = """
+return Array.from(arguments[0].querySelectorAll('li')).slice(arguments[1]).map(function (li) {
+    var a = li.querySelector('a');
+    return a ? a.href : null;
+});
+"""
+
+# Function to load a saved collection cursor (items already read and their hrefs)
+def load_cursor(cursor_path, url):
+    if not cursor_path or not os.path.exists(cursor_path):
+        return 0, []
+    with open(cursor_path, 'r', encoding='utf-8') as f:
+        cursor = json.load(f)
+    if cursor.get("url") != url:
+        return 0, []
+    return cursor["items_seen"], cursor["hrefs"]
+
+# Function to save the collection cursor so an interrupted run can resume
+def save_cursor(cursor_path, url, items_seen, hrefs):
+    if not cursor_path:
+        return
+    tmp_path = f"{cursor_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"url": url, "items_seen": items_seen, "hrefs": list(hrefs)}, f)
+    os.replace(tmp_path, cursor_path)
+
+# Function to collect hrefs from the page until a specified limit is reached.
+# With cursor_path set, progress is saved after every "Load More" and a
+# later call with the same url resumes from it.
+def collect_hrefs(driver, url, limit=1000, cursor_path=None):
+    items_seen, saved_hrefs = load_cursor(cursor_path, url)
+
+    # Ordered set of hrefs: O(1) membership checks, insertion order kept
+    hrefs = dict.fromkeys(saved_hrefs)
+    if len(hrefs) >= limit:
+        return list(hrefs)[:limit]
+
     driver.get(url)
 
     # Wait for the initial content to load
@@ -28,42 +67,45 @@ def collect_hrefs(driver, url, limit=1000):
     # Find the element with the class 'listContent'
     list_content = driver.find_element(By.CLASS_NAME, 'listContent')
 
-    # Initialize a list to store hrefs
-    hrefs = []
-
-    # Function to collect hrefs from <li> elements
-    def collect_links():
-        nonlocal hrefs
-        list_items = list_content.find_elements(By.TAG_NAME, 'li')
-        for item in list_items:
-            try:
-                # Find the <a> tag within the <li>
-                a_tag = item.find_element(By.TAG_NAME, 'a')
-                # Get the href attribute and add it to the list
-                href = a_tag.get_attribute('href')
-                if href and href not in hrefs:
-                    hrefs.append(href)
-            except Exception as e:
-                print(f"Error in collecting href: {e}")
-
-    # Collect initial hrefs
-    collect_links()
-
-    # Click "Load More" button until we have at least 'limit' hrefs
-    while len(hrefs) < limit:
+    def item_count():
+        return driver.execute_script("return arguments[0].querySelectorAll('li').length;", list_content)
+
+    def load_more(count):
+        load_more_button = WebDriverWait(driver, 10).until(
+            EC.element_to_be_clickable((By.CLASS_NAME, "loadmore")))
+        load_more_button.click()
+        # Wait until new items are appended rather than sleeping a fixed time
+        WebDriverWait(driver, 10).until(lambda d: item_count() > count)
+
+    # When resuming, click through to where the last run stopped without re-reading items
+    try:
+        while item_count() < items_seen:
+            load_more(item_count())
+    except Exception as e:
+        print("Could not restore the saved cursor, collecting from the start:", e)
+        items_seen = 0
+
+    # Read only the items appended since the last read
+    while True:
+        # Advance by the items actually read: items appended after the script
+        # ran are picked up on the next pass instead of being skipped
+        new_links = driver.execute_script(NEW_LINKS_SCRIPT, list_content, items_seen)
+        for href in new_links:
+            if href:
+                hrefs[href] = None
+        items_seen += len(new_links)
+        save_cursor(cursor_path, url, items_seen, hrefs)
+
+        if len(hrefs) >= limit:
+            break
         try:
-            load_more_button = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.CLASS_NAME, "loadmore")))
-            load_more_button.click()
-            # Collect hrefs after loading more items
-            time.sleep(3)  # Adding delay to allow more items to load
-            collect_links()
+            load_more(items_seen)
         except Exception as e:
             print("No more items to load or an error occurred:", e)
             break
 
     # Return the collected hrefs (limited to 'limit' hrefs)
-    return hrefs[:limit]
+    return list(hrefs)[:limit]
 
 # Function to scrape content (H2 tags and paragraph content) from each href
 def scrape_page(driver, href):
@@ -82,7 +124,9 @@ def scrape_page(driver, href):
         paragraph = WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CLASS_NAME, "slds-rich-text-editor__output")))
         page_content["paragraph"] = paragraph.text  # Store the text content
 
-    except Exception as e:
+    except (TimeoutException, StaleElementReferenceException, NoSuchElementException) as e:
+        # Page-level problems; other WebDriver errors mean the driver itself
+        # is broken, let the caller restart it
         print(f"Could not retrieve content from {href}: {e}")
 
     # Return the scraped content
@@ -0,0 +1,30 @@
+import os
+
+from change_detection import content_hash
+from http_scraping import parse_article_html
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def test_http_and_browser_text_hash_the_same():
+    page_content = parse_article_html(load_fixture("server_rendered.html"))
+    # What Selenium's element.text returns for the same page: rendered line
+    # breaks, plain spaces for &nbsp;, and an empty hidden heading
+    browser_content = {
+        "h2": ["How long can I store cooked chicken in the refrigerator?", "", "Related  Articles"],
+        "paragraph": "Cooked chicken will last for 3 to 4 days in the refrigerator.\n\n"
+                     "Refrigeration at 40 °F or below slows but does not stop bacterial growth.\n"
+                     "Refrigerate within 2 hours of cooking.\nReheat to 165 °F.\n",
+    }
+    assert content_hash(page_content) == content_hash(browser_content)
+
+
+def test_text_changes_change_the_hash():
+    page_content = parse_article_html(load_fixture("server_rendered.html"))
+    edited = dict(page_content, paragraph=page_content["paragraph"].replace("3 to 4 days", "3 to 5 days"))
+    assert content_hash(page_content) != content_hash(edited)
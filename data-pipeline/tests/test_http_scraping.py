@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+import driver_pool
+from http_scraping import parse_article_html
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def test_parse_server_rendered_article():
+    page_content = parse_article_html(load_fixture("server_rendered.html"))
+    assert page_content["h2"] == ["How long can I store cooked chicken in the refrigerator?", "Related Articles"]
+    paragraph = page_content["paragraph"]
+    assert paragraph.startswith("Cooked chicken will last for 3 to 4 days in the refrigerator.")
+    assert "Reheat to 165 °F." in paragraph
+    # Navigation and related links are outside the article body
+    assert "Ask USDA" not in paragraph
+    assert "How long can you keep chicken?" not in paragraph
+
+
+def test_parse_client_rendered_page_returns_none():
+    assert parse_article_html(load_fixture("client_rendered.html")) is None
+
+
+def test_parse_article_without_h2():
+    page_content = parse_article_html(load_fixture("missing_h2.html"))
+    assert page_content == {"h2": [], "paragraph": "Meat thawed in the refrigerator is safe to refreeze without cooking."}
+
+
+class FakeDriver:
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def fake_site(monkeypatch):
+    # Serve the fixtures by href instead of over the network, and count browser work
+    pages = {}
+    calls = {"http": [], "browser": [], "drivers": 0}
+
+    def fetch_article(session, href):
+        calls["http"].append(href)
+        return parse_article_html(pages[href])
+
+    def setup_driver(driver_path, headless=True):
+        calls["drivers"] += 1
+        return FakeDriver()
+
+    def scrape_page(driver, href):
+        calls["browser"].append(href)
+        return {"h2": ["Rendered"], "paragraph": f"Rendered content of {href}"}
+
+    monkeypatch.setattr(driver_pool, "fetch_article", fetch_article)
+    monkeypatch.setattr(driver_pool, "setup_driver", setup_driver)
+    monkeypatch.setattr(driver_pool, "scrape_page", scrape_page)
+    return pages, calls
+
+
+def test_auto_mode_uses_http_for_server_rendered_pages(fake_site):
+    pages, calls = fake_site
+    pages.update({f"https://ask.usda.gov/s/article/a{i}": load_fixture("server_rendered.html") for i in range(3)})
+
+    with driver_pool.DriverPool(None, workers=2, mode="auto") as pool:
+        results = list(pool.scrape(list(pages)))
+
+    assert [href for href, _ in results] == list(pages)
+    assert all(page_content["paragraph"].startswith("Cooked chicken") for _, page_content in results)
+    assert calls["browser"] == [] and calls["drivers"] == 0
+    assert pool.stats["http_pages"] == 3 and pool.stats["browser_pages"] == 0
+
+
+def test_auto_mode_falls_back_to_the_browser(fake_site):
+    pages, calls = fake_site
+    pages["https://ask.usda.gov/s/article/server"] = load_fixture("server_rendered.html")
+    pages["https://ask.usda.gov/s/article/client"] = load_fixture("client_rendered.html")
+
+    with driver_pool.DriverPool(None, workers=1, mode="auto") as pool:
+        results = dict(pool.scrape(list(pages)))
+
+    assert results["https://ask.usda.gov/s/article/client"]["paragraph"] == "Rendered content of https://ask.usda.gov/s/article/client"
+    assert calls["browser"] == ["https://ask.usda.gov/s/article/client"]
+    assert pool.stats["http_pages"] == 1 and pool.stats["browser_pages"] == 1 and pool.stats["failures"] == 0
+
+
+def test_auto_mode_stops_probing_http_on_client_rendered_sites(fake_site):
+    pages, calls = fake_site
+    pages.update({f"https://ask.usda.gov/s/article/c{i}": load_fixture("client_rendered.html") for i in range(10)})
+
+    with driver_pool.DriverPool(None, workers=1, mode="auto") as pool:
+        results = list(pool.scrape(list(pages)))
+
+    assert len(calls["http"]) == driver_pool.HTTP_PROBE_PAGES
+    assert len(calls["browser"]) == 10 and calls["drivers"] == 1
+    assert all(page_content["paragraph"] for _, page_content in results)
+
+
+def test_http_mode_never_starts_a_browser(fake_site):
+    pages, calls = fake_site
+    pages["https://ask.usda.gov/s/article/client"] = load_fixture("client_rendered.html")
+
+    with driver_pool.DriverPool(None, workers=1, mode="http") as pool:
+        results = list(pool.scrape(list(pages)))
+
+    assert results == [("https://ask.usda.gov/s/article/client", {"h2": [], "paragraph": ""})]
+    assert calls["drivers"] == 0 and pool.stats["failures"] == 1
@@ -0,0 +1,46 @@
+import json
+import glob
+import os
+
+import driver_pool
+import main
+from file_operations import load_checkpoint
+
+HREFS = [f"https://ask.usda.gov/s/article/faq-{i}" for i in range(4)]
+
+
+def make_record(href, page_content):
+    return {"href": href, "content": page_content}
+
+
+def test_failed_page_is_retried_on_the_next_run(tmp_path, monkeypatch):
+    output_dir = str(tmp_path)
+    fetched = []
+    down = {HREFS[2]}
+
+    def fetch_article(session, href):
+        fetched.append(href)
+        if href in down:
+            return None  # timed out, or the driver crashed
+        return {"h2": [href], "paragraph": f"Answer for {href}"}
+
+    monkeypatch.setattr(driver_pool, "fetch_article", fetch_article)
+    monkeypatch.setattr(main, "DRIVER_PATH", None)
+
+    main.scrape_and_export(output_dir, "t", HREFS, make_record, workers=2, mode="http")
+    assert load_checkpoint(output_dir) == set(HREFS) - down
+
+    # The next run only fetches the page that failed, and it is published once it has content
+    down.clear()
+    fetched.clear()
+    batch_files, _ = main.scrape_and_export(output_dir, "t", HREFS, make_record, workers=2, mode="http")
+    assert fetched == [HREFS[2]]
+    assert load_checkpoint(output_dir) == set(HREFS)
+
+    records = []
+    for path in batch_files:
+        with open(path, 'r', encoding='utf-8') as f:
+            records.extend(json.load(f))
+    assert sorted(record["href"] for record in records) == sorted(HREFS)
+    assert all(record["content"]["paragraph"] for record in records)
+    assert glob.glob(os.path.join(output_dir, "t-*.jsonl.gz"))
@@ -0,0 +1,59 @@
+from selenium.common.exceptions import StaleElementReferenceException, InvalidSessionIdException
+
+import driver_pool
+import scraping
+
+
+class FakeDriver:
+    """Driver whose page lookups raise ``error``, like a page re-rendering mid-read."""
+
+    def __init__(self, error):
+        self.error = error
+        self.quit_calls = 0
+
+    def get(self, href):
+        pass
+
+    def find_element(self, *args):
+        raise self.error
+
+    def find_elements(self, *args):
+        raise self.error
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+def test_scrape_page_returns_empty_content_on_page_errors():
+    page_content = scraping.scrape_page(FakeDriver(StaleElementReferenceException("element is stale")), "https://ask.usda.gov/s/article/a")
+    assert page_content == {"h2": [], "paragraph": ""}
+
+
+def test_page_errors_do_not_restart_the_driver(monkeypatch):
+    drivers = []
+
+    def setup_driver(driver_path, headless=True):
+        drivers.append(FakeDriver(StaleElementReferenceException("element is stale")))
+        return drivers[-1]
+
+    monkeypatch.setattr(driver_pool, "setup_driver", setup_driver)
+    with driver_pool.DriverPool(None, workers=1, mode="browser") as pool:
+        results = list(pool.scrape(["https://ask.usda.gov/s/article/a", "https://ask.usda.gov/s/article/b"]))
+
+    assert [page_content for _, page_content in results] == [{"h2": [], "paragraph": ""}] * 2
+    assert len(drivers) == 1 and pool.stats["restarts"] == 0 and pool.stats["failures"] == 2
+
+
+def test_session_errors_restart_the_driver(monkeypatch):
+    drivers = []
+
+    def setup_driver(driver_path, headless=True):
+        drivers.append(FakeDriver(InvalidSessionIdException("invalid session id")))
+        return drivers[-1]
+
+    monkeypatch.setattr(driver_pool, "setup_driver", setup_driver)
+    with driver_pool.DriverPool(None, workers=1, mode="browser", retries=1) as pool:
+        list(pool.scrape(["https://ask.usda.gov/s/article/a"]))
+
+    assert len(drivers) == 2 and pool.stats["restarts"] == 2
+    assert all(driver.quit_calls == 1 for driver in drivers)
@@ -1,33 +1,209 @@
 import os
-import requests
+import re
 import json
+import hashlib
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+PINATA_API_URL = os.getenv('PINATA_API_URL', 'https://api.pinata.cloud')
+
+# Tag on every pin this pipeline uploads; the backend sync can filter on it
+PIN_SOURCE = "usda-scraper"
+
+# Batch files are named {search_term}-{first}-{last}.json
+BATCH_NAME = re.compile(r"^(?P<term>.+)-(?P<first>\d+)-(?P<last>\d+)\.json$")
+# Batch files, corpus documents (.txt) and their .metadata.json sidecars
+UPLOAD_SUFFIXES = (".json", ".txt")
+
+# Function to set up a pooled keep-alive session with retry/backoff.
+# POST is retried too: the multipart body is built in memory, so it can be resent.
+def setup_session(pool_size=4, retries=5):
+    retry = Retry(total=retries, backoff_factor=1, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset(["GET", "POST", "DELETE"]), respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+# Function to hash a file's content
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Function to list everything this pipeline has pinned
+def list_pins(session, headers, api_url=PINATA_API_URL, page_limit=1000):
+    params = {
+        "status": "pinned",
+        "pageLimit": page_limit,
+        "pageOffset": 0,
+        "metadata[keyvalues]": json.dumps({"source": {"value": PIN_SOURCE, "op": "eq"}}),
+    }
+    while True:
+        response = session.get(f"{api_url}/data/pinList", headers=headers, params=params)
+        response.raise_for_status()
+        rows = response.json()["rows"]
+        yield from rows
+        if len(rows) < page_limit:
+            return
+        params["pageOffset"] += page_limit
+
+# Function to group this pipeline's pins by file name, newest first
+# (pinList returns pins in date_pinned order, newest first, as the backend sync relies on)
+def list_pins_by_name(session, headers, api_url=PINATA_API_URL, page_limit=1000):
+    pins = {}
+    for row in list_pins(session, headers, api_url, page_limit):
+        pins.setdefault((row.get("metadata") or {}).get("name"), []).append(row)
+    return pins
+
+# Function to read the content hash a pin was uploaded with
+def pin_sha256(row):
+    return ((row.get("metadata") or {}).get("keyvalues") or {}).get("sha256")
+
+# Function to unpin CIDs concurrently. Returns the set of CIDs unpinned.
+def unpin_cids(session, headers, cids, workers=4, api_url=PINATA_API_URL):
+    def unpin(cid):
+        try:
+            session.delete(f"{api_url}/pinning/unpin/{cid}", headers=headers).raise_for_status()
+            return cid
+        except requests.RequestException as e:
+            print(f"Failed to unpin {cid}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return {cid for cid in executor.map(unpin, cids) if cid is not None}
 
-# Function to upload JSON files to Pinata
-def upload_to_pinata(directory, pinata_jwt):
-    url = "https://api.pinata.cloud/pinning/pinFileToIPFS"
+# Function to build the pin metadata keyvalues for a batch file
+def build_keyvalues(filename, sha256, scraped_at):
+    keyvalues = {"source": PIN_SOURCE, "sha256": sha256, "scraped_at": scraped_at}
+    match = BATCH_NAME.match(filename)
+    if match:
+        keyvalues["search_term"] = match.group("term")
+        keyvalues["batch_range"] = f"{match.group('first')}-{match.group('last')}"
+    return keyvalues
+
+# Function to upload a single file with its metadata
+def upload_file(session, url, headers, json_file_path, filename, keyvalues):
+    metadata = {
+        "name": filename,
+        "keyvalues": keyvalues
+    }
+    with open(json_file_path, 'rb') as file:
+        files = {'file': (filename, file)}  # Include the filename in the tuple
+        response = session.post(url, headers=headers, files=files, data={"pinataMetadata": json.dumps(metadata)})
+    response.raise_for_status()
+    return response.json()
+
+# Function to upload JSON and corpus files to Pinata
+# (all .json and .txt files in the directory unless filenames is given).
+# A file is skipped when the newest pin under its name has the same content
+# hash, which is what the backend sync serves; the rest are uploaded
+# concurrently. Older pins of an uploaded or skipped name are superseded and
+# unpinned once the newest one is in place, so old versions don't pile up.
+# Returns counts of uploaded, skipped, failed and unpinned files.
+def upload_to_pinata(directory, pinata_jwt, filenames=None, workers=4, scraped_at=None, api_url=PINATA_API_URL):
+    url = f"{api_url}/pinning/pinFileToIPFS"
     headers = {'Authorization': f"Bearer {pinata_jwt}"}
+    scraped_at = scraped_at or datetime.now(timezone.utc).isoformat()
+    summary = {"uploaded": 0, "skipped": 0, "failed": 0, "unpinned": 0}
+
+    filenames = sorted(name for name in (filenames if filenames is not None else os.listdir(directory)) if name.endswith(UPLOAD_SUFFIXES))
+    with setup_session(pool_size=workers) as session:
+        pins = list_pins_by_name(session, headers, api_url)
 
-    for filename in os.listdir(directory):
-        if filename.endswith(".json"):
+        pending = []
+        current = {}  # file name -> CID that should stay pinned
+        for filename in filenames:
             json_file_path = os.path.join(directory, filename)
-            with open(json_file_path, 'rb') as file:
-                files = {'file': (filename, file)}  # Include the filename in the tuple
-                
-                # Optional: Prepare metadata
-                metadata = {
-                    "name": filename,
-                    "keyvalues": {
-                        "customKey": "customValue"  # Optional custom metadata
-                    }
-                }
-                
-                # Sending the request
-                response = requests.post(url, headers=headers, files=files, data={"pinataMetadata": json.dumps(metadata)})
-
-                if response.status_code == 200:
-                    print(f"File {filename} uploaded successfully:", response.json())
+            sha256 = file_sha256(json_file_path)
+            newest = (pins.get(filename) or [None])[0]
+            if newest is not None and pin_sha256(newest) == sha256:
+                print(f"File {filename} is already pinned, skipping")
+                current[filename] = newest["ipfs_pin_hash"]
+                summary["skipped"] += 1
+                continue
+            pending.append((json_file_path, filename, build_keyvalues(filename, sha256, scraped_at)))
+
+        def upload(job):
+            json_file_path, filename, keyvalues = job
+            try:
+                result = upload_file(session, url, headers, json_file_path, filename, keyvalues)
+                print(f"File {filename} uploaded successfully:", result)
+                return filename, result.get("IpfsHash")
+            except requests.RequestException as e:
+                print(f"Failed to upload {filename}: {e}")
+                return filename, None
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for filename, cid in executor.map(upload, pending):
+                if cid is None:
+                    summary["failed"] += 1
                 else:
-                    print(f"Failed to upload {filename}: {response.status_code}, {response.text}")
+                    current[filename] = cid
+                    summary["uploaded"] += 1
+
+        # Unpin the older CIDs of every name now served by a newer pin. A CID
+        # another name still serves (identical content) is kept.
+        keep = set(current.values()) | {rows[0]["ipfs_pin_hash"] for name, rows in pins.items() if name not in current}
+        superseded = {row["ipfs_pin_hash"] for filename, cid in current.items()
+                      for row in pins.get(filename, []) if row["ipfs_pin_hash"] != cid} - keep
+        if superseded:
+            summary["unpinned"] = len(unpin_cids(session, headers, sorted(superseded), workers, api_url))
+
+    print(f"Pinata upload: {summary['uploaded']} uploaded, {summary['skipped']} already pinned, "
+          f"{summary['failed']} failed, {summary['unpinned']} superseded pins removed")
+    return summary
+
+# Function to list the pinned batch file names of a prefix, e.g. the
+# {prefix}-{first}-{last}.json pins left over from the batches layout once a
+# run publishes the articles layout instead
+def list_batch_pin_names(pinata_jwt, prefix, api_url=PINATA_API_URL):
+    headers = {'Authorization': f"Bearer {pinata_jwt}"}
+    with setup_session() as session:
+        try:
+            pins = list_pins_by_name(session, headers, api_url)
+        except requests.RequestException as e:
+            print(f"Failed to list batch pins for {prefix}: {e}")
+            return set()
+    batch_names = set()
+    for name in pins:
+        match = BATCH_NAME.match(name or "")
+        if match and match.group("term") == prefix:
+            batch_names.add(name)
+    return batch_names
+
+# Function to unpin files that no longer exist locally (e.g. documents of
+# removed articles), so the backend sync deletes them from S3 too.
+# Every pin carrying one of the names is removed, except a CID that is still
+# the newest pin of a name being kept (identical content), which the backend
+# sync serves. Returns the names that are still pinned because an unpin (or
+# listing the pins) failed, to retry later.
+def unpin_files(pinata_jwt, filenames, workers=4, api_url=PINATA_API_URL):
+    names = set(filenames)
+    if not names:
+        return set()
+    headers = {'Authorization': f"Bearer {pinata_jwt}"}
+    with setup_session(pool_size=workers) as session:
+        try:
+            pins_by_name = list_pins_by_name(session, headers, api_url)
+        except requests.RequestException as e:
+            print(f"Failed to list pins to unpin: {e}")
+            return names
+
+        keep = {rows[0]["ipfs_pin_hash"] for name, rows in pins_by_name.items() if name not in names}
+        pins = [(row["ipfs_pin_hash"], name) for name in names for row in pins_by_name.get(name, [])
+                if row["ipfs_pin_hash"] not in keep]
+        unpinned = unpin_cids(session, headers, sorted({cid for cid, _ in pins}), workers, api_url)
+    failed = {name for cid, name in pins if cid not in unpinned}
+    print(f"Pinata unpin: {len(unpinned)} of {len(pins)} pins for {len(names)} stale files removed, "
+          f"{len(failed)} files left to retry")
+    return failed
 
 # Example usage:
 # Make sure to provide the correct directory path and your Pinata JWT